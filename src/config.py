@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 
@@ -16,6 +17,42 @@ class Config:
     LLM_MODEL_TYPE = os.getenv("LLM_MODEL_TYPE", "llama3:8b")
     LLM_CLIENT_TOKEN = os.getenv("LLM_CLIENT_TOKEN", "")
     RETRY_ATTEMPTS = 1
+    # Max keep-alive connections per host in the shared HTTP session
+    LLM_HTTP_POOL_SIZE = int(os.getenv("LLM_HTTP_POOL_SIZE", "10"))
+    # Comma-separated Ollama base URLs; requests go to the one with the fewest in flight.
+    # The interactive query path and bulk extraction can use separate pools.
+    LLM_BACKENDS = os.getenv(
+        "LLM_BACKENDS", f"{LLM_SERVER_ADDRESS}:{LLM_SERVER_PORT}" if LLM_SERVER_PORT else LLM_SERVER_ADDRESS
+    )
+    LLM_QUERY_BACKENDS = os.getenv("LLM_QUERY_BACKENDS", LLM_BACKENDS)
+    LLM_EXTRACT_BACKENDS = os.getenv("LLM_EXTRACT_BACKENDS", LLM_BACKENDS)
+    # A backend is ejected after this many consecutive failures and re-admitted
+    # by the health check no sooner than LLM_BACKEND_EJECT_SECONDS later
+    LLM_BACKEND_EJECT_AFTER = int(os.getenv("LLM_BACKEND_EJECT_AFTER", "3"))
+    LLM_BACKEND_EJECT_SECONDS = float(os.getenv("LLM_BACKEND_EJECT_SECONDS", "30"))
+    LLM_HEALTH_CHECK_INTERVAL = float(os.getenv("LLM_HEALTH_CHECK_INTERVAL", "15"))
+    # Max in-flight requests per backend server from one process, across all endpoints
+    LLM_BACKEND_MAX_CONCURRENCY = int(os.getenv("LLM_BACKEND_MAX_CONCURRENCY", "4"))
+    # A call whose model load took at least this many seconds counts as a cold load
+    LLM_COLD_LOAD_SECONDS = float(os.getenv("LLM_COLD_LOAD_SECONDS", "0.5"))
+    # Identical concurrent LLM calls share one in-flight request
+    LLM_COALESCE_REQUESTS = os.getenv("LLM_COALESCE_REQUESTS", "1") == "1"
+    # Seconds to connect to / wait for data from the LLM server
+    LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "300"))
+    # Constrain LLM output: "schema" (JSON schema, Ollama >= 0.5), "json" or "off"
+    LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "schema")
+    # Caps on generated tokens so that a rambling answer cannot run on
+    LLM_EXTRACT_NUM_PREDICT = int(os.getenv("LLM_EXTRACT_NUM_PREDICT", "512"))
+    LLM_QUERY_NUM_PREDICT = int(os.getenv("LLM_QUERY_NUM_PREDICT", "256"))
+    # Stream JSON answers and hang up as soon as the top-level object is complete
+    LLM_STREAM_JSON = os.getenv("LLM_STREAM_JSON", "1") == "1"
+    # How long Ollama keeps the model loaded after a request ("30m", "-1" = forever, "" = server default)
+    LLM_KEEP_ALIVE = os.getenv("LLM_KEEP_ALIVE", "30m")
+    # Extra Ollama options as JSON, e.g. {"num_ctx": 8192}; sent with every request
+    LLM_OPTIONS = json.loads(os.getenv("LLM_OPTIONS", "{}"))
+    # Load the model and its fixed system prompt at startup
+    LLM_PREWARM = os.getenv("LLM_PREWARM", "0") == "1"
 
     MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/student_rental")
 
@@ -23,6 +60,14 @@ class Config:
     REDIS_HOST = os.getenv("REDIS_URI", "localhost")
     REDIS_PORT = 6379
 
+    # Parsed search queries, cached in-process and in Redis under a normalized query
+    QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "1") == "1"
+    QUERY_CACHE_REDIS = os.getenv("QUERY_CACHE_REDIS", "1") == "1"
+    QUERY_CACHE_MEMORY_SIZE = int(os.getenv("QUERY_CACHE_MEMORY_SIZE", "1024"))
+    QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "86400"))
+    # Keep Redis lookups from slowing down searches when Redis is down
+    QUERY_CACHE_REDIS_TIMEOUT = float(os.getenv("QUERY_CACHE_REDIS_TIMEOUT", "0.2"))
+
     # Optional token for API access if required
     CLIENT_TOKEN = os.getenv("CLIENT_TOKEN")
 
@@ -32,8 +77,76 @@ class Config:
     LLM_EMBEDDING_SERVER_PORT = os.getenv("LLM_EMBEDDING_SERVER_PORT", "")
     LLM_EMBEDDING_MODEL_TYPE = os.getenv("LLM_EMBEDDING_MODEL_TYPE")
     LLM_EMBEDDING_CLIENT_TOKEN = os.getenv("LLM_EMBEDDING_CLIENT_TOKEN")
+    # "off": always /api/embeddings, "auto": use Ollama's multi-input /api/embed when available.
+    # /api/embed returns L2-normalized vectors, so only switch to "auto" on a new or rebuilt collection
+    LLM_EMBEDDING_BATCH_API = os.getenv("LLM_EMBEDDING_BATCH_API", "off")
+    LLM_EMBEDDING_BATCH_SIZE = int(os.getenv("LLM_EMBEDDING_BATCH_SIZE", "32"))
+    LLM_EMBEDDING_CONCURRENCY = int(os.getenv("LLM_EMBEDDING_CONCURRENCY", "4"))
 
     CHROMA_TOKEN = os.getenv("CHROMA_TOKEN")
     CHROMA_TENANT = os.getenv("CHROMA_TENANT")
     CHROMA_DATABASE = os.getenv("CHROMA_DATABASE")
     CHROMA_COLLECTION_NAME = os.getenv("CHROMA_COLLECTION_NAME")
+    # Vector store backend: cloud (Chroma Cloud), http (self-hosted server), persistent (embedded, on disk)
+    # or ephemeral (embedded, in memory)
+    CHROMA_BACKEND = os.getenv("CHROMA_BACKEND", "cloud")
+    CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
+    CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
+    CHROMA_SSL = os.getenv("CHROMA_SSL", "0") == "1"
+    # Directory of the persistent backend (defaults to <CACHE_DIR>/chroma)
+    CHROMA_PATH = os.getenv("CHROMA_PATH", "")
+
+    # Local cache / index files
+    CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+    DEDUP_BACKFILL_PAGE_SIZE = int(os.getenv("DEDUP_BACKFILL_PAGE_SIZE", "1000"))
+    # Embedding cache: in-process LRU entries and max rows kept on disk (0 disables the cache)
+    EMBEDDING_CACHE_MEMORY_SIZE = int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "2048"))
+    EMBEDDING_CACHE_MAX_ROWS = int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", "500000"))
+
+    # Estimated Jaccard similarity above which a post is treated as a repost of an existing one
+    NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+
+    # Rule-based metadata extraction ahead of the LLM
+    RULE_EXTRACTOR_ENABLED = os.getenv("RULE_EXTRACTOR_ENABLED", "1") == "1"
+    RULE_EXTRACTOR_MIN_CONFIDENCE = float(os.getenv("RULE_EXTRACTOR_MIN_CONFIDENCE", "0.75"))
+    # The LLM is skipped entirely when all of these fields are confident
+    RULE_EXTRACTOR_REQUIRED_FIELDS = os.getenv(
+        "RULE_EXTRACTOR_REQUIRED_FIELDS", "city,district,price_min,price_max,layout_room,gender_restriction"
+    ).split(",")
+    # City assumed for ambiguous district names such as "東區"
+    DEFAULT_CITY = os.getenv("DEFAULT_CITY", "台南市")
+    # Search queries parsed by rules alone when at least this share of the text is understood
+    QUERY_RULE_PARSER_ENABLED = os.getenv("QUERY_RULE_PARSER_ENABLED", "1") == "1"
+    QUERY_RULE_MIN_COVERAGE = float(os.getenv("QUERY_RULE_MIN_COVERAGE", "0.85"))
+    # Seconds a search waits for query parsing before running with rule-based filters only (0 = no deadline)
+    SEARCH_PARSE_DEADLINE = float(os.getenv("SEARCH_PARSE_DEADLINE", "0"))
+    # Threads shared by all searches for parsing queries (embedding runs on the request thread)
+    SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "8"))
+
+    # Crawler page harvesting: "batch" (one injected script per page) or "legacy" (per-element reads)
+    CRAWLER_HARVEST_MODE = os.getenv("CRAWLER_HARVEST_MODE", "batch")
+    CRAWLER_DOM_SETTLE_MS = int(os.getenv("CRAWLER_DOM_SETTLE_MS", "300"))
+    CRAWLER_HARVEST_TIMEOUT_MS = int(os.getenv("CRAWLER_HARVEST_TIMEOUT_MS", "3000"))
+    # Max seconds to wait for new posts after a scroll before counting an idle wait
+    CRAWLER_SCROLL_TIMEOUT = float(os.getenv("CRAWLER_SCROLL_TIMEOUT", "3"))
+    # Max posts waiting for extraction; the crawler blocks when the queue is full
+    CRAWLER_QUEUE_SIZE = int(os.getenv("CRAWLER_QUEUE_SIZE", "100"))
+    # Upper bound of concurrent extraction workers (i.e. in-flight LLM requests)
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+    # Multi-post extraction prompts; LLM_BATCH_SIZE=1 sends one post per request
+    LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "8"))
+    # Seconds a worker waits to fill a micro-batch before sending what it has
+    LLM_BATCH_MAX_WAIT = float(os.getenv("LLM_BATCH_MAX_WAIT", "0.5"))
+    # Context window of LLM_MODEL_TYPE, used to bound the batch size
+    LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "8192"))
+    # Durable job queue between the crawler and the extraction workers
+    JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", os.path.join(CACHE_DIR, "jobs.sqlite3"))
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+    JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "2"))
+    # A job claimed longer ago than this is reclaimed even if its process still runs (e.g. on another host)
+    JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "600"))
+    # Embedded jobs are deleted from the queue after this many days (0 keeps them)
+    JOB_RETENTION_DAYS = float(os.getenv("JOB_RETENTION_DAYS", "7"))
+    # Extracted metadata reused while the post, the prompts and the model are unchanged
+    EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "1") == "1"
+    EXTRACTION_CACHE_PATH = os.getenv("EXTRACTION_CACHE_PATH", os.path.join(CACHE_DIR, "extractions.sqlite3"))
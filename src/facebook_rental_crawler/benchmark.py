@@ -0,0 +1,136 @@
+"""
+Offline throughput benchmark for the ingestion pipeline.
+
+Replays a recording (see `main.py --record`) through
+post_queue -> worker -> RentalExtractor -> RagService.insert
+with a stub LLM and a local Chroma collection, then reports posts/s per stage.
+
+Usage:
+    python -m src.facebook_rental_crawler.benchmark <recording.jsonl> [--workers 4] [--llm-latency 0.2] [--real-llm]
+        [--vector-store ephemeral|persistent]
+"""
+import argparse
+import hashlib
+import json
+import re
+import tempfile
+import time
+
+from chromadb import Documents, Embeddings
+from chromadb.utils.embedding_functions import EmbeddingFunction
+
+from src.config import Config
+from src.facebook_rental_crawler.extraction_cache import ExtractionCache, extraction_version
+from src.facebook_rental_crawler.extractor import RentalExtractor
+from src.facebook_rental_crawler.job_queue import DurableJobQueue
+from src.facebook_rental_crawler.main import print_llm_stats, run_pipeline
+from src.facebook_rental_crawler.metrics import PipelineStats
+from src.facebook_rental_crawler.replay import ReplayCrawler
+from src.rag_service.rag import RagConfig, RagService
+
+# Backends that never write outside the benchmark's temporary directory
+LOCAL_BACKENDS = ("ephemeral", "persistent")
+
+STUB_METADATA = {
+    "city": "台南市",
+    "district": "東區",
+    "address": "",
+    "price_min": 5000,
+    "price_max": 5000,
+    "size_min": 0.0,
+    "size_max": 0.0,
+    "layout_room": 1,
+    "layout_hall": 0,
+    "layout_bath": 1,
+    "can_pet": -1,
+    "can_cook": -1,
+    "has_elevator": -1,
+    "has_parking": -1,
+    "is_student": -1,
+    "gender_restriction": 0,
+    "contact_info_json": "[]",
+    "photos_json": "[]",
+}
+
+
+class StubLLMClient:
+    """
+    Stands in for LLMClient: waits `latency` seconds and returns fixed metadata,
+    as an array when the prompt is a batch prompt.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def call_local_model(self, prompt, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        ids = re.findall(r"^### 貼文 (\S+)$", prompt, re.MULTILINE)
+        if ids:
+            return json.dumps([dict(STUB_METADATA, id=post_id) for post_id in ids], ensure_ascii=False)
+        return json.dumps(STUB_METADATA, ensure_ascii=False)
+
+
+class StubEmbeddingFunction(EmbeddingFunction):
+    """
+    Deterministic hash-based vectors so inserts do not need an embedding model.
+    """
+
+    def __init__(self, dimensions=64):
+        self.dimensions = dimensions
+
+    def __call__(self, input: Documents) -> Embeddings:
+        embeddings = []
+        for text in input:
+            digest = hashlib.shake_256(text.encode("utf-8")).digest(self.dimensions)
+            embeddings.append([b / 255.0 for b in digest])
+        return embeddings
+
+
+def build_local_database(cache_dir, backend="ephemeral"):
+    """
+    A local store only (ephemeral, or persistent under <cache_dir>/chroma), so that
+    benchmark data never lands in the configured cloud or http store.
+    """
+    rag_config = RagConfig()
+    rag_config.collection_name = "benchmark"
+    rag_config.model_type = "stub"
+    rag_config.cache_dir = cache_dir
+    if backend not in LOCAL_BACKENDS:
+        raise ValueError(f"The benchmark only runs against a local store, not {backend!r}")
+    rag_config.backend = backend
+    if backend == "persistent":
+        rag_config.chroma_path = ""
+    return RagService(rag_config, embedding_function=StubEmbeddingFunction())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the crawler ingestion pipeline offline")
+    parser.add_argument("recording", help="A recording made with main.py --record")
+    parser.add_argument("--workers", type=int, default=4, help="Max number of extraction workers")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds the stub LLM sleeps per call")
+    parser.add_argument("--real-llm", action="store_true", help="Call the configured LLM server instead of the stub")
+    parser.add_argument("--vector-store", choices=LOCAL_BACKENDS, default="ephemeral",
+                        help="Chroma backend to insert into (default: in memory)")
+    args = parser.parse_args()
+
+    stats = PipelineStats()
+    database = build_local_database(tempfile.mkdtemp(prefix="rental-benchmark-"), args.vector_store)
+    post_queue = DurableJobQueue(":memory:", maxsize=Config.CRAWLER_QUEUE_SIZE)
+    crawler = ReplayCrawler(args.recording, post_queue, database=database, verbose=False, stats=stats)
+    # A fresh cache per run, so that every post is extracted
+    extraction_cache = ExtractionCache(":memory:", extraction_version(), "benchmark")
+
+    def extractor_factory():
+        llm_client = None if args.real_llm else StubLLMClient(args.llm_latency)
+        return RentalExtractor(database=database, llm_client=llm_client, stats=stats,
+                               extraction_cache=extraction_cache)
+
+    run_pipeline(crawler, post_queue, args.workers, extractor_factory=extractor_factory)
+
+    print(stats.report())
+    print_llm_stats()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import os
+import json
 import time
 import logging
 from selenium import webdriver
@@ -7,8 +9,12 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import StaleElementReferenceException
 from src.facebook_rental_crawler.crawler_config import CrawlerConfig as Config
-from src.utils import hash_content
-from src.facebook_rental_crawler.database import database
+from src.utils import hash_content, normalize_post_text
+from src.facebook_rental_crawler.database import get_database
+from src.facebook_rental_crawler.near_duplicate import NearDuplicateIndex
+from src.facebook_rental_crawler.scripts import HARVEST_POSTS_SCRIPT
+from src.facebook_rental_crawler.scroll_engine import AdaptiveScroller
+from src.facebook_rental_crawler.recording import PostRecorder
 
 # Setup Logger
 logging.basicConfig(level=logging.INFO)
@@ -17,7 +23,7 @@ logger = logging.getLogger(__name__)
 class Crawler:
     POISON_PILL = None
 
-    def __init__(self, scroll_count, post_queue):
+    def __init__(self, scroll_count, post_queue, record_path=None):
         logger.info("Starting Crawler")
         logger.info(f"Group URL: {Config.GROUP_URL}")
         logger.info(f"Chrome User Data: {Config.get_chrome_user_data()}")
@@ -29,22 +35,47 @@ class Crawler:
         self.options.add_experimental_option("detach", True)
 
         self.driver = webdriver.Chrome(options=self.options)
+        # Async scripts wait up to CRAWLER_HARVEST_TIMEOUT_MS for the DOM to settle (harvest)
+        # or CRAWLER_SCROLL_TIMEOUT for new posts (scroller)
+        self.driver.set_script_timeout(
+            max(Config.CRAWLER_HARVEST_TIMEOUT_MS / 1000, Config.CRAWLER_SCROLL_TIMEOUT) + 5
+        )
 
         logger.info("Facebook Crawler initialized.")
         self.scroll_count = scroll_count
         
         self.wait = WebDriverWait(self.driver, 3, poll_frequency=0.1)
-        
+        self.scroller = AdaptiveScroller(self.driver, timeout=Config.CRAWLER_SCROLL_TIMEOUT)
+
+        # Harvested batches are saved for offline replay when a record path is given
+        self.recorder = PostRecorder(record_path) if record_path else None
+
+        self._init_state(post_queue, get_database())
+
+    def _init_state(self, post_queue, database, verbose=True):
+        """
+        Set up deduplication and the output queue; shared with ReplayCrawler,
+        which runs without a browser.
+        """
+        # Posts seen during this run; posts already stored are looked up in the local dedup index
         self.post_set = set()
-        # Load existing IDs from database
-        self.post_set.update(database.collection.get()['ids'])
+        self.dedup_index = database.ensure_dedup_index()
+        self.near_duplicates = NearDuplicateIndex(
+            os.path.join(database.cache_dir, "near_duplicates", f"{database.collection.name}.jsonl"),
+            threshold=Config.NEAR_DUPLICATE_THRESHOLD,
+        )
+        if not self.near_duplicates.exists():
+            print("Near-duplicate index not found, backfilling from Chroma...")
+            added = self.near_duplicates.backfill(database.collection, page_size=database.dedup_page_size)
+            print(f"Near-duplicate index backfill done, {added} posts")
+        self.verbose = verbose
         
         self.queue = post_queue
 
     def crawl(self):
         """
         The main crawl logics
-        loop: crawl->crawl_one_page->scroll_down_one_post_each_time
+        loop: crawl->crawl_one_page->scroller.scroll_and_wait
         until: Reach the scroll_count.
         """
         try:
@@ -53,6 +84,7 @@ class Crawler:
             self.wait.until(EC.url_contains(Config.FACEBOOK_URL))
             self.driver.get(Config.GROUP_URL)
             self.wait.until(EC.url_contains(Config.GROUP_URL))
+            self.scroller.install()
 
             same_post_count = 0
             last_post_set_size = 0
@@ -60,8 +92,10 @@ class Crawler:
 
             for i in range(self.scroll_count):
                 self.crawl_one_page()
-                self.scroll_down_one_post_each_time(1)
-                time.sleep(1)
+                try:
+                    self.scroller.scroll_and_wait()
+                except Exception as e:
+                    logger.error(f"Scrolling Error: {e}")
 
                 current_post_set_size = len(self.post_set)
                 print(f"{current_post_set_size}, {last_post_set_size}")
@@ -82,15 +116,79 @@ class Crawler:
                 
                 last_post_set_size = current_post_set_size
 
+            self.scroller.stats.posts = len(self.post_set)
+            logger.info(self.scroller.stats.summary())
+
             self.queue.put(Crawler.POISON_PILL)
             logger.info("Facebook Crawler finished.")
 
         except Exception as e:
             print(e)
         finally:
+            if self.recorder:
+                self.recorder.close()
             self.driver.quit()
 
     def crawl_one_page(self):
+        """
+        Scrape the posts currently loaded on the page, using CRAWLER_HARVEST_MODE.
+        """
+        if Config.CRAWLER_HARVEST_MODE == "legacy":
+            self.crawl_one_page_legacy()
+        else:
+            self.crawl_one_page_batch()
+
+    def harvest_posts(self):
+        """
+        Expand, wait for the DOM to settle and collect every not-yet-harvested
+        post in a single WebDriver round trip.
+        :return: A list of {"key": ..., "text": ...} dicts.
+        """
+        raw = self.driver.execute_async_script(
+            HARVEST_POSTS_SCRIPT,
+            Config.CRAWLER_DOM_SETTLE_MS,
+            Config.CRAWLER_HARVEST_TIMEOUT_MS,
+        )
+        posts = json.loads(raw) if raw else []
+        if self.recorder and posts:
+            self.recorder.record(posts)
+        return posts
+
+    def crawl_one_page_batch(self):
+        """
+        Harvest the page with one injected script, then hash and enqueue only new posts.
+        """
+        try:
+            harvested = self.harvest_posts()
+        except Exception as e:
+            logger.error(f"Harvest script failed, falling back to legacy mode: {e}")
+            self.crawl_one_page_legacy()
+            return
+
+        self.ingest_posts(harvested)
+
+    def ingest_posts(self, harvested):
+        """
+        Hash a batch of harvested posts and enqueue the new ones.
+        :param harvested: A list of {"key": ..., "text": ...} dicts.
+        """
+        for post in harvested:
+            text = normalize_post_text(post["text"])
+            if not text:
+                continue
+            hash_val = hash_content(text)
+            if self.is_seen(hash_val):
+                if self.verbose:
+                    print("跳過重複貼文")
+                continue
+
+            if self.verbose:
+                print("------------------------")
+                print(text)
+                print("------------------------")
+            self.add_post(text, hash_val)
+
+    def crawl_one_page_legacy(self):
         """
         1. Find all "See more" or "查看更多" buttons.
         2. Expand all buttons.
@@ -129,12 +227,12 @@ class Crawler:
                 try:
                     if post is None: continue 
                     
-                    text = post.text.strip()
+                    text = normalize_post_text(post.text)
                     # Ensure text is not empty and does not contain unexpanded "See more"
                     if text and "查看更多" not in text and "See more" not in text:
                         hash_val = hash_content(text)
                         # If the hash value is duplicated, just skip the post.
-                        if hash_val in self.post_set:
+                        if self.is_seen(hash_val):
                             print("跳過重複貼文")
                             continue 
                         
@@ -162,8 +260,8 @@ class Crawler:
         """
         for _ in range(times):
             try:
-                self.driver.execute_script(f"window.scrollBy(0, {size});")
-                time.sleep(1)
+                self.scroller.scroll_by(size)
+                self.scroller.wait_for_new_posts()
             except Exception as e:
                 logger.error(f"Force scroll error: {e}")
 
@@ -182,17 +280,29 @@ class Crawler:
                 
                 last_post = posts[-1]
                 self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'end'});", last_post)
-                
-                time.sleep(0.6)
+                self.scroller.wait_for_new_posts()
             except Exception:
                 logger.error("Scrolling Error")
 
+    def is_seen(self, hash_val):
+        return hash_val in self.post_set or hash_val in self.dedup_index
+
     def add_post(self, content, hash_val):
-        if hash_val not in self.post_set:
+        if not self.is_seen(hash_val):
             self.post_set.add(hash_val)
-            print(f"Hashed content:{hash_val}")
+            if self.verbose:
+                print(f"Hashed content:{hash_val}")
             # Create post object and put into Queue
             p = {"id": hash_val, "content": content}
+
+            # Reposts with small edits only refresh the metadata of the original post
+            signature = self.near_duplicates.hasher.signature(content)
+            variant_of = self.near_duplicates.find_signature(signature)
+            if variant_of is not None:
+                logger.info(f"Post {hash_val} is a variant of {variant_of}")
+                p["variant_of"] = variant_of
+            else:
+                self.near_duplicates.add_signature(hash_val, signature)
             try:
                 self.queue.put(p)
             except Exception:
@@ -7,4 +7,16 @@ class Database:
     def get_database(self):
         return self.rag_service
 
-database = Database().get_database()
\ No newline at end of file
+
+_database = None
+
+
+def get_database():
+    """
+    Connect lazily so that offline tools (replay, benchmark) can import the
+    crawler modules without opening a connection to Chroma.
+    """
+    global _database
+    if _database is None:
+        _database = Database().get_database()
+    return _database
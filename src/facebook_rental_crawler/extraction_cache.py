@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from src.config import Config
+from src.facebook_rental_crawler.prompts import PROMPT_HASH
+from src.facebook_rental_crawler.rule_extractor import RULE_EXTRACTOR_VERSION
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS extractions (
+    post_hash TEXT NOT NULL,
+    prompt_hash TEXT NOT NULL,
+    model TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    used_llm INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (post_hash, prompt_hash, model)
+);
+"""
+
+
+def extraction_version():
+    """
+    Hash of everything besides the model that decides the extracted metadata:
+    the prompts, the rule extractor version and the settings that pick between rules and LLM.
+    """
+    parts = [
+        PROMPT_HASH,
+        RULE_EXTRACTOR_VERSION,
+        Config.RULE_EXTRACTOR_ENABLED,
+        Config.RULE_EXTRACTOR_MIN_CONFIDENCE,
+        sorted(Config.RULE_EXTRACTOR_REQUIRED_FIELDS),
+        Config.DEFAULT_CITY,
+    ]
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+class ExtractionCache:
+    """
+    Persistent cache of extracted metadata keyed by
+    (sha256(post), extraction version, model name); see extraction_version.
+
+    A result is only reused while the prompts, the rules and the model are unchanged,
+    so editing PROMPT_TEMPLATE, the rule extractor or its settings, or switching
+    LLM_MODEL_TYPE makes every entry stale.
+
+    `hits` counts every reuse; `llm_hits` only those of entries that needed the LLM,
+    i.e. the LLM calls actually saved.
+    """
+
+    def __init__(self, path, prompt_hash, model):
+        self.path = path
+        self.prompt_hash = prompt_hash
+        self.model = model
+
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(extractions)")}
+        if "used_llm" not in columns:
+            self._conn.execute("ALTER TABLE extractions ADD COLUMN used_llm INTEGER NOT NULL DEFAULT 1")
+
+        self.hits = 0
+        self.llm_hits = 0
+        self.misses = 0
+
+    def get(self, post_hash):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT metadata, used_llm FROM extractions WHERE post_hash = ? AND prompt_hash = ? AND model = ?",
+                (post_hash, self.prompt_hash, self.model),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if row[1]:
+                self.llm_hits += 1
+        return json.loads(row[0])
+
+    def put(self, post_hash, metadata, used_llm=True):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions (post_hash, prompt_hash, model, metadata, created_at, used_llm) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (post_hash, self.prompt_hash, self.model, json.dumps(metadata, ensure_ascii=False), time.time(),
+                 int(used_llm)),
+            )
+
+    def is_fresh(self, post_hashes):
+        """
+        :return: The subset of `post_hashes` with an entry for the current prompts and model.
+        """
+        fresh = set()
+        post_hashes = list(post_hashes)
+        with self._lock:
+            # Chunked to stay under SQLite's parameter limit
+            for start in range(0, len(post_hashes), 500):
+                chunk = post_hashes[start: start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                fresh.update(row[0] for row in self._conn.execute(
+                    f"SELECT post_hash FROM extractions WHERE prompt_hash = ? AND model = ? "
+                    f"AND post_hash IN ({placeholders})",
+                    [self.prompt_hash, self.model, *chunk],
+                ))
+        return fresh
+
+    def prune(self):
+        """
+        Delete the entries made with other prompts or models.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM extractions WHERE prompt_hash != ? OR model != ?",
+                (self.prompt_hash, self.model),
+            ).rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_extraction_cache():
+    """
+    The extraction cache shared by every worker, for the configured prompts, rules and model.
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ExtractionCache(Config.EXTRACTION_CACHE_PATH, extraction_version(), Config.LLM_MODEL_TYPE)
+        return _shared_cache
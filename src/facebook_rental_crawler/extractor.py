@@ -1,17 +1,54 @@
 from src.config import Config
+from src.rag_service.backend_pool import get_backend_pool
 from src.rag_service.client import LLMClient, LLMConfig, LLMMode
-from src.facebook_rental_crawler.prompts import PROMPT_TEMPLATE
-from src.facebook_rental_crawler.database import database
-import json
+from src.facebook_rental_crawler.prompts import (
+    EXTRACT_SYSTEM_PROMPT, POST_USER_TEMPLATE, PARTIAL_SYSTEM_PROMPT, PARTIAL_USER_TEMPLATE, FIELD_DEFINITIONS,
+    BATCH_SYSTEM_PROMPT, BATCH_POST_TEMPLATE,
+)
+from src.facebook_rental_crawler.rule_extractor import RuleExtractor, RuleExtraction, DEFAULT_METADATA
+from src.rag_service.schema import (
+    batch_metadata_schema, coerce_metadata, metadata_problems, metadata_schema, parse_json, response_format,
+)
+from src.facebook_rental_crawler.database import get_database
+from src.facebook_rental_crawler.extraction_cache import get_extraction_cache
+from src.utils import hash_content
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rough size of one extracted JSON object in the answer
+OUTPUT_TOKENS_PER_POST = 300
 
 
 class RentalExtractor:
-    def __init__(self):
-        self.database = database
+    def __init__(self, database=None, llm_client=None, stats=None, rule_extractor=None, extraction_cache=None):
+        """
+        :param database: The RagService to insert into; defaults to the shared one.
+        :param llm_client: Anything with `call_local_model(prompt, system=...)`; defaults to a
+            long-lived LLMClient owned by this extractor (one per worker).
+        :param stats: Optional PipelineStats receiving "rules" / "extract" / "insert" timings.
+        :param rule_extractor: Runs ahead of the LLM; defaults to a RuleExtractor when RULE_EXTRACTOR_ENABLED.
+        :param extraction_cache: Checked before extracting; defaults to the shared ExtractionCache
+            when EXTRACTION_CACHE_ENABLED.
+        """
+        self.database = database or get_database()
+        self.llm_client = llm_client or self.build_llm_client()
+        self.stats = stats
+        if rule_extractor is None and Config.RULE_EXTRACTOR_ENABLED:
+            rule_extractor = RuleExtractor(default_city=Config.DEFAULT_CITY)
+        self.rule_extractor = rule_extractor
+        self.llm_calls_skipped = 0
+        if extraction_cache is None and Config.EXTRACTION_CACHE_ENABLED:
+            extraction_cache = get_extraction_cache()
+        self.extraction_cache = extraction_cache
+
+    def _stage(self, name, count=1):
+        return self.stats.stage(name, count) if self.stats else nullcontext()
 
     @staticmethod
-    def call_ollama(text: str) -> str:
-        prompt = PROMPT_TEMPLATE.replace("{text}", text)
+    def build_llm_client() -> LLMClient:
         config = LLMConfig(
             mode=LLMMode.CHAT,
             server_address=Config.LLM_SERVER_ADDRESS,
@@ -20,9 +57,257 @@ class RentalExtractor:
             stream=False,
             token=Config.LLM_CLIENT_TOKEN,
         )
-        client = LLMClient(config)
-        response = client.call_local_model(prompt)
-        return response
+        # LLMClient runs on the shared event loop and connection pool, so connections are kept alive across posts.
+        # Requests are spread over the extraction backends, leaving the query pool to interactive searches.
+        return LLMClient(config, pool=get_backend_pool("extract"))
+
+    @staticmethod
+    def prewarm():
+        """
+        Load the model on every extraction backend, together with the system prompt the workers will send.
+        """
+        system = BATCH_SYSTEM_PROMPT if Config.LLM_BATCH_SIZE > 1 else EXTRACT_SYSTEM_PROMPT
+        RentalExtractor.build_llm_client().prewarm(system)
+
+    def ask_llm(self, prompt: str, system: str, format=None, num_predict=None) -> str:
+        """
+        Call the LLM for a JSON answer. With LLM_STREAM_JSON the answer is streamed
+        and the request is closed once the JSON is complete.
+        :param system: The fixed instructions; kept apart from `prompt` so the server can reuse their prefix.
+        """
+        if Config.LLM_STREAM_JSON and hasattr(self.llm_client, "call_json_stream"):
+            result = self.llm_client.call_json_stream(prompt, format=format, num_predict=num_predict, system=system)
+            if self.stats and result.time_to_object is not None:
+                self.stats.add("llm_ttft", result.ttft or 0.0)
+                self.stats.add("llm_object", result.time_to_object)
+            return result.text
+        return self.llm_client.call_local_model(prompt, format=format, num_predict=num_predict, system=system)
+
+    def extract(self, raw_post: str) -> str:
+        return self.ask_llm(
+            POST_USER_TEMPLATE.replace("{text}", raw_post),
+            EXTRACT_SYSTEM_PROMPT,
+            format=response_format(metadata_schema()),
+            num_predict=Config.LLM_EXTRACT_NUM_PREDICT,
+        )
+
+    def extract_fields(self, raw_post: str, fields: list) -> str:
+        """
+        Ask the LLM for the given fields only, with a much shorter prompt.
+        """
+        definitions = "\n".join(FIELD_DEFINITIONS[name] for name in fields)
+        prompt = PARTIAL_USER_TEMPLATE.replace("{fields}", definitions).replace("{text}", raw_post)
+        return self.ask_llm(
+            prompt,
+            PARTIAL_SYSTEM_PROMPT,
+            format=response_format(metadata_schema(fields)),
+            num_predict=Config.LLM_EXTRACT_NUM_PREDICT,
+        )
+
+    def cached_metadata(self, raw_post: str) -> Optional[dict]:
+        if self.extraction_cache is None:
+            return None
+        metadata = self.extraction_cache.get(hash_content(raw_post))
+        if metadata is not None and self.stats:
+            self.stats.add("cache_hit", 0.0)
+        return metadata
+
+    def remember(self, raw_post: str, metadata: dict, used_llm: bool = True) -> None:
+        """
+        :param used_llm: Whether producing `metadata` took an LLM call; rules-only entries do not count as calls saved.
+        """
+        if self.extraction_cache is not None:
+            self.extraction_cache.put(hash_content(raw_post), metadata, used_llm=used_llm)
+
+    def run_rules(self, raw_post: str) -> Optional[RuleExtraction]:
+        if self.rule_extractor is None:
+            return None
+        with self._stage("rules"):
+            return self.rule_extractor.extract(raw_post)
+
+    def fields_for_llm(self, rules: Optional[RuleExtraction]) -> List[str]:
+        """
+        The fields the LLM still has to fill in; empty when the rules are confident enough.
+        """
+        if rules is None:
+            return list(DEFAULT_METADATA)
+        threshold = Config.RULE_EXTRACTOR_MIN_CONFIDENCE
+        if not rules.unresolved(threshold, Config.RULE_EXTRACTOR_REQUIRED_FIELDS):
+            self.llm_calls_skipped += 1
+            if self.stats:
+                self.stats.add("llm_skipped", 0.0)
+            return []
+        return rules.unresolved(threshold)
+
+    @staticmethod
+    def merge(rules: Optional[RuleExtraction], answer: dict, fields: List[str]) -> dict:
+        if rules is None:
+            return answer
+        metadata = dict(rules.metadata)
+        metadata.update({name: answer[name] for name in fields if name in answer})
+        return metadata
+
+    def extract_metadata(self, raw_post: str, rules: Optional[RuleExtraction] = None) -> dict:
+        """
+        Run the rule extractor first. The LLM is skipped when every required field
+        is confident; otherwise it is asked only for the unresolved fields.
+        :param rules: The rule extraction of `raw_post` if it was already computed.
+        """
+        return self.extract_with_rules(raw_post, rules)[0]
+
+    def extract_with_rules(self, raw_post: str, rules: Optional[RuleExtraction] = None) -> Tuple[dict, bool]:
+        """
+        Same as extract_metadata.
+        :return: (metadata, whether the LLM was called)
+        """
+        if rules is None:
+            rules = self.run_rules(raw_post)
+        if rules is None:
+            with self._stage("extract"):
+                return coerce_metadata(parse_json(self.extract(raw_post))), True
+
+        fields = self.fields_for_llm(rules)
+        if not fields:
+            return rules.metadata, False
+
+        with self._stage("extract"):
+            answer: dict = coerce_metadata(parse_json(self.extract_fields(raw_post, fields)), fields)
+        return self.merge(rules, answer, fields), True
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        # Chinese text is close to one token per character; overestimates Latin text, which is fine for a budget
+        return len(text)
+
+    def plan_batches(self, posts: List[dict]) -> List[List[dict]]:
+        """
+        Split posts into batches of at most LLM_BATCH_SIZE whose prompt and
+        answer fit in LLM_CONTEXT_TOKENS. A post too long for any batch goes alone.
+        """
+        overhead = self.estimate_tokens(BATCH_SYSTEM_PROMPT)
+        budget = Config.LLM_CONTEXT_TOKENS - overhead
+
+        batches, current, used = [], [], 0
+        for post in posts:
+            cost = self.estimate_tokens(post["content"]) + OUTPUT_TOKENS_PER_POST
+            if current and (len(current) >= Config.LLM_BATCH_SIZE or used + cost > budget):
+                batches.append(current)
+                current, used = [], 0
+            current.append(post)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    def extract_batch(self, raw_posts: List[str]) -> Dict[int, dict]:
+        """
+        Extract several posts with one LLM request.
+        :return: The well-formed answers keyed by the index of the post in `raw_posts`;
+            malformed or missing items are left out for the caller to retry alone.
+        """
+        posts = "\n".join(
+            BATCH_POST_TEMPLATE.replace("{id}", str(i + 1)).replace("{text}", raw_post)
+            for i, raw_post in enumerate(raw_posts)
+        )
+        raw_answer = self.ask_llm(
+            posts,
+            BATCH_SYSTEM_PROMPT,
+            format=response_format(batch_metadata_schema()),
+            num_predict=Config.LLM_EXTRACT_NUM_PREDICT * len(raw_posts),
+        )
+        try:
+            items = parse_json(raw_answer)
+        except ValueError as e:
+            logger.warning(f"Malformed batch answer for {len(raw_posts)} posts: {e}")
+            return {}
+        if not isinstance(items, list):
+            return {}
+
+        answers = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                index = int(item.pop("id")) - 1
+            except (KeyError, TypeError, ValueError):
+                continue
+            if not 0 <= index < len(raw_posts):
+                continue
+            problems = metadata_problems(item)
+            if problems:
+                logger.warning(f"Malformed batch item {index + 1}: {'; '.join(problems)}")
+                continue
+            answers[index] = coerce_metadata(item)
+        return answers
+
+    def process_batch(self, posts: List[dict]) -> List:
+        """
+        Process queued post dicts with as few LLM requests as possible.
+        :return: One entry per post, in order: the stored uuid, or the exception that post raised.
+        """
+        results: List = [None] * len(posts)
+        pending = []
+        for i, post in enumerate(posts):
+            try:
+                if post.get("variant_of"):
+                    results[i] = self.process(post)
+                    continue
+                metadata = self.cached_metadata(post["content"])
+                if metadata is not None:
+                    results[i] = self.insert(post["content"], metadata)
+                    continue
+                rules = self.run_rules(post["content"])
+                fields = self.fields_for_llm(rules)
+                if fields:
+                    pending.append((i, post, rules, fields))
+                else:
+                    self.remember(post["content"], rules.metadata, used_llm=False)
+                    results[i] = self.insert(post["content"], rules.metadata)
+            except Exception as e:
+                results[i] = e
+
+        for batch in self.plan_batches([post for _, post, _, _ in pending]):
+            entries = pending[:len(batch)]
+            pending = pending[len(batch):]
+            answers = {}
+            if len(batch) > 1:
+                try:
+                    with self._stage("extract", count=len(batch)):
+                        answers = self.extract_batch([post["content"] for post in batch])
+                except Exception as e:
+                    logger.warning(f"Batch extraction of {len(batch)} posts failed: {e}")
+
+            for j, (i, post, rules, fields) in enumerate(entries):
+                try:
+                    used_llm = True
+                    if j in answers:
+                        metadata = self.merge(rules, answers[j], fields)
+                    else:
+                        # Only the malformed item is retried, with the single-post prompt
+                        if len(batch) > 1 and self.stats:
+                            self.stats.add("batch_retry", 0.0)
+                        metadata, used_llm = self.extract_with_rules(post["content"], rules)
+                    self.remember(post["content"], metadata, used_llm=used_llm)
+                    results[i] = self.insert(post["content"], metadata)
+                except Exception as e:
+                    results[i] = e
+        return results
+
+    @staticmethod
+    def call_ollama(text: str) -> str:
+        """
+        One-off extraction with a throwaway client; workers use `extract` instead.
+        """
+        return RentalExtractor.build_llm_client().call_local_model(
+            POST_USER_TEMPLATE.replace("{text}", text), system=EXTRACT_SYSTEM_PROMPT)
+
+    def process(self, post: dict) -> str:
+        """
+        Process a queued post dict ({"id", "content", optional "variant_of"}).
+        """
+        if post.get("variant_of"):
+            return self.process_variant(post["content"], post["id"], post["variant_of"])
+        return self.process_post_and_insert(post["content"])
 
     def process_post_and_insert(self, raw_post: str) -> str:
         """
@@ -31,7 +316,78 @@ class RentalExtractor:
         :param raw_post: The raw string of the post being processed.
 
         """
-        metadata: dict = json.loads(self.call_ollama(raw_post))
-        uuid: str = self.database.insert(raw_post, metadata)
+        metadata: Optional[dict] = self.cached_metadata(raw_post)
+        if metadata is None:
+            metadata, used_llm = self.extract_with_rules(raw_post)
+            self.remember(raw_post, metadata, used_llm=used_llm)
+        return self.insert(raw_post, metadata)
+
+    def reextract(self, post_id: str, raw_post: str, old_metadata: Optional[dict] = None) -> str:
+        """
+        Extract a stored post again with the current prompts and model, and
+        update its metadata in place without re-embedding it.
+        Keys that are not part of the extraction (e.g. repost_count) are kept.
+        """
+        metadata, used_llm = self.extract_with_rules(raw_post)
+        metadata = dict(metadata)
+        self.remember(raw_post, metadata, used_llm=used_llm)
+        for key, value in (old_metadata or {}).items():
+            metadata.setdefault(key, value)
+        with self._stage("insert"):
+            self.database.update_metadata(post_id, metadata)
+        return post_id
+
+    def insert(self, raw_post: str, metadata: dict) -> str:
+        with self._stage("insert"):
+            return self.database.insert(raw_post, metadata)
+
+    def extract_changed_fields(self, original: str, repost: str) -> dict:
+        """
+        :return: The new values of the fields that differ between `original` and `repost`;
+            empty without a rule extractor, which is what tells the fields apart.
+        """
+        if self.rule_extractor is None:
+            return {}
+        before = self.run_rules(original)
+        after = self.run_rules(repost)
+        changed = [name for name in DEFAULT_METADATA if before.metadata.get(name) != after.metadata.get(name)]
+        if not changed:
+            return {}
+
+        threshold = Config.RULE_EXTRACTOR_MIN_CONFIDENCE
+        values = {name: after.metadata[name] for name in changed if after.confidence.get(name, 0.0) >= threshold}
+        unresolved = [name for name in changed if name not in values]
+        if unresolved:
+            with self._stage("extract"):
+                answer = coerce_metadata(parse_json(self.extract_fields(repost, unresolved)), unresolved)
+            values.update(answer)
+        logger.info(f"Repost changed {', '.join(changed)}")
+        return values
+
+    def process_variant(self, raw_post: str, post_id: str, variant_of: str) -> str:
+        """
+        Handle a near-duplicate repost: the original post's metadata is refreshed
+        and the repost is recorded as seen. Fields whose rule extraction differs
+        between the original and the repost (e.g. a new price) are updated from
+        the repost, by the rules when confident and otherwise by a partial LLM
+        extraction of those fields only.
+        Falls back to a full extraction if the original post is not stored.
+        :param raw_post: The raw string of the repost.
+        :param post_id: The hash of the repost.
+        :param variant_of: The ID of the original post.
+
+        """
+        existing = self.database.get(ids=[variant_of], include=["documents", "metadatas"])
+        if not existing["ids"]:
+            return self.process_post_and_insert(raw_post)
+
+        metadata: dict = dict(existing["metadatas"][0] or {})
+        metadata.update(self.extract_changed_fields(existing["documents"][0] or "", raw_post))
+
+        with self._stage("variant"):
+            metadata["repost_count"] = int(metadata.get("repost_count", 0)) + 1
+            metadata["last_variant_id"] = post_id
+            self.database.update_metadata(variant_of, metadata)
+            self.database.dedup_index.add(post_id)
 
-        return uuid
+        return variant_of
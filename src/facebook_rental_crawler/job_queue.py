@@ -0,0 +1,296 @@
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+EXTRACTING = "extracting"
+EMBEDDED = "embedded"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    variant_of TEXT,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    owner TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (state, next_attempt_at);
+"""
+
+
+def _owner_alive(owner):
+    """
+    Whether the "host:pid" that claimed a job is still running; None if it cannot be told from here.
+    """
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return None
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class DurableJobQueue:
+    """
+    SQLite (WAL) backed job queue between Crawler.add_post and the extraction workers.
+
+    Jobs move pending -> extracting -> embedded, or back to pending with an
+    exponential backoff when processing fails, until `max_attempts` is reached
+    and they are marked failed. A claimed job records its owner ("host:pid");
+    when the queue is opened, jobs left in `extracting` are returned to pending
+    only if their owner is no longer running or their lease (`lease_seconds`
+    since the claim) has expired, so a `--drain` next to a running crawl does
+    not take over live jobs. Embedded jobs older than `retention` seconds are
+    pruned at the same time.
+
+    The producer side mimics queue.Queue: `put(post)` blocks while `maxsize`
+    jobs are pending, and `put(None)` (the crawler's poison pill) closes the
+    queue. `get()` returns None once the queue is closed and no job is left.
+    """
+
+    def __init__(self, path, maxsize=0, max_attempts=5, backoff=2.0, max_backoff=300.0,
+                 lease_seconds=600.0, retention=7 * 86400.0):
+        self.path = path
+        self.maxsize = maxsize
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.lease_seconds = lease_seconds
+        self.retention = retention
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "owner" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+        self._closed = False
+
+        recovered = self.recover_stale()
+        if recovered:
+            logger.info(f"Recovered {recovered} interrupted jobs")
+        if self.retention:
+            pruned = self.prune_embedded(self.retention)
+            if pruned:
+                logger.info(f"Pruned {pruned} embedded jobs")
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    # --- producer side ---
+
+    def put(self, post, block=True, timeout=None):
+        if post is None:
+            self.close()
+            return
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            while block and self.maxsize > 0 and self.qsize() >= self.maxsize:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Full
+                self._changed.wait(remaining)
+
+            now = time.time()
+            # A post that failed in an earlier run gets a fresh set of attempts
+            self._execute(
+                """
+                INSERT INTO jobs (id, content, variant_of, state, attempts, next_attempt_at, created_at, updated_at)
+                VALUES (?, ?, ?, ?, 0, 0, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET state = excluded.state, attempts = 0,
+                    next_attempt_at = 0, updated_at = excluded.updated_at
+                WHERE jobs.state = ?
+                """,
+                (post["id"], post["content"], post.get("variant_of"), PENDING, now, now, FAILED),
+            )
+            self._changed.notify_all()
+
+    def close(self):
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+
+    # --- consumer side ---
+
+    def get(self, block=True, timeout=None):
+        """
+        Claim the next ready job and mark it extracting.
+        :return: A post dict, or None when the queue is closed and drained.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            while True:
+                job = self._claim()
+                if job is not None:
+                    return job
+
+                counts = self.counts()
+                if self._closed and counts[PENDING] == 0 and counts[EXTRACTING] == 0:
+                    return None
+                if not block:
+                    raise queue.Empty
+
+                wait = self._seconds_until_ready()
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise queue.Empty
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._changed.wait(wait)
+
+    def ack(self, post):
+        self._execute(
+            "UPDATE jobs SET state = ?, last_error = NULL, owner = NULL, updated_at = ? WHERE id = ?",
+            (EMBEDDED, time.time(), post["id"]),
+        )
+        with self._changed:
+            self._changed.notify_all()
+
+    def nack(self, post, error):
+        """
+        Record a failure and schedule a retry with exponential backoff.
+        """
+        with self._changed:
+            row = self._execute("SELECT attempts FROM jobs WHERE id = ?", (post["id"],)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            now = time.time()
+            if attempts >= self.max_attempts:
+                state, next_attempt_at = FAILED, now
+                logger.error(f"Job {post['id']} failed after {attempts} attempts: {error}")
+            else:
+                state = PENDING
+                next_attempt_at = now + min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+                logger.warning(f"Job {post['id']} failed (attempt {attempts}), retrying: {error}")
+            self._execute(
+                "UPDATE jobs SET state = ?, attempts = ?, next_attempt_at = ?, last_error = ?, owner = NULL, updated_at = ? "
+                "WHERE id = ?",
+                (state, attempts, next_attempt_at, str(error), now, post["id"]),
+            )
+            self._changed.notify_all()
+
+    def task_done(self):
+        """
+        Kept for queue.Queue compatibility; completion is recorded by ack/nack.
+        """
+
+    # --- maintenance ---
+
+    def qsize(self):
+        return self._execute("SELECT COUNT(*) FROM jobs WHERE state = ?", (PENDING,)).fetchone()[0]
+
+    def counts(self):
+        result = {PENDING: 0, EXTRACTING: 0, EMBEDDED: 0, FAILED: 0}
+        for state, count in self._execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"):
+            result[state] = count
+        return result
+
+    def recover_stale(self):
+        """
+        Return to pending the jobs whose owner has exited or whose lease has expired.
+        """
+        now = time.time()
+        with self._changed:
+            stale = [
+                job_id for job_id, owner, updated_at in self._execute(
+                    "SELECT id, owner, updated_at FROM jobs WHERE state = ?", (EXTRACTING,)
+                ).fetchall()
+                if _owner_alive(owner) is False or updated_at < now - self.lease_seconds
+            ]
+            for job_id in stale:
+                self._execute(
+                    "UPDATE jobs SET state = ?, owner = NULL, updated_at = ? WHERE id = ? AND state = ?",
+                    (PENDING, now, job_id, EXTRACTING),
+                )
+            if stale:
+                self._changed.notify_all()
+        return len(stale)
+
+    def prune_embedded(self, older_than):
+        """
+        Delete embedded jobs last updated more than `older_than` seconds ago.
+        """
+        return self._execute(
+            "DELETE FROM jobs WHERE state = ? AND updated_at < ?", (EMBEDDED, time.time() - older_than)
+        ).rowcount
+
+    def requeue_failed(self):
+        """
+        Give every failed job a fresh set of attempts.
+        """
+        with self._changed:
+            count = self._execute(
+                "UPDATE jobs SET state = ?, attempts = 0, next_attempt_at = 0, updated_at = ? WHERE state = ?",
+                (PENDING, time.time(), FAILED),
+            ).rowcount
+            self._changed.notify_all()
+        return count
+
+    def _claim(self):
+        """
+        Move the oldest ready job to extracting. The UPDATE only succeeds while the
+        job is still pending, so when another process (e.g. a `--drain` next to a
+        crawl) claims it first, the next ready job is tried instead.
+        """
+        while True:
+            now = time.time()
+            row = self._execute(
+                """
+                SELECT id, content, variant_of, attempts FROM jobs
+                WHERE state = ? AND next_attempt_at <= ?
+                ORDER BY created_at LIMIT 1
+                """,
+                (PENDING, now),
+            ).fetchone()
+            if row is None:
+                return None
+
+            claimed = self._execute(
+                "UPDATE jobs SET state = ?, owner = ?, updated_at = ? WHERE id = ? AND state = ?",
+                (EXTRACTING, self.owner, now, row[0], PENDING),
+            ).rowcount
+            if claimed:
+                break
+
+        # Freed a slot for a blocked producer
+        self._changed.notify_all()
+
+        post = {"id": row[0], "content": row[1], "attempts": row[3]}
+        if row[2]:
+            post["variant_of"] = row[2]
+        return post
+
+    def _seconds_until_ready(self):
+        row = self._execute(
+            "SELECT MIN(next_attempt_at) FROM jobs WHERE state = ?", (PENDING,)
+        ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
@@ -1,60 +1,170 @@
-import sys
+import argparse
 import threading
-import queue
+from concurrent.futures import ThreadPoolExecutor
+from src.config import Config
+from src.facebook_rental_crawler.database import get_database
+from src.facebook_rental_crawler.extraction_cache import get_extraction_cache
 from src.facebook_rental_crawler.extractor import RentalExtractor
 from src.facebook_rental_crawler.crawler import Crawler
+from src.facebook_rental_crawler.job_queue import DurableJobQueue
+from src.facebook_rental_crawler.worker_pool import WorkerPool
+from src.rag_service.llm_stats import llm_stats
 
-def worker(post_queue):
-    extractor = RentalExtractor()
-    while True:
-        post = post_queue.get()
-        if post is Crawler.POISON_PILL:
-            # Put back Poison Pill to let other workers stop (for multiple workers environment)
-            post_queue.put(Crawler.POISON_PILL)
-            break
-            
+
+def run_pipeline(crawler, post_queue, max_workers, extractor_factory=RentalExtractor):
+    """
+    Run the crawler (or a replay) in its own thread and process the queue with
+    an adaptive pool of at most `max_workers` workers.
+    """
+    crawler_thread = threading.Thread(target=crawler.crawl)
+    crawler_thread.start()
+
+    pool = WorkerPool(post_queue, extractor_factory, max_workers, poison_pill=Crawler.POISON_PILL,
+                      batch_size=Config.LLM_BATCH_SIZE, batch_wait=Config.LLM_BATCH_MAX_WAIT)
+    pool.start()
+
+    # Wait for Crawler to finish
+    crawler_thread.join()
+    
+    # Wait for all queues to be processed
+    pool.join()
+
+
+def drain(post_queue, max_workers, extractor_factory=RentalExtractor):
+    """
+    Process the jobs left in the durable queue at full concurrency, without starting Chrome.
+    """
+    post_queue.close()
+    pool = WorkerPool(post_queue, extractor_factory, max_workers, min_workers=max_workers,
+                      poison_pill=Crawler.POISON_PILL, batch_size=Config.LLM_BATCH_SIZE,
+                      batch_wait=Config.LLM_BATCH_MAX_WAIT)
+    pool.start()
+    pool.join()
+
+
+def reextract_stale(database, max_workers, extractor_factory=RentalExtractor, page_size=Config.DEDUP_BACKFILL_PAGE_SIZE):
+    """
+    Re-extract the stored posts whose cached extraction was made with other
+    prompts or another model; fresh posts are skipped without an LLM call.
+    :return: (re-extracted, skipped, failed)
+    """
+    cache = get_extraction_cache()
+    local = threading.local()
+
+    def work(item):
+        if not hasattr(local, "extractor"):
+            local.extractor = extractor_factory()
+        post_id, document, metadata = item
         try:
-            processed_uuid = extractor.process_post_and_insert(post["content"])
-            print(processed_uuid)
+            local.extractor.reextract(post_id, document, metadata)
+            return True
         except Exception as e:
-            print(f"Error in worker: {e}")
-        finally:
-            post_queue.task_done()
+            print(f"Re-extraction of {post_id} failed: {e}")
+            return False
+
+    reextracted = skipped = failed = 0
+    offset = 0
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        while True:
+            page = database.get(limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            offset += len(page["ids"])
+
+            fresh = cache.is_fresh(page["ids"])
+            stale = [item for item in zip(page["ids"], page["documents"], page["metadatas"]) if item[0] not in fresh]
+            skipped += len(page["ids"]) - len(stale)
+            for ok in executor.map(work, stale):
+                if ok:
+                    reextracted += 1
+                else:
+                    failed += 1
+            print(f"Re-extracted {reextracted}, up to date {skipped}, failed {failed}")
+
+    return reextracted, skipped, failed
 
 
 def main():
     """
     To run the crawler, the user must specify the scroll count in arguments.
+    A recording made with --record can be fed through the pipeline again with --replay,
+    and --drain processes the posts left in the durable job queue by earlier runs.
+    --reextract-stale updates the stored posts extracted with older prompts or another model.
     """
-    if len(sys.argv) < 2:
-        print("Usage: python main.py <scroll_count>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Facebook rental crawler")
+    parser.add_argument("scroll_count", type=int, nargs="?", help="How many times to scroll the group page")
+    parser.add_argument("--record", metavar="FILE", help="Save harvested post batches to FILE")
+    parser.add_argument("--replay", metavar="FILE", help="Replay a recording instead of starting Chrome")
+    parser.add_argument("--drain", action="store_true", help="Only process the pending jobs of earlier runs")
+    parser.add_argument("--retry-failed", action="store_true", help="Move failed jobs back to pending first")
+    parser.add_argument("--reextract-stale", action="store_true",
+                        help="Re-extract stored posts whose cached extraction is out of date")
+    parser.add_argument("--workers", type=int, default=Config.LLM_MAX_CONCURRENCY,
+                        help="Max number of extraction workers")
+    args = parser.parse_args()
 
-    scroll_count = int(sys.argv[1])
-    post_queue = queue.Queue()
+    if args.scroll_count is None and not (args.replay or args.drain or args.reextract_stale):
+        parser.error("scroll_count is required unless --replay, --drain or --reextract-stale is given")
 
-    # Start Crawler
-    crawler = Crawler(scroll_count, post_queue)
-    crawler_thread = threading.Thread(target=crawler.crawl)
-    crawler_thread.start()
+    if args.reextract_stale:
+        reextracted, skipped, failed = reextract_stale(get_database(), args.workers)
+        print(f"Finish Re-extracting: {reextracted} updated, {failed} failed, {skipped} up to date")
+        print_embedding_cache_stats(get_database())
+        print_llm_stats()
+        return
 
-    # Start Worker threads (Here set count to scroll_count / 2, min 1)
-    worker_count = max(1, scroll_count // 2)
-    workers = []
-    for _ in range(worker_count):
-        t = threading.Thread(target=worker, args=(post_queue,))
-        t.start()
-        workers.append(t)
+    # Bounded so that the crawler slows down when extraction lags behind
+    post_queue = DurableJobQueue(
+        Config.JOB_QUEUE_PATH,
+        maxsize=Config.CRAWLER_QUEUE_SIZE,
+        max_attempts=Config.JOB_MAX_ATTEMPTS,
+        backoff=Config.JOB_RETRY_BACKOFF,
+        lease_seconds=Config.JOB_LEASE_SECONDS,
+        retention=Config.JOB_RETENTION_DAYS * 86400,
+    )
+    if args.retry_failed:
+        print(f"Requeued {post_queue.requeue_failed()} failed jobs")
+    print(f"Job queue: {post_queue.counts()}")
+    if Config.LLM_PREWARM:
+        RentalExtractor.prewarm()
+
+    if args.drain:
+        drain(post_queue, args.workers)
+        print(f"Finish Draining: {post_queue.counts()}")
+        print_embedding_cache_stats(get_database())
+        print_llm_stats()
+        return
+
+    if args.replay:
+        from src.facebook_rental_crawler.replay import ReplayCrawler
+        crawler = ReplayCrawler(args.replay, post_queue)
+    else:
+        crawler = Crawler(args.scroll_count, post_queue, record_path=args.record)
+
+    run_pipeline(crawler, post_queue, args.workers)
+
+    print(f"Finish Crawling: {post_queue.counts()}")
+    if Config.EXTRACTION_CACHE_ENABLED:
+        cache = get_extraction_cache()
+        print(f"Extraction cache: {cache.hits} hits, {cache.llm_hits} LLM calls saved")
+    print_embedding_cache_stats(get_database())
+    print_llm_stats()
+
+
+def print_embedding_cache_stats(database):
+    cache = database.embedding_cache
+    if cache is None:
+        return
+    stats = cache.stats()
+    print(f"Embedding cache: {stats['memory_hits']} memory hits, {stats['disk_hits']} disk hits, "
+          f"{stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
 
-    # Wait for Crawler to finish
-    crawler_thread.join()
-    
-    # Wait for all queues to be processed
-    for t in workers:
-        t.join()
 
-    print("Finish Crawling")
+def print_llm_stats():
+    report = llm_stats.report()
+    if report:
+        print(f"LLM calls:\n{report}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
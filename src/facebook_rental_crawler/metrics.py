@@ -0,0 +1,47 @@
+import time
+import threading
+from contextlib import contextmanager
+
+
+class PipelineStats:
+    """
+    Thread-safe per-stage counters for the ingestion pipeline.
+    """
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._seconds = {}
+
+    @contextmanager
+    def stage(self, name, count=1):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(name, time.monotonic() - started, count)
+
+    def add(self, name, seconds, count=1):
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + count
+            self._seconds[name] = self._seconds.get(name, 0.0) + seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {name: (self._counts[name], self._seconds[name]) for name in self._counts}
+
+    def report(self):
+        """
+        One line per stage: items, busy time, items/s per busy second and
+        items/s over the wall clock since the stats were created.
+        """
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        lines = [f"Elapsed: {elapsed:.2f}s"]
+        for name, (count, seconds) in self.snapshot().items():
+            busy_rate = count / seconds if seconds > 0 else float("inf")
+            lines.append(
+                f"{name:<10} {count:>7} items  busy {seconds:8.2f}s  "
+                f"{busy_rate:9.2f}/s per worker  {count / elapsed:9.2f}/s wall"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+# Mersenne prime used for the MinHash permutations
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def normalize_post(text):
+    """
+    Normalize a post before shingling so that whitespace, width and case changes
+    do not count as differences.
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    return re.sub(r"\s+", "", text)
+
+
+class MinHasher:
+    """
+    Character-shingle MinHash signatures.
+    """
+
+    def __init__(self, num_perm=64, shingle_size=4, seed=1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        # Deterministic permutations so signatures stay comparable across runs
+        self.permutations = []
+        for i in range(num_perm):
+            digest = hashlib.sha256(f"{seed}:{i}".encode("utf-8")).digest()
+            a = int.from_bytes(digest[:8], "big") % (_PRIME - 1) + 1
+            b = int.from_bytes(digest[8:16], "big") % _PRIME
+            self.permutations.append((a, b))
+
+    def shingles(self, text):
+        text = normalize_post(text)
+        if len(text) <= self.shingle_size:
+            return {text} if text else set()
+        return {text[i: i + self.shingle_size] for i in range(len(text) - self.shingle_size + 1)}
+
+    def signature(self, text):
+        hashes = [
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "big")
+            for s in self.shingles(text)
+        ]
+        if not hashes:
+            return [_MAX_HASH] * self.num_perm
+        return [
+            min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self.permutations
+        ]
+
+    @staticmethod
+    def similarity(sig_a, sig_b):
+        """
+        Estimated Jaccard similarity of two signatures.
+        """
+        same = sum(1 for x, y in zip(sig_a, sig_b) if x == y)
+        return same / len(sig_a)
+
+
+class NearDuplicateIndex:
+    """
+    LSH bucket index over MinHash signatures, persisted as JSON lines.
+    A post is a variant of an indexed post when their estimated similarity
+    reaches `threshold`.
+    """
+
+    def __init__(self, path, threshold=0.8, num_perm=64, bands=16):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.path = path
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm=num_perm)
+
+        self.signatures = {}
+        self.buckets = [defaultdict(set) for _ in range(bands)]
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def find(self, text):
+        """
+        Return the ID of the most similar indexed post, or None when nothing
+        reaches the threshold.
+        """
+        return self.find_signature(self.hasher.signature(text))
+
+    def find_signature(self, signature):
+        best_id, best_score = None, self.threshold
+        with self._lock:
+            for post_id in self._candidates(signature):
+                score = MinHasher.similarity(signature, self.signatures[post_id])
+                if score >= best_score:
+                    best_id, best_score = post_id, score
+        return best_id
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def add(self, post_id, text):
+        self.add_signature(post_id, self.hasher.signature(text))
+
+    def backfill(self, collection, page_size=1000):
+        """
+        Index the documents already stored in a Chroma collection, page by page.
+        Only needed when the index file does not exist yet, e.g. on the first run
+        with an existing collection; otherwise every old repost would be treated as new.
+        The index is written to a temporary file and moved into place only after the
+        last page, so a failed backfill leaves no file behind and runs again next time.
+        :return: The number of posts added.
+        """
+        added = 0
+        offset = 0
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            with self._lock:
+                f.writelines(
+                    json.dumps({"id": post_id, "signature": signature}) + "\n"
+                    for post_id, signature in self.signatures.items()
+                )
+            while True:
+                page = collection.get(include=["documents"], limit=page_size, offset=offset)
+                ids = page.get("ids", [])
+                if not ids:
+                    break
+                lines = []
+                for post_id, document in zip(ids, page["documents"]):
+                    signature = self.hasher.signature(document or "")
+                    with self._lock:
+                        if post_id in self.signatures:
+                            continue
+                        self._index(post_id, signature)
+                    lines.append(json.dumps({"id": post_id, "signature": signature}) + "\n")
+                f.writelines(lines)
+                added += len(lines)
+                offset += len(ids)
+                print(f"Near-duplicate index backfill: {offset} posts scanned")
+                if len(ids) < page_size:
+                    break
+        with self._lock:
+            os.replace(tmp_path, self.path)
+        return added
+
+    def add_signature(self, post_id, signature):
+        with self._lock:
+            if post_id in self.signatures:
+                return
+            self._index(post_id, signature)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"id": post_id, "signature": signature}) + "\n")
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield band, tuple(signature[start: start + self.rows])
+
+    def _candidates(self, signature):
+        candidates = set()
+        for band, key in self._band_keys(signature):
+            candidates.update(self.buckets[band].get(key, ()))
+        return candidates
+
+    def _index(self, post_id, signature):
+        self.signatures[post_id] = signature
+        for band, key in self._band_keys(signature):
+            self.buckets[band][key].add(post_id)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if len(record["signature"]) == self.hasher.num_perm:
+                    self._index(record["id"], record["signature"])
@@ -1,4 +1,9 @@
-PROMPT_TEMPLATE = """
+import hashlib
+import json
+
+# Fixed instructions go in the system message so that the server can reuse the evaluated prefix;
+# the user message only carries the post.
+EXTRACT_SYSTEM_PROMPT = """
 你是一個專門為向量資料庫 (Vector DB) 提取 Metadata 的 AI 助理。
 請閱讀以下租屋貼文，並提取出適合用於「條件篩選」的關鍵欄位。
 
@@ -55,7 +60,76 @@ PROMPT_TEMPLATE = """
 
 【重要限制】
 僅回傳 JSON 物件本身，不要加上 ```json 或任何 markdown 標記。
+"""
+
+POST_USER_TEMPLATE = """貼文內容如下：
+{text}
+"""
+
+# Single-message form, for callers without a system message
+PROMPT_TEMPLATE = EXTRACT_SYSTEM_PROMPT + "\n" + POST_USER_TEMPLATE
+
+# 每個欄位的簡短定義，用於只補齊規則抽取未能確定之欄位的精簡 Prompt
+FIELD_DEFINITIONS = {
+    "city": '"city": 縣市 (String), 例如 "台南市", 若無則填空字串',
+    "district": '"district": 行政區 (String), 例如 "東區", 若無則填空字串',
+    "address": '"address": 完整路名/地址 (String), 例如 "凱旋路31號"',
+    "price_min": '"price_min": 最低租金 (Int), 單一價格時與 price_max 相同, 含管理費',
+    "price_max": '"price_max": 最高租金 (Int), 單一價格時與 price_min 相同, 含管理費',
+    "size_min": '"size_min": 最小坪數 (Float), 無資訊填 0.0',
+    "size_max": '"size_max": 最大坪數 (Float), 無資訊填 0.0',
+    "layout_room": '"layout_room": 房數 (Int), 缺漏填 0',
+    "layout_hall": '"layout_hall": 廳數 (Int), 缺漏填 0',
+    "layout_bath": '"layout_bath": 衛數 (Int), 缺漏填 0',
+    "can_pet": '"can_pet": 可養寵物 (Int, -1 未提及 / 0 否 / 1 是)',
+    "can_cook": '"can_cook": 可開伙 (Int, -1 未提及 / 0 否 / 1 是)',
+    "has_elevator": '"has_elevator": 有電梯 (Int, -1 未提及 / 0 否 / 1 是)',
+    "has_parking": '"has_parking": 有車位, 機車或汽車皆算 (Int, -1 未提及 / 0 否 / 1 是)',
+    "is_student": '"is_student": 限學生 (Int, -1 未提及 / 0 不限或限上班族 / 1 限學生)',
+    "gender_restriction": '"gender_restriction": 性別限制 (Int, 0 不限 / 1 限男 / 2 限女)',
+    "contact_info_json": '"contact_info_json": 聯絡人 JSON String, 例如 \'[{"name": "王先生", "phone": "0912...", "line_id": ["abc"]}]\', 無則 "[]"',
+    "photos_json": '"photos_json": 圖片連結 JSON String, 例如 \'["http://img1.jpg"]\', 無則 "[]"',
+}
+
+PARTIAL_SYSTEM_PROMPT = """
+你是一個專門為向量資料庫 (Vector DB) 提取 Metadata 的 AI 助理。
+請閱讀使用者提供的租屋貼文，只提取指定的欄位，回傳一個扁平 JSON 物件 (不要加上 markdown 標記，不要包含其他欄位)。
+數值欄位若無法辨識，請填入 0 或 -1 (依欄位定義)。
+"""
+
+PARTIAL_USER_TEMPLATE = """只提取下列欄位：
+{fields}
 
 貼文內容如下：
 {text}
-"""
\ No newline at end of file
+"""
+
+# 一次處理多篇貼文的 Prompt；固定說明只出現一次，由多篇貼文分攤，貼文本身放在 user message
+BATCH_SYSTEM_TEMPLATE = """
+你是一個專門為向量資料庫 (Vector DB) 提取 Metadata 的 AI 助理。
+使用者會提供多篇租屋貼文，每篇以「### 貼文 <id>」開頭。請逐篇提取欄位。
+
+【輸出目標】
+回傳一個 JSON 陣列，每篇貼文對應一個扁平 JSON 物件，且必須包含 "id" 欄位 (String, 與貼文標題中的 id 相同)。
+不要包含巢狀字典，不要加上 ```json 或任何 markdown 標記。
+
+【每個物件的欄位】
+{fields}
+
+【處理邏輯補充】
+1. 數值欄位若無法辨識，請填入 0 或 -1 (依上述定義)。
+2. 每篇貼文獨立判斷，不要把其他貼文的資訊填入。
+"""
+
+BATCH_POST_TEMPLATE = """### 貼文 {id}
+{text}
+"""
+
+BATCH_SYSTEM_PROMPT = BATCH_SYSTEM_TEMPLATE.replace("{fields}", "\n".join(FIELD_DEFINITIONS.values()))
+
+# 以上所有抽取 Prompt 的版本；任一 Prompt 變動時，抽取快取便會失效
+PROMPT_HASH = hashlib.sha256(json.dumps(
+    [EXTRACT_SYSTEM_PROMPT, POST_USER_TEMPLATE, PARTIAL_SYSTEM_PROMPT, PARTIAL_USER_TEMPLATE,
+     BATCH_SYSTEM_TEMPLATE, BATCH_POST_TEMPLATE, FIELD_DEFINITIONS],
+    ensure_ascii=False, sort_keys=True,
+).encode("utf-8")).hexdigest()[:16]
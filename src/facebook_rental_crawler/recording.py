@@ -0,0 +1,44 @@
+import json
+import os
+import threading
+import time
+
+
+class PostRecorder:
+    """
+    Append harvested post batches to a JSON-lines file, one batch per line:
+    {"ts": <unix time>, "posts": [{"key": ..., "text": ...}, ...]}
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def record(self, posts):
+        line = json.dumps({"ts": time.time(), "posts": posts}, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_recording(path):
+    """
+    Yield the recorded batches in order, skipping truncated lines.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)["posts"]
+            except (json.JSONDecodeError, KeyError):
+                continue
@@ -0,0 +1,34 @@
+import time
+import logging
+from src.facebook_rental_crawler.crawler import Crawler
+from src.facebook_rental_crawler.database import get_database
+from src.facebook_rental_crawler.recording import read_recording
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayCrawler(Crawler):
+    """
+    Feed a recording made with `Crawler(record_path=...)` through the same
+    dedup / post_queue path as a live crawl, without starting Chrome.
+    """
+
+    def __init__(self, recording_path, post_queue, database=None, verbose=True, stats=None):
+        self.recording_path = recording_path
+        self.recorder = None
+        self.stats = stats
+        self._init_state(post_queue, database or get_database(), verbose=verbose)
+
+    def crawl(self):
+        logger.info(f"Replaying {self.recording_path}")
+        try:
+            for batch in read_recording(self.recording_path):
+                started = time.monotonic()
+                self.ingest_posts(batch)
+                if self.stats:
+                    self.stats.add("harvest", time.monotonic() - started, count=len(batch))
+        except Exception as e:
+            print(e)
+        finally:
+            self.queue.put(Crawler.POISON_PILL)
+            logger.info(f"Replay finished, {len(self.post_set)} new posts")
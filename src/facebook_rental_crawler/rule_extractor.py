@@ -0,0 +1,230 @@
+import json
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from src.rag_service.schema import METADATA_DEFAULTS
+from src.gazetteer import CITY_ALIASES, DISTRICT_ALIASES, resolve_location
+from src.utils import NUMBER_PATTERN, parse_chinese_number
+
+# Bump when the rules change, so that cached extractions made with the old rules are not reused
+RULE_EXTRACTOR_VERSION = 1
+
+# The flat schema of PROMPT_TEMPLATE, with the values used when a field is not mentioned
+DEFAULT_METADATA = METADATA_DEFAULTS
+
+_NUM = NUMBER_PATTERN
+_SMALL_NUM = r"[\d一二兩三四五六七八九十]"
+_RANGE = r"\s*[~\-～〜至到]\s*"
+
+_PRICE_PATTERNS = [
+    # 租金 / 月租 5000 (~ 6000)
+    (re.compile(rf"(?:租金|月租|房租|租價|價格|售價|每月|月付|租)\s*[:：]?\s*(?:NT\$?|\$)?\s*({_NUM})(?:{_RANGE}({_NUM}))?"), 0.9),
+    # 5000元/月、5000/月
+    (re.compile(rf"({_NUM})(?:{_RANGE}({_NUM}))?\s*(?:元|塊)?\s*[/／]\s*月"), 0.85),
+    # 5000元
+    (re.compile(rf"({_NUM})(?:{_RANGE}({_NUM}))?\s*(?:元|塊)"), 0.6),
+]
+_MANAGEMENT_FEE = re.compile(rf"管理費\s*[:：]?\s*({_NUM})")
+_SIZE = re.compile(rf"({_NUM})(?:{_RANGE}({_NUM}))?\s*坪")
+_LAYOUT = re.compile(
+    rf"({_SMALL_NUM})\s*房(?:\s*({_SMALL_NUM}|零)\s*廳)?(?:\s*({_SMALL_NUM})\s*(?:衛|衛浴|浴))?"
+)
+_PHONE = re.compile(r"09\d{2}[-\s]?\d{3}[-\s]?\d{3}")
+_LINE_ID = re.compile(r"(?:line|LINE|Line)\s*(?:id|ID|Id)?\s*[:：]?\s*([A-Za-z0-9_.\-@]{3,})")
+_CONTACT_NAME = re.compile(r"([\u4e00-\u9fff])(?:先生|小姐|太太|媽媽|姐|哥)")
+_PHOTO_URL = re.compile(r"https?://\S+?\.(?:jpg|jpeg|png|webp|gif)", re.IGNORECASE)
+_ADDRESS = re.compile(
+    r"([\u4e00-\u9fff]{1,5}(?:路|街|大道)(?:[一二三四五六七八九十]段)?(?:\d+巷)?(?:\d+弄)?(?:\d+(?:之\d+)?號)?)"
+)
+_ADDRESS_PREFIXES = ("地址", "位於", "位在", "鄰近", "靠近", "附近", "近", "在", "於")
+
+# (field, negative patterns, positive patterns); negatives are checked first because they contain the positives
+_FLAGS = [
+    ("can_pet", ["不可養", "不能養", "禁養", "禁止寵物", "謝絕寵物", "不可寵", "不接受寵物", "無法養"],
+     ["可養寵物", "可養貓", "可養狗", "寵物友善", "可寵", "可養", "歡迎毛小孩"]),
+    ("can_cook", ["不可開伙", "不能開伙", "禁止開伙", "不可煮", "禁開伙", "不開伙"],
+     ["可開伙", "可煮", "可炊", "有廚房", "可烹飪"]),
+    ("has_elevator", ["無電梯", "沒有電梯", "沒電梯", "無 電梯"],
+     ["電梯"]),
+    ("has_parking", ["無車位", "沒有車位", "無停車位", "沒車位", "無停車"],
+     ["車位", "停車位", "可停車", "停車場", "車庫"]),
+    ("is_student", ["不限學生", "限上班族", "上班族優先"],
+     ["限學生", "僅限學生", "只租學生", "學生限定", "限在學"]),
+]
+_GENDER_ANY = ["男女不限", "不限男女", "性別不限", "不限性別"]
+_GENDER_MALE = ["限男", "男生限定", "只租男", "僅限男", "男性"]
+_GENDER_FEMALE = ["限女", "女生限定", "只租女", "僅限女", "女性"]
+
+
+@dataclass
+class RuleExtraction:
+    metadata: Dict = field(default_factory=lambda: dict(DEFAULT_METADATA))
+    confidence: Dict[str, float] = field(default_factory=lambda: {k: 0.0 for k in DEFAULT_METADATA})
+
+    def set(self, name, value, confidence):
+        self.metadata[name] = value
+        self.confidence[name] = confidence
+
+    def unresolved(self, threshold: float, fields: Optional[List[str]] = None) -> List[str]:
+        fields = fields if fields is not None else list(DEFAULT_METADATA)
+        return [name for name in fields if self.confidence.get(name, 0.0) < threshold]
+
+
+class RuleExtractor:
+    """
+    Deterministic extractor for the flat metadata schema of PROMPT_TEMPLATE.
+    Each field gets a confidence in [0, 1]; fields below the caller's threshold
+    should be left to the LLM.
+    """
+
+    def __init__(self, default_city: Optional[str] = None):
+        self.default_city = default_city
+
+    def extract(self, text: str) -> RuleExtraction:
+        text = unicodedata.normalize("NFKC", text).replace("臺", "台")
+        result = RuleExtraction()
+        self._location(text, result)
+        self._address(text, result)
+        self._price(text, result)
+        self._size(text, result)
+        self._layout(text, result)
+        self._flags(text, result)
+        self._gender(text, result)
+        self._contact(text, result)
+        self._photos(text, result)
+        return result
+
+    def _location(self, text, result):
+        city, district, city_confidence, district_confidence = resolve_location(text, self.default_city)
+        result.set("city", city, city_confidence)
+        result.set("district", district, district_confidence)
+
+    def _address(self, text, result):
+        match = _ADDRESS.search(text)
+        if not match:
+            result.set("address", "", 0.5)
+            return
+        address = match.group(1)
+        # Strip a leading city / district / label that the greedy match swallowed
+        changed = True
+        while changed:
+            changed = False
+            for prefix in (*_ADDRESS_PREFIXES, *CITY_ALIASES, *DISTRICT_ALIASES):
+                if address.startswith(prefix) and len(address) > len(prefix) + 1:
+                    address = address[len(prefix):]
+                    changed = True
+        result.set("address", address, 0.8 if "號" in address else 0.6)
+
+    @staticmethod
+    def _amount(raw):
+        value = parse_chinese_number(raw) if raw else None
+        # Rents outside this range are more likely deposits, phone fragments or years
+        if value is None or not 1000 <= value <= 200000:
+            return None
+        return int(round(value))
+
+    def _price(self, text, result):
+        prices = []
+        confidence = 0.0
+        for pattern, pattern_confidence in _PRICE_PATTERNS:
+            for match in pattern.finditer(text):
+                low = self._amount(match.group(1))
+                high = self._amount(match.group(2)) if match.group(2) else low
+                if low is None or high is None:
+                    continue
+                prices.extend([low, high])
+                confidence = max(confidence, pattern_confidence)
+            if prices:
+                break
+
+        if not prices:
+            result.set("price_min", 0, 0.0)
+            result.set("price_max", 0, 0.0)
+            return
+
+        if len(set(prices)) > 2:
+            # Several rooms with different prices
+            confidence = min(confidence, 0.8)
+        if _MANAGEMENT_FEE.search(text) and "含管理費" not in text:
+            # The fee may need to be added to the rent; let the LLM decide
+            confidence = min(confidence, 0.6)
+
+        result.set("price_min", min(prices), confidence)
+        result.set("price_max", max(prices), confidence)
+
+    def _size(self, text, result):
+        sizes = []
+        for match in _SIZE.finditer(text):
+            for raw in match.groups():
+                value = parse_chinese_number(raw) if raw else None
+                if value is not None and 0 < value < 500:
+                    sizes.append(float(value))
+        if sizes:
+            result.set("size_min", min(sizes), 0.9)
+            result.set("size_max", max(sizes), 0.9)
+        else:
+            result.set("size_min", 0.0, 0.75)
+            result.set("size_max", 0.0, 0.75)
+
+    def _layout(self, text, result):
+        match = _LAYOUT.search(text)
+        if match:
+            room, hall, bath = (parse_chinese_number(g) if g else None for g in match.groups())
+            result.set("layout_room", int(room or 0), 0.9)
+            result.set("layout_hall", int(hall or 0), 0.9 if hall is not None else 0.7)
+            result.set("layout_bath", int(bath or 0), 0.9 if bath is not None else 0.7)
+        elif "套房" in text:
+            result.set("layout_room", 1, 0.8)
+            result.set("layout_hall", 0, 0.75)
+            result.set("layout_bath", 1, 0.8)
+        elif "雅房" in text:
+            result.set("layout_room", 1, 0.8)
+            result.set("layout_hall", 0, 0.75)
+            result.set("layout_bath", 0, 0.75)
+        else:
+            for name in ("layout_room", "layout_hall", "layout_bath"):
+                result.set(name, 0, 0.3)
+
+    def _flags(self, text, result):
+        for name, negatives, positives in _FLAGS:
+            if any(word in text for word in negatives):
+                result.set(name, 0, 0.9)
+            elif any(word in text for word in positives):
+                result.set(name, 1, 0.9)
+            else:
+                result.set(name, -1, 0.8)
+
+    def _gender(self, text, result):
+        male = any(word in text for word in _GENDER_MALE)
+        female = any(word in text for word in _GENDER_FEMALE)
+        if any(word in text for word in _GENDER_ANY):
+            result.set("gender_restriction", 0, 0.9)
+        elif male and female:
+            # e.g. different rooms for men and women
+            result.set("gender_restriction", 0, 0.4)
+        elif male:
+            result.set("gender_restriction", 1, 0.85)
+        elif female:
+            result.set("gender_restriction", 2, 0.85)
+        else:
+            result.set("gender_restriction", 0, 0.8)
+
+    def _contact(self, text, result):
+        phones = [re.sub(r"[-\s]", "", p) for p in _PHONE.findall(text)]
+        line_ids = _LINE_ID.findall(text)
+        names = [m.group(0) for m in _CONTACT_NAME.finditer(text)]
+        if not (phones or line_ids):
+            result.set("contact_info_json", "[]", 0.5)
+            return
+        contact = {
+            "name": names[0] if names else "",
+            "phone": phones[0] if phones else "",
+            "line_id": list(dict.fromkeys(line_ids)),
+        }
+        result.set("contact_info_json", json.dumps([contact], ensure_ascii=False), 0.75)
+
+    def _photos(self, text, result):
+        photos = list(dict.fromkeys(_PHOTO_URL.findall(text)))
+        result.set("photos_json", json.dumps(photos, ensure_ascii=False), 0.9)
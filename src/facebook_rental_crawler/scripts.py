@@ -0,0 +1,105 @@
+"""
+JavaScript snippets injected into the Facebook group page through
+`driver.execute_script` / `driver.execute_async_script`. The last argument
+of every async script is the Selenium callback.
+"""
+
+HARVEST_POSTS_SCRIPT = """
+const settleMs = arguments[0];
+const timeoutMs = arguments[1];
+const done = arguments[arguments.length - 1];
+
+const MESSAGE_SELECTOR = "div[data-ad-preview='message']";
+const SEE_MORE_XPATH = "//div[text()='查看更多'] | //div[text()='See more']";
+const KEY_ATTRIBUTE = "data-crawler-key";
+
+// 1. Expand every visible "查看更多" / "See more" button
+const buttons = document.evaluate(SEE_MORE_XPATH, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+for (let i = 0; i < buttons.snapshotLength; i++) {
+    const button = buttons.snapshotItem(i);
+    if (button.offsetParent !== null) {
+        try { button.click(); } catch (e) {}
+    }
+}
+
+// 2. Wait until the DOM has been quiet for settleMs (or timeoutMs has passed)
+const collect = () => {
+    window.__crawlerSeq = window.__crawlerSeq || 0;
+    const posts = [];
+    for (const node of document.querySelectorAll(MESSAGE_SELECTOR)) {
+        if (node.hasAttribute(KEY_ATTRIBUTE)) continue;
+        const text = (node.innerText || "").trim();
+        // Leave unexpanded or empty posts for the next harvest
+        if (!text || text.includes("查看更多") || text.includes("See more")) continue;
+        const key = String(++window.__crawlerSeq);
+        node.setAttribute(KEY_ATTRIBUTE, key);
+        posts.push({key: key, text: text});
+    }
+    return JSON.stringify(posts);
+};
+
+let settleTimer = null;
+let finished = false;
+const finish = () => {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearTimeout(settleTimer);
+    clearTimeout(deadline);
+    done(collect());
+};
+const observer = new MutationObserver(() => {
+    clearTimeout(settleTimer);
+    settleTimer = setTimeout(finish, settleMs);
+});
+observer.observe(document.body, {childList: true, subtree: true, characterData: true});
+settleTimer = setTimeout(finish, settleMs);
+const deadline = setTimeout(finish, timeoutMs);
+"""
+
+INSTALL_POST_OBSERVER_SCRIPT = """
+const MESSAGE_SELECTOR = "div[data-ad-preview='message']";
+
+if (!window.__crawlerPostObserver) {
+    window.__crawlerPostCount = document.querySelectorAll(MESSAGE_SELECTOR).length;
+    window.__crawlerWaiters = [];
+    window.__crawlerPostObserver = new MutationObserver((mutations) => {
+        let added = 0;
+        for (const mutation of mutations) {
+            for (const node of mutation.addedNodes) {
+                if (node.nodeType !== Node.ELEMENT_NODE) continue;
+                if (node.matches(MESSAGE_SELECTOR)) added++;
+                added += node.querySelectorAll(MESSAGE_SELECTOR).length;
+            }
+        }
+        if (added === 0) return;
+        window.__crawlerPostCount += added;
+        const waiters = window.__crawlerWaiters;
+        window.__crawlerWaiters = [];
+        waiters.forEach((notify) => notify());
+    });
+    window.__crawlerPostObserver.observe(document.body, {childList: true, subtree: true});
+}
+return window.__crawlerPostCount;
+"""
+
+WAIT_FOR_NEW_POSTS_SCRIPT = """
+const baseline = arguments[0];
+const timeoutMs = arguments[1];
+const done = arguments[arguments.length - 1];
+
+if (!window.__crawlerPostObserver) {
+    done({count: -1, timed_out: true});
+} else if (window.__crawlerPostCount > baseline) {
+    done({count: window.__crawlerPostCount, timed_out: false});
+} else {
+    let finished = false;
+    const finish = (timedOut) => {
+        if (finished) return;
+        finished = true;
+        done({count: window.__crawlerPostCount, timed_out: timedOut});
+    };
+    window.__crawlerWaiters.push(() => finish(false));
+    setTimeout(() => finish(true), timeoutMs);
+}
+"""
@@ -0,0 +1,107 @@
+import time
+import logging
+from src.facebook_rental_crawler.scripts import INSTALL_POST_OBSERVER_SCRIPT, WAIT_FOR_NEW_POSTS_SCRIPT
+
+logger = logging.getLogger(__name__)
+
+
+class ScrollStats:
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.scrolls = 0
+        self.waits = 0
+        self.idle_waits = 0
+        self.wait_seconds = 0.0
+        self.posts = 0
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        return (
+            f"Scroll stats: {self.posts} posts in {elapsed:.1f}s "
+            f"({self.posts / elapsed:.2f} posts/s), {self.scrolls} scrolls, "
+            f"{self.idle_waits}/{self.waits} idle waits, {self.wait_seconds:.1f}s waiting"
+        )
+
+
+class AdaptiveScroller:
+    """
+    Event-driven scrolling: a MutationObserver injected into the page reports
+    new `data-ad-preview='message'` nodes, so waits return as soon as content
+    arrives instead of sleeping a fixed amount of time. The scroll step grows
+    when posts load quickly and shrinks when they load slowly.
+    """
+
+    def __init__(self, driver, initial_step=1500, min_step=500, max_step=6000,
+                 target_latency=0.5, timeout=3.0):
+        self.driver = driver
+        self.step = initial_step
+        self.min_step = min_step
+        self.max_step = max_step
+        self.target_latency = target_latency
+        self.timeout = timeout
+
+        self.post_count = 0
+        self.latency = None
+        self.stats = ScrollStats()
+
+    def install(self):
+        """
+        Install the observer and start a new run's stats; must be called again after every page navigation.
+        """
+        self.reinstall()
+        self.stats = ScrollStats()
+
+    def reinstall(self):
+        """
+        Re-install the observer after the page lost it, keeping the current run's stats.
+        """
+        self.post_count = self.driver.execute_script(INSTALL_POST_OBSERVER_SCRIPT) or 0
+
+    def wait_for_new_posts(self, timeout=None):
+        """
+        Block until the observer sees new posts or the timeout expires.
+        :return: True if new posts arrived.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        result = self.driver.execute_async_script(WAIT_FOR_NEW_POSTS_SCRIPT, self.post_count, int(timeout * 1000))
+        elapsed = time.monotonic() - started
+
+        self.stats.waits += 1
+        self.stats.wait_seconds += elapsed
+
+        if result["count"] < 0:
+            # The page was reloaded and lost the observer
+            self.reinstall()
+            return False
+
+        self.post_count = result["count"]
+        if result["timed_out"]:
+            self.stats.idle_waits += 1
+            return False
+
+        self.latency = elapsed if self.latency is None else 0.7 * self.latency + 0.3 * elapsed
+        return True
+
+    def scroll_by(self, size):
+        self.driver.execute_script(f"window.scrollBy(0, {int(size)});")
+        self.stats.scrolls += 1
+
+    def scroll_and_wait(self):
+        """
+        Scroll one adaptive step and wait for the next batch of posts.
+        :return: True if new posts arrived.
+        """
+        self.scroll_by(self.step)
+        arrived = self.wait_for_new_posts()
+        self._adapt(arrived)
+        return arrived
+
+    def _adapt(self, arrived):
+        if not arrived:
+            # Nothing loaded: scroll further next time to trigger the feed loader
+            factor = 1.5
+        else:
+            factor = min(2.0, max(0.5, self.target_latency / max(self.latency, 1e-3)))
+        self.step = int(min(self.max_step, max(self.min_step, self.step * factor)))
+        logger.debug(f"Scroll step -> {self.step}px (latency={self.latency})")
@@ -0,0 +1,203 @@
+import math
+import queue
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    """
+    Extraction workers sized from measured processing latency instead of the scroll count.
+    Posts come from a DurableJobQueue and are acked / nacked after processing.
+
+    Every `interval` seconds the monitor estimates how many workers are needed to
+    clear the current backlog plus the recent arrival rate within one interval
+    (Little's law: workers = items * latency / interval), bounded by
+    [min_workers, max_workers]. Surplus workers retire when they go idle.
+
+    With `batch_size` > 1 each worker collects a micro-batch: after the first
+    post it keeps taking posts for at most `batch_wait` seconds and hands the
+    batch to `extractor.process_batch`, so several posts share one LLM request.
+    """
+
+    def __init__(self, post_queue, extractor_factory, max_workers, min_workers=1,
+                 interval=2.0, report_interval=10.0, poison_pill=None, batch_size=1, batch_wait=0.5):
+        self.queue = post_queue
+        self.extractor_factory = extractor_factory
+        self.max_workers = max(1, max_workers)
+        self.min_workers = max(1, min(min_workers, self.max_workers))
+        self.interval = interval
+        self.report_interval = report_interval
+        self.poison_pill = poison_pill
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+
+        self.target = self.min_workers
+        self.latency = None
+
+        self._lock = threading.Lock()
+        self._workers = {}
+        self._next_id = 0
+        self._busy = 0
+        self._busy_seconds = 0.0
+        self._completed = 0
+        self._failed = 0
+        self._closing = threading.Event()
+        self._monitor_thread = None
+
+    def start(self):
+        for _ in range(self.min_workers):
+            self._spawn()
+        self._monitor_thread = threading.Thread(target=self._monitor, daemon=True)
+        self._monitor_thread.start()
+
+    def join(self):
+        """
+        Wait until the poison pill has stopped every worker.
+        """
+        while True:
+            with self._lock:
+                threads = list(self._workers.values())
+            if not threads:
+                break
+            for t in threads:
+                t.join()
+        self._closing.set()
+        logger.info(self.status())
+
+    def status(self):
+        with self._lock:
+            return (
+                f"queue depth={self.queue.qsize()} workers={len(self._workers)}/{self.target} "
+                f"busy={self._busy} done={self._completed} failed={self._failed} "
+                f"latency={(self.latency or 0):.2f}s"
+            )
+
+    def _spawn(self):
+        with self._lock:
+            worker_id = self._next_id
+            self._next_id += 1
+            t = threading.Thread(target=self._run, args=(worker_id,), daemon=True)
+            self._workers[worker_id] = t
+        t.start()
+
+    def _retire(self, worker_id):
+        with self._lock:
+            if len(self._workers) <= self.target or len(self._workers) <= self.min_workers:
+                return False
+            del self._workers[worker_id]
+            return True
+
+    def _next_batch(self):
+        """
+        Block up to `interval` for the first post, then collect more until the
+        batch is full, `batch_wait` has passed or the poison pill shows up.
+        """
+        batch = [self.queue.get(timeout=self.interval)]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size and batch[-1] is not self.poison_pill:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _process(extractor, posts):
+        if len(posts) > 1 and hasattr(extractor, "process_batch"):
+            return extractor.process_batch(posts)
+        results = []
+        for post in posts:
+            try:
+                results.append(extractor.process(post))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _run(self, worker_id):
+        extractor = self.extractor_factory()
+        while True:
+            try:
+                posts = self._next_batch()
+            except queue.Empty:
+                if self._retire(worker_id):
+                    return
+                continue
+
+            stopping = posts[-1] is self.poison_pill
+            if stopping:
+                posts.pop()
+
+            if posts:
+                self._handle(extractor, posts)
+
+            if stopping:
+                # Put back Poison Pill to let other workers stop
+                self._closing.set()
+                self.queue.put(self.poison_pill)
+                with self._lock:
+                    self._workers.pop(worker_id, None)
+                return
+
+    def _handle(self, extractor, posts):
+        with self._lock:
+            self._busy += 1
+        started = time.monotonic()
+        completed = failed = 0
+        try:
+            results = self._process(extractor, posts)
+        except Exception as e:
+            results = [e] * len(posts)
+        for post, result in zip(posts, results):
+            if isinstance(result, Exception):
+                failed += 1
+                # The job queue keeps the post and schedules a retry
+                self.queue.nack(post, result)
+            else:
+                completed += 1
+                self.queue.ack(post)
+                print(result)
+            self.queue.task_done()
+
+        # Latency per post, so that the sizing below stays in items
+        elapsed = (time.monotonic() - started) / len(posts)
+        with self._lock:
+            self._busy -= 1
+            self._busy_seconds += elapsed * len(posts)
+            self._completed += completed
+            self._failed += failed
+            self.latency = elapsed if self.latency is None else 0.8 * self.latency + 0.2 * elapsed
+
+    def _monitor(self):
+        last_report = time.monotonic()
+        last_done = 0
+        last_busy_seconds = 0.0
+        while not self._closing.wait(self.interval):
+            with self._lock:
+                done = self._completed + self._failed
+                arrived = done - last_done
+                busy_seconds = self._busy_seconds - last_busy_seconds
+                last_done, last_busy_seconds = done, self._busy_seconds
+                workers = len(self._workers)
+                latency = self.latency
+
+            depth = self.queue.qsize()
+            if latency is not None:
+                needed = math.ceil((depth + arrived) * latency / self.interval)
+                self.target = max(self.min_workers, min(self.max_workers, needed))
+            elif depth:
+                self.target = min(self.max_workers, workers + 1)
+
+            for _ in range(self.target - workers):
+                self._spawn()
+
+            now = time.monotonic()
+            if now - last_report >= self.report_interval:
+                utilization = busy_seconds / max(workers * self.interval, 1e-9)
+                logger.info(f"{self.status()} utilization={utilization:.0%}")
+                last_report = now
@@ -1,5 +1,9 @@
-from flask import Flask, render_template, request, redirect, session, jsonify
+from flask import Flask, Response, render_template, request, redirect, session, jsonify
 from flask_session import Session
+from src.query_generator.query_cache import get_query_cache
+from src.rag_service.backend_pool import pool_status
+from src.rag_service.client import coalescing_stats
+from src.rag_service.llm_stats import llm_stats
 from src.frontend.embedding_database import EmbeddingDatabase
 from src.frontend.user_service import UserService
 
@@ -102,5 +106,81 @@ def clean_history():
     user_service.clean_history(email)
     return redirect('history')
 
+# Monotonic counts, exported as counters (with the _total suffix); the other values are gauges
+COUNTERS = {
+    "llm_coalesce": ("requests", "coalesced"),
+    "query_cache": ("memory_hits", "redis_hits", "misses", "redis_errors"),
+    "embedding_cache": ("memory_hits", "disk_hits", "misses", "evictions"),
+    "query_parse": ("rules", "cache", "llm"),
+}
+
+
+def _prometheus_lines(prefix, values):
+    lines = []
+    for name, value in values.items():
+        if name in COUNTERS[prefix]:
+            lines.append(f"# TYPE {prefix}_{name}_total counter\n{prefix}_{name}_total {value}\n")
+        else:
+            lines.append(f"# TYPE {prefix}_{name} gauge\n{prefix}_{name} {value}\n")
+    return lines
+
+def _backend_lines(pools):
+    """
+    Per-backend pool metrics, labelled with the pool name and the backend URL
+    """
+    metrics = {
+        "llm_backend_healthy": "gauge",
+        "llm_backend_outstanding": "gauge",
+        "llm_backend_requests_total": "counter",
+        "llm_backend_failures_total": "counter",
+    }
+    samples = {name: [] for name in metrics}
+    for pool, backends in pools.items():
+        for backend in backends:
+            labels = f'{{pool="{pool}",backend="{backend["base_url"]}"}}'
+            samples["llm_backend_healthy"].append(f"llm_backend_healthy{labels} {int(backend['healthy'])}\n")
+            samples["llm_backend_outstanding"].append(f"llm_backend_outstanding{labels} {backend['outstanding']}\n")
+            samples["llm_backend_requests_total"].append(f"llm_backend_requests_total{labels} {backend['requests']}\n")
+            samples["llm_backend_failures_total"].append(f"llm_backend_failures_total{labels} {backend['failures']}\n")
+    return [
+        f"# TYPE {name} {kind}\n" + "".join(samples[name])
+        for name, kind in metrics.items() if samples[name]
+    ]
+
+@app.route("/metrics")
+def metrics():
+    # Prometheus text format by default, ?format=json for per-model summaries and recent calls
+    coalescing = coalescing_stats()
+    query_cache = get_query_cache()
+    query_cache_stats = query_cache.stats() if query_cache else {}
+    embedding_cache = embedding_database.embedding_database.embedding_cache
+    embedding_cache_stats = embedding_cache.stats() if embedding_cache else {}
+    query_parse = embedding_database.query_generator.parse_stats()
+    backends = pool_status()
+    if request.args.get("format") == "json":
+        try:
+            limit = int(request.args.get("limit", 100))
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        # The stats keep at most 1000 recent calls
+        limit = min(max(limit, 1), 1000)
+        return jsonify({
+            "models": llm_stats.snapshot(),
+            "recent": [record.to_dict() for record in llm_stats.recent(limit)],
+            "coalescing": coalescing,
+            "query_cache": query_cache_stats,
+            "embedding_cache": embedding_cache_stats,
+            "query_parse": query_parse,
+            "backends": backends,
+        })
+
+    lines = [llm_stats.to_prometheus()]
+    lines += _prometheus_lines("llm_coalesce", coalescing)
+    lines += _prometheus_lines("query_cache", query_cache_stats)
+    lines += _prometheus_lines("embedding_cache", embedding_cache_stats)
+    lines += _prometheus_lines("query_parse", query_parse)
+    lines += _backend_lines(backends)
+    return Response("".join(lines), mimetype="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     app.run(debug=False, host='0.0.0.0')
\ No newline at end of file
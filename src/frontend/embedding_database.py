@@ -1,8 +1,17 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Optional
+
 from src.config import Config
 from src.query_generator.query_generator import MiniRagApp
 from src.rag_service.llm_config import LLMConfig, LLMMode
 from src.rag_service.rag import RagService
 
+# Query parsing (possibly a seconds-long LLM call) runs here, shared by all request threads;
+# the embedding runs on the request thread, so it never queues behind older parses
+_parse_executor = ThreadPoolExecutor(max_workers=Config.SEARCH_WORKERS, thread_name_prefix="search-parse")
+
+
 class EmbeddingDatabase:
     def __init__(self):
         self.embedding_database =   RagService()
@@ -22,10 +31,7 @@ class EmbeddingDatabase:
         # Assuming _id is stored as a string in the existing database
         if (ids is None) or (len(ids) == 0):
             return []
-        query_result = self.embedding_database.collection.get(
-            ids=ids,
-            include=["documents", "metadatas"]
-        )
+        query_result = self.embedding_database.get(ids=ids)
         if (query_result is None) or (len(query_result) == 0):
             return []
 
@@ -39,28 +45,74 @@ class EmbeddingDatabase:
 
         return results
 
-    def search_rentals(self, query: str) -> list:
+    @staticmethod
+    def _timed(func, *args):
         """
-        Execute a search query using the provided MongoDB query document.
+        :return: A task returning (result, seconds taken)
         """
-        query_constraints = self.query_generator.format_query(query)
+        def run():
+            started = time.perf_counter()
+            result = func(*args)
+            return result, time.perf_counter() - started
+        return run
+
+    def search_rentals(self, query: str, deadline: Optional[float] = None, timings: Optional[dict] = None) -> list:
+        """
+        Parse the query into filters and embed it at the same time, then query Chroma
+        with the vector and the compiled filter.
+        :param deadline: Seconds to wait for the parse (default SEARCH_PARSE_DEADLINE, 0 = no limit).
+            When it runs out, the search uses the rule-based filters only; the parse keeps
+            running and fills the query cache for the next search.
+        :param timings: Filled with the stage timings (seconds) of this search.
         """
-        The output format of query_constraints is:
+        if (query is None) or (len(query) == 0):
+           return []
+
+        deadline = Config.SEARCH_PARSE_DEADLINE if deadline is None else deadline
+        started = time.perf_counter()
+        timings = {} if timings is None else timings
+        parse_future = _parse_executor.submit(self._timed(self.query_generator.format_query, query))
+
+        try:
+            query_embedding = self.embedding_database.embed_query(query)
+        except Exception as e:
+            print(f"Query embedding failed, letting Chroma embed the query: {e}")
+            query_embedding = None
+        timings["embed"] = time.perf_counter() - started
+
+        timeout = max(0.0, deadline - (time.perf_counter() - started)) if deadline > 0 else None
+        try:
+            query_constraints, timings["parse"] = parse_future.result(timeout=timeout)
+            timings["parse_timed_out"] = False
+        except FutureTimeout:
+            query_constraints = self.query_generator.rule_filters(query)
+            timings["parse_timed_out"] = True
+        except Exception as e:
+            print(f"Query parsing failed, using rule-based filters: {e}")
+            query_constraints = self.query_generator.rule_filters(query)
+        """
+        The output format of query_constraints is a compiled where clause, or None without conditions:
         {
             "$and": [
-              {"address": {"$in": ["凱旋路"]}}, // 或是讓語意搜尋處理 address，這裡 filter 留空也可以，看策略
+              {"address": {"$eq": "凱旋路"}},
               {"gender_restriction": {"$in": [0, 2]}} // 女生可以租「不限」或「限女」
             ]
         }
         """
-        if (query is None) or (len(query) == 0):
-           return []
-
-        query_result = self.embedding_database.collection.query(
-            query_texts=[query],
-            include=["documents", "metadatas"],
-            where=query_constraints
+        query_started = time.perf_counter()
+        query_result = self.embedding_database.query(
+            query,
+            filters=query_constraints,
+            n_results=10,
+            query_embedding=query_embedding,
+            include=["documents", "metadatas"]
         )
+        timings["query"] = time.perf_counter() - query_started
+        timings["total"] = time.perf_counter() - started
+        print("Search timings: " + ", ".join(
+            f"{name}={value:.3f}s" if isinstance(value, float) else f"{name}={value}"
+            for name, value in timings.items()
+        ))
 
         if (query_result is None) or (len(query_result) == 0):
             return []
@@ -0,0 +1,174 @@
+"""
+縣市 / 行政區對照表，供規則式抽取與查詢解析使用。名稱一律使用「台」而非「臺」。
+"""
+from typing import Dict, List, Optional, Tuple
+
+CITY_DISTRICTS: Dict[str, List[str]] = {
+    "台北市": ["中正區", "大同區", "中山區", "松山區", "大安區", "萬華區", "信義區", "士林區", "北投區", "內湖區", "南港區",
+              "文山區"],
+    "新北市": ["板橋區", "三重區", "中和區", "永和區", "新莊區", "新店區", "樹林區", "鶯歌區", "三峽區", "淡水區", "汐止區",
+              "瑞芳區", "土城區", "蘆洲區", "五股區", "泰山區", "林口區", "深坑區", "石碇區", "坪林區", "三芝區", "石門區",
+              "八里區", "平溪區", "雙溪區", "貢寮區", "金山區", "萬里區", "烏來區"],
+    "桃園市": ["桃園區", "中壢區", "大溪區", "楊梅區", "蘆竹區", "大園區", "龜山區", "八德區", "龍潭區", "平鎮區", "新屋區",
+              "觀音區", "復興區"],
+    "台中市": ["中區", "東區", "南區", "西區", "北區", "西屯區", "南屯區", "北屯區", "豐原區", "東勢區", "大甲區", "清水區",
+              "沙鹿區", "梧棲區", "后里區", "神岡區", "潭子區", "大雅區", "新社區", "石岡區", "外埔區", "大安區", "烏日區",
+              "大肚區", "龍井區", "霧峰區", "太平區", "大里區", "和平區"],
+    "台南市": ["中西區", "東區", "南區", "北區", "安平區", "安南區", "永康區", "歸仁區", "新化區", "左鎮區", "玉井區",
+              "楠西區", "南化區", "仁德區", "關廟區", "龍崎區", "官田區", "麻豆區", "佳里區", "西港區", "七股區", "將軍區",
+              "學甲區", "北門區", "新營區", "後壁區", "白河區", "東山區", "六甲區", "下營區", "柳營區", "鹽水區", "善化區",
+              "大內區", "山上區", "新市區", "安定區"],
+    "高雄市": ["鹽埕區", "鼓山區", "左營區", "楠梓區", "三民區", "新興區", "前金區", "苓雅區", "前鎮區", "旗津區", "小港區",
+              "鳳山區", "林園區", "大寮區", "大樹區", "大社區", "仁武區", "鳥松區", "岡山區", "橋頭區", "燕巢區", "田寮區",
+              "阿蓮區", "路竹區", "湖內區", "茄萣區", "永安區", "彌陀區", "梓官區", "旗山區", "美濃區", "六龜區", "甲仙區",
+              "杉林區", "內門區", "茂林區", "桃源區", "那瑪夏區"],
+    "基隆市": ["中正區", "七堵區", "暖暖區", "仁愛區", "中山區", "安樂區", "信義區"],
+    "新竹市": ["東區", "北區", "香山區"],
+    "嘉義市": ["東區", "西區"],
+    "新竹縣": ["竹北市", "竹東鎮", "新埔鎮", "關西鎮", "湖口鄉", "新豐鄉", "芎林鄉", "橫山鄉", "北埔鄉", "寶山鄉", "峨眉鄉",
+              "尖石鄉", "五峰鄉"],
+    "苗栗縣": ["苗栗市", "頭份市", "苑裡鎮", "通霄鎮", "竹南鎮", "後龍鎮", "卓蘭鎮", "大湖鄉", "公館鄉", "銅鑼鄉", "南庄鄉",
+              "頭屋鄉", "三義鄉", "西湖鄉", "造橋鄉", "三灣鄉", "獅潭鄉", "泰安鄉"],
+    "彰化縣": ["彰化市", "員林市", "和美鎮", "鹿港鎮", "溪湖鎮", "二林鎮", "田中鎮", "北斗鎮", "花壇鄉", "芬園鄉", "大村鄉",
+              "永靖鄉", "伸港鄉", "線西鄉", "福興鄉", "秀水鄉", "埔心鄉", "埔鹽鄉", "大城鄉", "芳苑鄉", "竹塘鄉", "社頭鄉",
+              "二水鄉", "田尾鄉", "埤頭鄉", "溪州鄉"],
+    "南投縣": ["南投市", "埔里鎮", "草屯鎮", "竹山鎮", "集集鎮", "名間鄉", "鹿谷鄉", "中寮鄉", "魚池鄉", "國姓鄉", "水里鄉",
+              "信義鄉", "仁愛鄉"],
+    "雲林縣": ["斗六市", "斗南鎮", "虎尾鎮", "西螺鎮", "土庫鎮", "北港鎮", "古坑鄉", "大埤鄉", "莿桐鄉", "林內鄉", "二崙鄉",
+              "崙背鄉", "麥寮鄉", "東勢鄉", "褒忠鄉", "台西鄉", "元長鄉", "四湖鄉", "口湖鄉", "水林鄉"],
+    "嘉義縣": ["太保市", "朴子市", "布袋鎮", "大林鎮", "民雄鄉", "溪口鄉", "新港鄉", "六腳鄉", "東石鄉", "義竹鄉", "鹿草鄉",
+              "水上鄉", "中埔鄉", "竹崎鄉", "梅山鄉", "番路鄉", "大埔鄉", "阿里山鄉"],
+    "屏東縣": ["屏東市", "潮州鎮", "東港鎮", "恆春鎮", "萬丹鄉", "長治鄉", "麟洛鄉", "九如鄉", "里港鄉", "鹽埔鄉", "高樹鄉",
+              "萬巒鄉", "內埔鄉", "竹田鄉", "新埤鄉", "枋寮鄉", "新園鄉", "崁頂鄉", "林邊鄉", "南州鄉", "佳冬鄉", "琉球鄉",
+              "車城鄉", "滿州鄉", "枋山鄉", "三地門鄉", "霧台鄉", "瑪家鄉", "泰武鄉", "來義鄉", "春日鄉", "獅子鄉", "牡丹鄉"],
+    "宜蘭縣": ["宜蘭市", "羅東鎮", "蘇澳鎮", "頭城鎮", "礁溪鄉", "壯圍鄉", "員山鄉", "冬山鄉", "五結鄉", "三星鄉", "大同鄉",
+              "南澳鄉"],
+    "花蓮縣": ["花蓮市", "鳳林鎮", "玉里鎮", "新城鄉", "吉安鄉", "壽豐鄉", "光復鄉", "豐濱鄉", "瑞穗鄉", "富里鄉", "秀林鄉",
+              "萬榮鄉", "卓溪鄉"],
+    "台東縣": ["台東市", "成功鎮", "關山鎮", "卑南鄉", "大武鄉", "太麻里鄉", "東河鄉", "長濱鄉", "鹿野鄉", "池上鄉", "綠島鄉",
+              "延平鄉", "海端鄉", "達仁鄉", "金峰鄉", "蘭嶼鄉"],
+    "澎湖縣": ["馬公市", "湖西鄉", "白沙鄉", "西嶼鄉", "望安鄉", "七美鄉"],
+    "金門縣": ["金城鎮", "金湖鎮", "金沙鎮", "金寧鄉", "烈嶼鄉", "烏坵鄉"],
+    "連江縣": ["南竿鄉", "北竿鄉", "莒光鄉", "東引鄉"],
+}
+
+
+def _city_aliases(city: str) -> List[str]:
+    # "台南市" 也常寫成 "台南"；縣則保留全名避免誤判 (例如 "新竹")
+    aliases = [city]
+    if city.endswith("市") and len(city) == 3:
+        aliases.append(city[:2])
+    return aliases
+
+
+def _district_aliases(district: str) -> List[str]:
+    # "永康區" 也常寫成 "永康"；單字行政區 (東區、北區...) 必須保留「區」
+    aliases = [district]
+    if len(district) >= 3:
+        aliases.append(district[:-1])
+    return aliases
+
+
+CITY_ALIASES: Dict[str, str] = {alias: city for city in CITY_DISTRICTS for alias in _city_aliases(city)}
+
+DISTRICT_ALIASES: Dict[str, List[Tuple[str, str]]] = {}
+for _city, _districts in CITY_DISTRICTS.items():
+    for _district in _districts:
+        for _alias in _district_aliases(_district):
+            DISTRICT_ALIASES.setdefault(_alias, []).append((_city, _district))
+
+# 縣市名稱本身 (例如 "新竹") 不視為行政區
+for _alias in list(DISTRICT_ALIASES):
+    if _alias in CITY_ALIASES:
+        del DISTRICT_ALIASES[_alias]
+
+
+_NON_DISTRICT_SUFFIXES = set("路街道巷里村站國高醫")
+
+
+def normalize_place_name(text: str) -> str:
+    return text.replace("臺", "台")
+
+
+def _longest_matches(text: str, names) -> List[Tuple[int, str]]:
+    """
+    回傳 (位置, 名稱)，較長的名稱優先且不重疊
+    """
+    matches = []
+    taken = [False] * len(text)
+    for name in sorted(names, key=len, reverse=True):
+        start = text.find(name)
+        while start != -1:
+            end = start + len(name)
+            if not any(taken[start:end]):
+                matches.append((start, name))
+                for i in range(start, end):
+                    taken[i] = True
+            start = text.find(name, end)
+    return sorted(matches)
+
+
+def find_cities(text: str) -> List[str]:
+    text = normalize_place_name(text)
+    cities = []
+    for _, alias in _longest_matches(text, CITY_ALIASES):
+        city = CITY_ALIASES[alias]
+        if city not in cities:
+            cities.append(city)
+    return cities
+
+
+def find_districts(text: str) -> List[Tuple[str, List[str]]]:
+    """
+    回傳 [(行政區, [可能的縣市...]), ...]，依出現順序排列
+    """
+    text = normalize_place_name(text)
+    # 先遮蔽縣市名稱，避免 "台東市" 被當成 "東區" 之類的片段
+    for _, alias in _longest_matches(text, CITY_ALIASES):
+        text = text.replace(alias, "＿" * len(alias))
+
+    results = []
+    for start, alias in _longest_matches(text, DISTRICT_ALIASES):
+        candidates = DISTRICT_ALIASES[alias]
+        # "中山路"、"成功里" 這類路名 / 里名不是行政區
+        following = text[start + len(alias): start + len(alias) + 1]
+        if alias != candidates[0][1] and following in _NON_DISTRICT_SUFFIXES:
+            continue
+        district = candidates[0][1]
+        cities = [city for city, _ in candidates]
+        if all(district != d for d, _ in results):
+            results.append((district, cities))
+    return results
+
+
+def resolve_location(text: str, default_city: Optional[str] = None) -> Tuple[str, str, float, float]:
+    """
+    從文字判斷縣市與行政區。
+    :return: (city, district, city_confidence, district_confidence)，找不到時為空字串與 0.0
+    """
+    cities = find_cities(text)
+    districts = find_districts(text)
+
+    city, city_confidence = "", 0.0
+    if len(cities) == 1:
+        city, city_confidence = cities[0], 0.95
+    elif len(cities) > 1:
+        city, city_confidence = cities[0], 0.5
+
+    district, district_confidence = "", 0.0
+    if districts:
+        matching = [(d, c) for d, c in districts if not city or city in c]
+        if matching:
+            district, candidates = matching[0]
+            district_confidence = 0.9 if len(matching) == 1 else 0.5
+            if not city:
+                if len(candidates) == 1:
+                    city, city_confidence = candidates[0], 0.9
+                elif default_city in candidates:
+                    city, city_confidence = default_city, 0.8
+                else:
+                    city, city_confidence = candidates[0], 0.4
+        else:
+            district_confidence = 0.3
+
+    return city, district, city_confidence, district_confidence
@@ -78,12 +78,7 @@ def main():
             if use_chroma:
                 response = mini_rag.format_query(user_query)
 
-                # result = rag_service.query(user_query, response)
-                result = rag_service.collection.query(
-                    query_texts=[user_query],
-                    where=response,
-                    include=["documents", "metadatas"]
-                )
+                result = rag_service.query(user_query, response, n_results=10)
 
                 print(result["documents"])
                 print(result["metadatas"])
@@ -1,4 +1,8 @@
-QUERY_PARSER_PROMPT = """
+import hashlib
+import json
+
+# 固定的說明放在 system message，每次查詢都相同，伺服器可重用已計算的 prefix
+QUERY_PARSER_SYSTEM_PROMPT = """
 你是一個聰明的租屋搜尋助手。請將使用者的自然語言查詢，轉換為 ChromaDB 的結構化查詢條件 (JSON)。
 
 【資料庫 Metadata 定義】
@@ -68,6 +72,16 @@ Output:
   }
 }
 
-現在，請處理以下查詢：
+"""
+
+QUERY_PARSER_USER_TEMPLATE = """現在，請處理以下查詢：
 User: "{user_query}"
-"""
\ No newline at end of file
+"""
+
+# 單一訊息版本 (不支援 system message 的呼叫方式)
+QUERY_PARSER_PROMPT = QUERY_PARSER_SYSTEM_PROMPT + QUERY_PARSER_USER_TEMPLATE
+
+# 查詢解析 Prompt 的版本；變動時查詢解析快取便會失效
+QUERY_PROMPT_HASH = hashlib.sha256(json.dumps(
+    [QUERY_PARSER_SYSTEM_PROMPT, QUERY_PARSER_USER_TEMPLATE], ensure_ascii=False,
+).encode("utf-8")).hexdigest()[:16]
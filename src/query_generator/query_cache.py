@@ -0,0 +1,181 @@
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Optional
+
+import redis
+
+from src.config import Config
+from src.utils import NUMBER_PATTERN, parse_chinese_number
+
+# normalize_query 的規則變動時遞增，讓舊規則產生的快取 key 失效
+NORMALIZE_VERSION = 2
+
+_NUMBER_RE = re.compile(NUMBER_PATTERN)
+# 中日韓文字之間的空白不影響語意，直接移除；英數字之間保留一個空白
+_CJK = r"　-〿㐀-鿿豈-﫿＀-￯"
+_CJK_SPACE_RE = re.compile(rf"(?<=[{_CJK}])\s+|\s+(?=[{_CJK}])")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def _canonical_number(match: re.Match) -> str:
+    value = parse_chinese_number(match.group(0))
+    if value is None:
+        return match.group(0)
+    return str(int(value)) if value == int(value) else str(value)
+
+
+def normalize_query(query: str) -> str:
+    """
+    正規化查詢字串，讓寫法不同但意思相同的查詢共用快取：
+    全形轉半形 (NFKC)、英文轉小寫、臺 -> 台、合併空白、數字統一為阿拉伯數字
+    ("一萬五" / "1.5萬" / "15,000" -> "15000"，"三房" -> "3房")
+    """
+    text = unicodedata.normalize("NFKC", query or "").lower().replace("臺", "台")
+    text = _SPACE_RE.sub(" ", text).strip()
+    # 先在空白仍分隔各詞時轉換數字，避免 "五千 三房" 併成 "五千三房"
+    text = _NUMBER_RE.sub(_canonical_number, text)
+    return _CJK_SPACE_RE.sub("", text)
+
+
+def cache_version(*parts: Any) -> str:
+    """
+    由 Prompt、Schema、模型名稱等組成的版本；任一項變動時舊的快取自然失效
+    """
+    return hashlib.sha256(
+        json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()[:16]
+
+
+class QueryCache:
+    """
+    查詢解析結果的兩層快取，key 為 (版本, 正規化後的查詢)。
+
+    - 記憶體層：行程內 LRU，最多 memory_size 筆，memory_ttl 秒後過期
+    - Redis 層：多個 Flask worker 共用，ttl 秒後過期；Redis 無法連線時暫停使用 redis_retry 秒，只用記憶體層
+    """
+
+    def __init__(self, memory_size: int = 1024, ttl: float = 86400, memory_ttl: Optional[float] = None,
+                 redis_client: Optional[redis.Redis] = None, prefix: str = "query-parse",
+                 redis_retry: float = 30.0):
+        self.memory_size = memory_size
+        self.ttl = ttl
+        self.memory_ttl = ttl if memory_ttl is None else memory_ttl
+        self.redis = redis_client
+        self.prefix = prefix
+        self.redis_retry = redis_retry
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._redis_retry_at = 0.0
+
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.redis_errors = 0
+
+    def key(self, version: str, query: str) -> str:
+        digest = hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+        return f"{self.prefix}:{version}:{digest}"
+
+    def get(self, version: str, query: str) -> Optional[Any]:
+        key = self.key(version, query)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                data, expires_at = entry
+                if expires_at > time.time():
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    # 每次回傳新的物件，呼叫端修改結果不會影響快取
+                    return json.loads(data)
+                del self._memory[key]
+
+        data = self._redis_call(lambda client: client.get(key))
+        if data is not None:
+            data = data.decode("utf-8") if isinstance(data, bytes) else data
+            with self._lock:
+                self._remember(key, data)
+                self.redis_hits += 1
+            return json.loads(data)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, version: str, query: str, value: Any) -> None:
+        key = self.key(version, query)
+        data = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._remember(key, data)
+        self._redis_call(lambda client: client.set(key, data, ex=max(1, int(self.ttl))))
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.redis_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.redis_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "redis_errors": self.redis_errors,
+            }
+
+    def _remember(self, key: str, data: str) -> None:
+        self._memory[key] = (data, time.time() + self.memory_ttl)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _redis_call(self, operation):
+        if self.redis is None or time.monotonic() < self._redis_retry_at:
+            return None
+        try:
+            return operation(self.redis)
+        except redis.RedisError as e:
+            with self._lock:
+                self.redis_errors += 1
+                self._redis_retry_at = time.monotonic() + self.redis_retry
+            print(f"⚠️ Query cache: Redis unavailable, using the in-process cache only for {self.redis_retry:.0f}s: {e}")
+            return None
+
+
+_shared_cache: Optional[QueryCache] = None
+_shared_lock = threading.Lock()
+
+
+def build_redis_client() -> Optional[redis.Redis]:
+    """
+    依 REDIS_HOST / REDIS_PORT 建立連線；REDIS_HOST 可以是主機名稱或 redis:// URL
+    """
+    if not Config.QUERY_CACHE_REDIS:
+        return None
+    options = {
+        "socket_timeout": Config.QUERY_CACHE_REDIS_TIMEOUT,
+        "socket_connect_timeout": Config.QUERY_CACHE_REDIS_TIMEOUT,
+    }
+    if "://" in Config.REDIS_HOST:
+        return redis.Redis.from_url(Config.REDIS_HOST, **options)
+    return redis.Redis(host=Config.REDIS_HOST, port=Config.REDIS_PORT, **options)
+
+
+def get_query_cache() -> Optional[QueryCache]:
+    """
+    行程內共用的查詢解析快取；QUERY_CACHE_ENABLED 關閉時回傳 None
+    """
+    global _shared_cache
+    if not Config.QUERY_CACHE_ENABLED:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = QueryCache(
+                memory_size=Config.QUERY_CACHE_MEMORY_SIZE,
+                ttl=Config.QUERY_CACHE_TTL,
+                redis_client=build_redis_client(),
+            )
+        return _shared_cache
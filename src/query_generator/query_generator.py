@@ -1,14 +1,25 @@
+import threading
 from typing import Optional
 
-from src.query_generator.utils import get_string_json
+from src.rag_service.backend_pool import BackendPool, get_backend_pool, parse_backends
 from src.rag_service.client import LLMClient
+from src.rag_service.filters import compile_filter
+from src.rag_service.schema import QUERY_PARSER_SCHEMA, coerce_query, parse_json, response_format
 from src.rag_service.llm_config import LLMConfig, LLMMode
 from src.config import Config
-from src.query_generator.prompts import QUERY_PARSER_PROMPT
+from src.query_generator.prompts import QUERY_PARSER_SYSTEM_PROMPT, QUERY_PARSER_USER_TEMPLATE, QUERY_PROMPT_HASH
+from src.query_generator.query_cache import NORMALIZE_VERSION, cache_version, get_query_cache
+from src.query_generator.rule_parser import RULE_PARSER_VERSION, RuleQueryParser, merge_filters
 
 
 class MiniRagApp:
-    def __init__(self, llm_config: Optional[LLMConfig] = None):
+    def __init__(self, llm_config: Optional[LLMConfig] = None, pool: Optional[BackendPool] = None):
+        """
+        :param llm_config: 模型與呼叫參數
+        :param pool: 預設使用 "query" 後端池 (與批次抽取分開)；未設定 LLM_QUERY_BACKENDS 時才直接連到 llm_config 的伺服器
+        """
+        if pool is None and parse_backends(Config.LLM_QUERY_BACKENDS):
+            pool = get_backend_pool("query")
         if llm_config is None:
             llm_config = LLMConfig(
                 mode=LLMMode.CHAT,
@@ -19,37 +30,92 @@ class MiniRagApp:
             )
 
         self.llm_config = llm_config
-        self.llm_client = LLMClient(self.llm_config)
-        self.query_prompt_template = QUERY_PARSER_PROMPT
+        self.llm_client = LLMClient(self.llm_config, pool=pool)
+        # 固定說明放在 system message，每次查詢只有 user message 不同，伺服器可重用 prefix 的計算結果
+        self.system_prompt = QUERY_PARSER_SYSTEM_PROMPT
+        self.query_prompt_template = QUERY_PARSER_USER_TEMPLATE
+        if Config.LLM_PREWARM:
+            self.llm_client.prewarm(self.system_prompt, wait=False)
 
-    def clean_chroma_filter(self, filters: dict) -> dict:
-        if not filters:
-            return {}
+        # 相同 (正規化後) 查詢的解析結果直接重用；Prompt、Schema 或模型變動時版本不同，舊結果不再命中
+        self.query_cache = get_query_cache()
+        self.cache_version = cache_version(
+            QUERY_PROMPT_HASH, QUERY_PARSER_SCHEMA, self.llm_config.model_type, Config.LLM_STRUCTURED_OUTPUT,
+            RULE_PARSER_VERSION, NORMALIZE_VERSION,
+        )
 
-        if "$and" in filters:
-            conditions = filters["$and"]
-            if not conditions:
-                return {}
-            if len(conditions) == 1:
-                return conditions[0]
+        # 常見的查詢 (地點、租金、格局、設備、性別) 由規則直接解析，看不懂的部分才交給 LLM
+        self.rule_parser = RuleQueryParser(default_city=Config.DEFAULT_CITY) if Config.QUERY_RULE_PARSER_ENABLED else None
+        # 各查詢由哪一層解析完成；多個 request thread 同時更新
+        self.parse_counts = {"rules": 0, "cache": 0, "llm": 0}
+        self._counts_lock = threading.Lock()
 
-        if "$or" in filters:
-            conditions = filters["$or"]
-            if len(conditions) == 1:
-                return conditions[0]
+    def _count(self, source: str) -> None:
+        with self._counts_lock:
+            self.parse_counts[source] += 1
 
-        return filters
+    def parse_stats(self) -> dict:
+        """
+        :return: 規則、快取與 LLM 各解析了幾次查詢 (/metrics 使用)
+        """
+        with self._counts_lock:
+            return dict(self.parse_counts)
 
-    def format_query(self, query: str) -> dict:
-        formatted_prompt = self.query_prompt_template.replace("{user_query}", query)
-        response = self.llm_client.call_local_model(formatted_prompt)
+    def rule_filters(self, query: str) -> Optional[dict]:
+        """
+        只用規則解析的條件 (不論覆蓋率)；搜尋等不到 LLM 時使用
+        """
+        if self.rule_parser is None:
+            return None
+        return compile_filter(self.rule_parser.parse(query).filters())
+
+    def format_query(self, query: str) -> Optional[dict]:
+        """
+        :return: 編譯過的 ChromaDB where 條件；沒有任何條件時回傳 None
+        """
+        rules = self.rule_parser.parse(query) if self.rule_parser else None
+        if rules is not None and rules.coverage >= Config.QUERY_RULE_MIN_COVERAGE:
+            self._count("rules")
+            return compile_filter(rules.filters())
+
+        if self.query_cache is not None:
+            cached = self.query_cache.get(self.cache_version, query)
+            if cached is not None:
+                self._count("cache")
+                # 沒有條件的結果以 {} 存放，與未命中 (None) 區分
+                return cached or None
 
+        self._count("llm")
+
+        formatted_prompt = self.query_prompt_template.replace("{user_query}", query)
+        response = None
         try:
-            response = get_string_json(response)
-            json_resp = response["filters"]
-            json_resp = self.clean_chroma_filter(json_resp)
+            if Config.LLM_STREAM_JSON:
+                # JSON 一完成就中斷串流，不等模型生成後續文字
+                response = self.llm_client.call_json_stream(
+                    formatted_prompt,
+                    format=response_format(QUERY_PARSER_SCHEMA),
+                    num_predict=Config.LLM_QUERY_NUM_PREDICT,
+                    system=self.system_prompt,
+                ).text
+            else:
+                response = self.llm_client.call_local_model(
+                    formatted_prompt,
+                    format=response_format(QUERY_PARSER_SCHEMA),
+                    num_predict=Config.LLM_QUERY_NUM_PREDICT,
+                    system=self.system_prompt,
+                )
+            response = coerce_query(parse_json(response))
+            # 不合法的欄位、型態與空條件在本地就處理掉，不送到 Chroma
+            json_resp = compile_filter(response["filters"])
+            if rules is not None:
+                # 規則辨識到的欄位以規則為準，LLM 補上其餘條件 (例如路名)
+                json_resp = compile_filter(merge_filters(rules, json_resp))
+            if self.query_cache is not None:
+                self.query_cache.put(self.cache_version, query, json_resp or {})
             return json_resp
         except Exception as e:
             print("LLM 解析失敗，回退到純文字搜尋: ", e)
             print(response)
-            return {"search_text": query, "filters": {}}
+            # 仍然套用規則辨識到的條件
+            return compile_filter(rules.filters()) if rules is not None else None
@@ -0,0 +1,275 @@
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from src.gazetteer import CITY_ALIASES, DISTRICT_ALIASES, find_districts, resolve_location
+from src.utils import NUMBER_PATTERN, parse_chinese_number
+
+# 規則或詞彙變動時遞增，讓查詢解析快取中的舊結果失效
+RULE_PARSER_VERSION = 2
+
+_NUM = NUMBER_PATTERN
+_SMALL_NUM = r"[\d一二兩三四五六七八九十]"
+_RANGE = r"\s*[~\-～〜至到]\s*"
+_UNIT = r"\s*(?:元|塊)?"
+_MASK = "＿"
+
+# (pattern, 類型)；由上而下比對，先比對到的文字不再被後面的規則使用
+_PRICE_PATTERNS = [
+    (re.compile(rf"(?:預算|租金|月租|房租)?\s*({_NUM}){_UNIT}{_RANGE}({_NUM}){_UNIT}"), "range"),
+    (re.compile(rf"(?:預算|租金|月租|房租)?\s*({_NUM}){_UNIT}\s*(?:以上|起跳|起)"), "min"),
+    (re.compile(rf"(?:預算|租金|月租|房租)?\s*({_NUM}){_UNIT}\s*(?:左右|上下)"), "about"),
+    (re.compile(rf"(?:預算|租金|月租|房租)?\s*({_NUM}){_UNIT}\s*(?:以下|以內|之內|內|有找)"), "max"),
+    (re.compile(rf"(?:預算|租金|月租|房租)\s*[:：]?\s*({_NUM}){_UNIT}"), "max"),
+    # 只有單位的金額 (例如 "東區 5000元 套房") 視為預算上限；
+    # 沒有單位也沒有預算詞的數字 ("2024年"、"5000 套房") 不辨識，留給 LLM 判斷
+    (re.compile(rf"({_NUM})\s*(?:元|塊)"), "max"),
+]
+_SIZE_PATTERNS = [
+    (re.compile(rf"({_NUM}){_RANGE}({_NUM})\s*坪"), "range"),
+    (re.compile(rf"({_NUM})\s*坪\s*(?:以下|以內|之內)"), "max"),
+    (re.compile(rf"({_NUM})\s*坪\s*(?:以上)?"), "min"),
+]
+_LAYOUT = re.compile(
+    rf"({_SMALL_NUM})\s*房(?:\s*({_SMALL_NUM}|零)\s*廳)?(?:\s*({_SMALL_NUM})\s*(?:衛浴|衛|浴))?"
+)
+
+# (欄位, 關鍵字)；前面有否定詞時不採用，交給 LLM 判斷
+_FLAGS = [
+    ("can_pet", ["可養寵物", "寵物友善", "養寵物", "可養貓", "可養狗", "養貓", "養狗", "毛小孩", "可寵", "寵物"]),
+    ("can_cook", ["可開伙", "開伙", "可煮飯", "煮飯", "可炊", "廚房"]),
+    ("has_elevator", ["電梯"]),
+    ("has_parking", ["停車位", "汽車位", "機車位", "車位", "停車", "車庫"]),
+]
+_NEGATIONS = "不沒無禁免別"
+_FEMALE = ["女生", "女性", "女孩", "女學生", "小姐", "限女"]
+_MALE = ["男生", "男性", "男孩", "男學生", "先生", "限男"]
+_OFFICE_WORKER = ["上班族", "社會人士"]
+
+# 只代表房型或用途、不產生條件的詞；交給語意搜尋處理
+_KEYWORDS = ["套房", "雅房", "整層", "整棟", "獨立套房", "分租套房", "學生", "租屋", "出租", "房子", "房間", "物件"]
+# 不影響條件的贅詞
+_FILLERS = [
+    "請幫我", "幫我", "我要找", "我想找", "想要找", "想找", "要找", "找", "我是", "我要", "我想", "想要", "希望", "需要",
+    "要", "想", "可以", "可", "能", "有", "在", "租", "一間", "間", "的", "附近", "一帶", "周邊", "和", "跟", "與", "及",
+    "還有", "並且", "而且", "且", "或", "預算", "租金", "月租", "元", "塊", "以下", "以上", "最好", "一個月", "每月", "月",
+]
+
+
+@dataclass
+class RuleQuery:
+    """
+    規則解析結果
+
+    - conditions: 欄位 -> ChromaDB 運算式，例如 {"price_max": {"$lte": 5000}}
+    - coverage: 查詢中被規則辨識的字元比例 (不含空白與標點)，1.0 表示整句都看得懂
+    - search_text: 沒有被辨識的剩餘文字
+    """
+    conditions: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    coverage: float = 0.0
+    search_text: str = ""
+
+    def filters(self) -> dict:
+        """
+        轉成 ChromaDB where 語法；多個條件以 "$and" 包裹
+        """
+        conditions = [{name: condition} for name, condition in self.conditions.items()]
+        if not conditions:
+            return {}
+        if len(conditions) == 1:
+            return conditions[0]
+        return {"$and": conditions}
+
+
+class _Scanner:
+    """
+    已辨識的文字以 _MASK 遮蔽 (長度不變)，避免同一段文字被多條規則使用
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def matches(self, pattern: re.Pattern) -> List[re.Match]:
+        return list(pattern.finditer(self.text))
+
+    def mask(self, start: int, end: int) -> None:
+        self.text = self.text[:start] + _MASK * (end - start) + self.text[end:]
+
+    def mask_word(self, word: str) -> bool:
+        start = self.text.find(word)
+        found = start != -1
+        while start != -1:
+            self.mask(start, start + len(word))
+            start = self.text.find(word, start + len(word))
+        return found
+
+    def preceded_by_negation(self, start: int) -> bool:
+        return any(char in _NEGATIONS for char in self.text[max(0, start - 2): start])
+
+
+def _meaningful(text: str) -> int:
+    return sum(1 for char in text if not unicodedata.category(char).startswith(("P", "Z", "S", "C")))
+
+
+class RuleQueryParser:
+    """
+    規則式查詢解析器：處理常見的地點、租金、坪數、格局、設備與性別條件，
+    輸出與 QUERY_PARSER_PROMPT 相同的欄位與運算子。
+    """
+
+    def __init__(self, default_city: Optional[str] = None, min_amount: int = 1000, max_amount: int = 200000):
+        """
+        :param default_city: "東區" 這類多個縣市都有的行政區預設屬於此縣市
+        :param min_amount: 小於此值的數字不視為租金 (例如樓層、房數)
+        """
+        self.default_city = default_city
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+
+    def parse(self, query: str) -> RuleQuery:
+        text = unicodedata.normalize("NFKC", query or "").replace("臺", "台").strip()
+        result = RuleQuery()
+        total = _meaningful(text)
+        if not total:
+            return result
+
+        scanner = _Scanner(text)
+        self._location(scanner, result)
+        self._layout(scanner, result)
+        self._size(scanner, result)
+        self._price(scanner, result)
+        self._flags(scanner, result)
+        self._gender(scanner, result)
+        for word in sorted(_KEYWORDS, key=len, reverse=True):
+            scanner.mask_word(word)
+
+        # 贅詞只在已經辨識出條件時才算數，避免 "我想找可以的" 這類查詢被當成完全看懂
+        if result.conditions:
+            for word in sorted(_FILLERS, key=len, reverse=True):
+                scanner.mask_word(word)
+
+        remaining = "".join(char if _meaningful(char) else " " for char in scanner.text)
+        result.search_text = " ".join(remaining.split())
+        result.coverage = 1.0 - _meaningful(remaining) / total
+        return result
+
+    def _location(self, scanner: _Scanner, result: RuleQuery) -> None:
+        city, district, city_confidence, district_confidence = resolve_location(scanner.text, self.default_city)
+        if city and city_confidence >= 0.8:
+            result.conditions["city"] = {"$eq": city}
+        if district and district_confidence >= 0.5:
+            # "東區或北區" 這類多個行政區
+            districts = [d for d, cities in find_districts(scanner.text) if not city or city in cities]
+            result.conditions["district"] = {"$eq": districts[0]} if len(districts) == 1 else {"$in": districts}
+
+        for alias, name in CITY_ALIASES.items():
+            if name == city:
+                scanner.mask_word(alias)
+        districts = set(result.conditions.get("district", {}).get("$in", [district] if district else []))
+        for alias in sorted(DISTRICT_ALIASES, key=len, reverse=True):
+            if any(d in districts for _, d in DISTRICT_ALIASES[alias]):
+                scanner.mask_word(alias)
+
+    def _amount(self, raw: Optional[str]) -> Optional[int]:
+        value = parse_chinese_number(raw) if raw else None
+        if value is None or not self.min_amount <= value <= self.max_amount:
+            return None
+        return int(round(value))
+
+    def _price(self, scanner: _Scanner, result: RuleQuery) -> None:
+        for pattern, kind in _PRICE_PATTERNS:
+            for match in scanner.matches(pattern):
+                low = self._amount(match.group(1))
+                high = self._amount(match.group(2)) if kind == "range" else low
+                if low is None or high is None:
+                    continue
+                if kind == "range":
+                    result.conditions["price_min"] = {"$gte": min(low, high)}
+                    result.conditions["price_max"] = {"$lte": max(low, high)}
+                elif kind == "min":
+                    result.conditions["price_min"] = {"$gte": low}
+                elif kind == "about":
+                    result.conditions["price_max"] = {"$lte": int(round(low * 1.1))}
+                elif "price_max" not in result.conditions:
+                    result.conditions["price_max"] = {"$lte": low}
+                scanner.mask(match.start(), match.end())
+
+    def _size(self, scanner: _Scanner, result: RuleQuery) -> None:
+        for pattern, kind in _SIZE_PATTERNS:
+            for match in scanner.matches(pattern):
+                values = [parse_chinese_number(g) for g in match.groups() if g]
+                if any(v is None or not 0 < v < 500 for v in values):
+                    continue
+                if kind == "range":
+                    result.conditions["size_max"] = {"$gte": float(min(values))}
+                    result.conditions["size_min"] = {"$lte": float(max(values))}
+                elif kind == "max":
+                    result.conditions["size_min"] = {"$lte": float(values[0])}
+                else:
+                    result.conditions["size_max"] = {"$gte": float(values[0])}
+                scanner.mask(match.start(), match.end())
+
+    def _layout(self, scanner: _Scanner, result: RuleQuery) -> None:
+        for match in scanner.matches(_LAYOUT):
+            room, hall, bath = (parse_chinese_number(g) if g else None for g in match.groups())
+            if room:
+                result.conditions["layout_room"] = {"$gte": int(room)}
+            if hall:
+                result.conditions["layout_hall"] = {"$gte": int(hall)}
+            if bath:
+                result.conditions["layout_bath"] = {"$gte": int(bath)}
+            scanner.mask(match.start(), match.end())
+            break
+
+    def _flags(self, scanner: _Scanner, result: RuleQuery) -> None:
+        for name, words in _FLAGS:
+            for word in words:
+                start = scanner.text.find(word)
+                if start == -1:
+                    continue
+                if not scanner.preceded_by_negation(start):
+                    result.conditions[name] = {"$eq": 1}
+                    scanner.mask_word(word)
+                break
+
+        if any(word in scanner.text for word in _OFFICE_WORKER):
+            result.conditions["is_student"] = {"$ne": 1}
+            for word in _OFFICE_WORKER:
+                scanner.mask_word(word)
+
+    def _gender(self, scanner: _Scanner, result: RuleQuery) -> None:
+        female = any(word in scanner.text for word in _FEMALE)
+        male = any(word in scanner.text for word in _MALE)
+        if female == male:
+            return
+        # 可以租「不限」或限自己性別的房子
+        result.conditions["gender_restriction"] = {"$in": [0, 2] if female else [0, 1]}
+        for word in _FEMALE + _MALE:
+            scanner.mask_word(word)
+
+
+def merge_filters(rules: RuleQuery, llm_filters: Optional[dict]) -> dict:
+    """
+    合併規則與 LLM 的條件：規則辨識到的欄位以規則為準，其餘欄位採用 LLM 的條件
+    """
+    llm_filters = llm_filters or {}
+    if list(llm_filters) == ["$and"] and isinstance(llm_filters["$and"], list):
+        llm_conditions = llm_filters["$and"]
+    else:
+        llm_conditions = [llm_filters] if llm_filters else []
+
+    merged = [{name: condition} for name, condition in rules.conditions.items()]
+    for condition in llm_conditions:
+        if not isinstance(condition, dict):
+            continue
+        names = [key for key in condition if not key.startswith("$")]
+        if len(condition) == 1 and names and names[0] in rules.conditions:
+            continue
+        merged.append(condition)
+
+    if not merged:
+        return {}
+    if len(merged) == 1:
+        return merged[0]
+    return {"$and": merged}
@@ -0,0 +1,173 @@
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.config import Config
+from src.rag_service.registry import ModelRegistry
+
+
+@dataclass(eq=False)
+class Backend:
+    base_url: str
+    outstanding: int = 0
+    healthy: bool = True
+    consecutive_failures: int = 0
+    ejected_at: Optional[float] = None
+    models: Set[str] = field(default_factory=set)
+    requests: int = 0
+    failures: int = 0
+
+
+class BackendPool:
+    """
+    多台 Ollama 伺服器組成的後端池。
+
+    - 路由：選擇進行中請求數最少的健康後端 (least outstanding requests)，同分時輪流
+    - 健康檢查：每 health_interval 秒以 ModelRegistry.fetch_models 查詢模型列表，沒有該模型的後端不分配流量
+    - 剔除：連續失敗 eject_after 次即剔除，至少 eject_seconds 秒後且健康檢查通過才重新加入
+    - 所有後端都被剔除時，仍從全部後端中挑選，避免整個服務停擺
+    """
+
+    def __init__(self, name: str, base_urls: List[str], model: str, eject_after: int = 3,
+                 eject_seconds: float = 30.0, health_interval: float = 15.0, health_timeout: float = 3.0):
+        if not base_urls:
+            raise ValueError(f"Backend pool '{name}' needs at least one backend")
+        self.name = name
+        self.model = model
+        self.backends = [Backend(url.rstrip("/")) for url in base_urls]
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+
+        self._lock = threading.Lock()
+        self._order = itertools.count()
+        self._health_thread: Optional[threading.Thread] = None
+
+    def start(self) -> "BackendPool":
+        """
+        啟動背景健康檢查 (只有一台後端時不需要)
+        """
+        with self._lock:
+            if self._health_thread is None and len(self.backends) > 1:
+                self._health_thread = threading.Thread(
+                    target=self._health_loop, name=f"llm-pool-{self.name}", daemon=True)
+                self._health_thread.start()
+        return self
+
+    def acquire(self, exclude: Tuple[Backend, ...] = ()) -> Backend:
+        """
+        :param exclude: 不考慮這些後端 (例如剛連線失敗的那台)，除非沒有其他選擇
+        """
+        with self._lock:
+            others = [b for b in self.backends if b not in exclude] or self.backends
+            candidates = [b for b in others if b.healthy] or others
+            # 同分時依呼叫順序輪流，避免總是打到第一台
+            offset = next(self._order)
+            size = len(candidates)
+            backend = min(
+                (candidates[(offset + i) % size] for i in range(size)),
+                key=lambda b: b.outstanding,
+            )
+            backend.outstanding += 1
+            backend.requests += 1
+            return backend
+
+    def release(self, backend: Backend, ok: Optional[bool] = True) -> None:
+        """
+        :param ok: False 表示後端故障 (連線失敗、逾時、5xx)；None 表示結果與後端無關 (例如請求被取消)
+        """
+        with self._lock:
+            backend.outstanding -= 1
+            if ok is None:
+                return
+            if ok:
+                backend.consecutive_failures = 0
+                return
+            backend.failures += 1
+            backend.consecutive_failures += 1
+            if backend.healthy and backend.consecutive_failures >= self.eject_after:
+                self._eject(backend, f"{backend.consecutive_failures} consecutive failures")
+
+    def _eject(self, backend: Backend, reason: str) -> None:
+        backend.healthy = False
+        backend.ejected_at = time.monotonic()
+        print(f"⚠️ LLM backend {backend.base_url} ejected from pool '{self.name}': {reason}")
+
+    def check_health(self) -> None:
+        for backend in self.backends:
+            try:
+                models = ModelRegistry.fetch_models(backend.base_url, timeout=self.health_timeout)
+                error = None if ModelRegistry.has_model(models, self.model) else f"model '{self.model}' not found"
+            except Exception as e:
+                models, error = set(), str(e)
+
+            with self._lock:
+                backend.models = models
+                if error:
+                    if backend.healthy:
+                        self._eject(backend, error)
+                elif not backend.healthy and time.monotonic() - backend.ejected_at >= self.eject_seconds:
+                    backend.healthy = True
+                    backend.consecutive_failures = 0
+                    print(f"✅ LLM backend {backend.base_url} re-admitted to pool '{self.name}'")
+
+    def _health_loop(self) -> None:
+        while True:
+            self.check_health()
+            time.sleep(self.health_interval)
+
+    def status(self) -> List[dict]:
+        with self._lock:
+            return [
+                {
+                    "base_url": b.base_url,
+                    "healthy": b.healthy,
+                    "outstanding": b.outstanding,
+                    "requests": b.requests,
+                    "failures": b.failures,
+                }
+                for b in self.backends
+            ]
+
+
+_pools: Dict[str, BackendPool] = {}
+_pools_lock = threading.Lock()
+
+
+def parse_backends(value: Optional[str]) -> List[str]:
+    """
+    "http://gpu1:11434, http://gpu2:11434" -> ["http://gpu1:11434", "http://gpu2:11434"]
+    """
+    return [url.strip() for url in (value or "").split(",") if url.strip()]
+
+
+def get_backend_pool(name: str) -> BackendPool:
+    """
+    取得共用的後端池："query" (互動式查詢解析) 或 "extract" (批次抽取)
+    """
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            urls = Config.LLM_QUERY_BACKENDS if name == "query" else Config.LLM_EXTRACT_BACKENDS
+            pool = BackendPool(
+                name,
+                parse_backends(urls),
+                model=Config.LLM_MODEL_TYPE,
+                eject_after=Config.LLM_BACKEND_EJECT_AFTER,
+                eject_seconds=Config.LLM_BACKEND_EJECT_SECONDS,
+                health_interval=Config.LLM_HEALTH_CHECK_INTERVAL,
+            ).start()
+            _pools[name] = pool
+        return pool
+
+
+def pool_status() -> Dict[str, List[dict]]:
+    """
+    目前行程中已建立的後端池與各後端狀態 (/metrics 使用)
+    """
+    with _pools_lock:
+        pools = dict(_pools)
+    return {name: pool.status() for name, pool in pools.items()}
@@ -1,46 +1,144 @@
+import asyncio
 import json
-from typing import Optional
-from queue import Queue
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 from chromadb import Documents, Embeddings
 from chromadb.utils.embedding_functions import EmbeddingFunction
+from src.config import Config
+from src.rag_service.backend_pool import BackendPool
+from src.rag_service.json_stream import IncrementalJSONParser, StreamedJSON
+from src.rag_service.llm_stats import LLMCallRecord, llm_stats
 from src.rag_service.llm_config import LLMConfig, LLMMode
+from src.rag_service.schema import parse_json
 
 
+_sessions: Dict[int, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_http_session(pool_size: Optional[int] = None) -> requests.Session:
+    """
+    取得共用的 requests.Session (keep-alive + 連線池)，避免每次呼叫都重新建立 TCP/TLS 連線。
+    同樣 pool_size 的呼叫者共用同一個 Session。
+    """
+    pool_size = pool_size or Config.LLM_HTTP_POOL_SIZE
+    with _sessions_lock:
+        session = _sessions.get(pool_size)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[pool_size] = session
+        return session
+
 
 class RemoteOllamaAuthEF(EmbeddingFunction):
-    def __init__(self, base_url: str, api_key: str, model_name: str = "nomic-embed-text", timeout: int = 30):
+    """
+    Ollama embedding function。
+
+    預設 (use_batch_api="off") 使用 `/api/embeddings`，以 concurrency 個執行緒並行送出；
+    use_batch_api="auto" 時優先使用支援多筆輸入的 `/api/embed`，每次送出 batch_size 筆，
+    伺服器沒有這個 endpoint 時改回 `/api/embeddings`。兩種方式都會保持輸入順序。
+    注意：`/api/embed` 回傳的向量已經過 L2 正規化，與 `/api/embeddings` 的分數不能比較；
+    同一個 collection 只能使用其中一種，既有的 collection 要改用 "auto" 必須重建索引。
+    """
+
+    def __init__(self, base_url: str, api_key: str, model_name: str = "nomic-embed-text", timeout: int = 30,
+                 session: Optional[requests.Session] = None, batch_size: int = 32, concurrency: int = 4,
+                 use_batch_api: str = "off"):
         self.api_url = f"{base_url}/api/embeddings"
+        self.batch_api_url = f"{base_url}/api/embed"
         self.model_name = model_name
         self.headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
         self.timeout = timeout
+        self.session = session or get_http_session()
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        # None: 尚未確認伺服器是否支援 /api/embed
+        self._batch_api_available = False if use_batch_api == "off" else None
 
     def __call__(self, input: Documents) -> Embeddings:
+        texts = list(input)
+        if not texts:
+            return []
+
+        if self._batch_api_available is not False:
+            try:
+                return self._embed_batched(texts)
+            except _BatchEndpointMissing:
+                print("Embedding server has no /api/embed, falling back to /api/embeddings")
+                self._batch_api_available = False
+
+        return self._embed_concurrently(texts)
+
+    def _embed_batched(self, texts: List[str]) -> Embeddings:
         embeddings = []
-        for text in input:
-            payload = {
-                "model": self.model_name,
-                "prompt": text
-            }
+        for start in range(0, len(texts), self.batch_size):
+            chunk = texts[start: start + self.batch_size]
+            response = self.session.post(
+                self.batch_api_url,
+                json={"model": self.model_name, "input": chunk},
+                headers=self.headers,
+                timeout=self.timeout
+            )
+            # 舊版 Ollama 沒有 /api/embed (回傳 404 page not found，而非 model not found)
+            if self._batch_api_available is None and response.status_code in (404, 405) \
+                    and "model" not in response.text.lower():
+                raise _BatchEndpointMissing()
             try:
-                response = requests.post(
-                    self.api_url,
-                    json=payload,
-                    headers=self.headers,
-                    timeout=self.timeout
-                )
                 response.raise_for_status()
-                data = response.json()
-                embeddings.append(data["embedding"])
+                batch = response.json()["embeddings"]
             except Exception as e:
-                print(f"Error embedding text: {e}")
+                print(f"Error embedding texts: {e}")
                 raise e
+            if len(batch) != len(chunk):
+                raise ValueError(f"Expected {len(chunk)} embeddings, got {len(batch)}")
 
+            self._batch_api_available = True
+            embeddings.extend(batch)
         return embeddings
 
+    def _embed_one(self, text: str) -> List[float]:
+        payload = {
+            "model": self.model_name,
+            "prompt": text
+        }
+        try:
+            response = self.session.post(
+                self.api_url,
+                json=payload,
+                headers=self.headers,
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            data = response.json()
+            return data["embedding"]
+        except Exception as e:
+            print(f"Error embedding text: {e}")
+            raise e
+
+    def _embed_concurrently(self, texts: List[str]) -> Embeddings:
+        if self.concurrency == 1 or len(texts) == 1:
+            return [self._embed_one(text) for text in texts]
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(texts))) as executor:
+            # executor.map 會依輸入順序回傳
+            return list(executor.map(self._embed_one, texts))
+
+
+class _BatchEndpointMissing(Exception):
+    pass
+
 
 class LLMResponseData:
     def __init__(self, token: Optional[str] = None, completed: bool = False, complete_text: str = ""):
@@ -52,134 +150,557 @@ class LLMResponseData:
         self.content = token
 
 
-class LLMClient:
-    def __init__(self, config: LLMConfig):
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+_async_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """
+    同步 API 共用的背景 event loop，在 daemon 執行緒上執行
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-client-loop", daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+def run_sync(coro):
+    """
+    在背景 event loop 上執行 coroutine 並等待結果。
+    呼叫端等待時被中斷 (例如 KeyboardInterrupt) 會取消該請求並關閉連線。
+    """
+    loop = _background_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("Cannot call the synchronous LLMClient from its own event loop; await AsyncLLMClient instead")
+
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result()
+    except BaseException:
+        future.cancel()
+        raise
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    取得目前 event loop 共用的 httpx.AsyncClient (keep-alive 連線池)；必須在 event loop 內呼叫
+    """
+    loop = asyncio.get_running_loop()
+    with _async_lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=Config.LLM_HTTP_POOL_SIZE,
+                    max_keepalive_connections=Config.LLM_HTTP_POOL_SIZE,
+                ),
+                timeout=httpx.Timeout(Config.LLM_TIMEOUT, connect=Config.LLM_CONNECT_TIMEOUT),
+            )
+            _async_clients[loop] = client
+        return client
+
+
+def _backend_semaphore(base_url: str, limit: int) -> asyncio.Semaphore:
+    """
+    每台後端伺服器 (base URL) 一個 semaphore，/api/chat 與 /api/generate 共用同一個額度；
+    同一 event loop 內第一個建立者的 limit 為準
+    """
+    loop = asyncio.get_running_loop()
+    with _async_lock:
+        semaphores = _semaphores.setdefault(loop, {})
+        if base_url not in semaphores:
+            semaphores[base_url] = asyncio.Semaphore(limit)
+        return semaphores[base_url]
+
+
+_inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, _InFlight]]" = weakref.WeakKeyDictionary()
+_coalesce_counts = {"requests": 0, "coalesced": 0}
+
+
+@dataclass
+class _InFlight:
+    task: asyncio.Future
+    waiters: int = 0
+
+
+def coalescing_stats() -> dict:
+    """
+    single-flight 統計：requests 為實際送出的請求數，coalesced 為搭上同一請求、沒有另外送出的呼叫數
+    """
+    with _async_lock:
+        in_flight = sum(len(calls) for calls in _inflight.values())
+        return {**_coalesce_counts, "in_flight": in_flight}
+
+
+async def _single_flight(key: Optional[tuple], factory):
+    """
+    相同 key 的並行呼叫共用同一個進行中的請求，全部拿到同一個結果。
+    個別呼叫者被取消不影響其他人；所有呼叫者都取消時才取消該請求。
+    """
+    if key is None:
+        return await factory()
+
+    loop = asyncio.get_running_loop()
+    with _async_lock:
+        calls = _inflight.setdefault(loop, {})
+        entry = calls.get(key)
+        if entry is None:
+            entry = _InFlight(asyncio.ensure_future(factory()))
+            calls[key] = entry
+            entry.task.add_done_callback(lambda _: calls.pop(key, None) if calls.get(key) is entry else None)
+            _coalesce_counts["requests"] += 1
+        else:
+            _coalesce_counts["coalesced"] += 1
+        entry.waiters += 1
+
+    try:
+        return await asyncio.shield(entry.task)
+    except asyncio.CancelledError:
+        if entry.waiters == 1 and not entry.task.done():
+            entry.task.cancel()
+        raise
+    finally:
+        entry.waiters -= 1
+
+
+def _backend_ok(error: BaseException) -> Optional[bool]:
+    """
+    判斷錯誤是否該算在後端頭上：None 表示與後端無關 (例如請求被取消)
+    """
+    if isinstance(error, asyncio.CancelledError):
+        return None
+    if isinstance(error, (httpx.TransportError, TimeoutError)):
+        return False
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code < 500
+    return True
+
+
+@dataclass
+class LLMResult:
+    text: str
+    record: LLMCallRecord
+
+
+class AsyncLLMClient:
+    """
+    非同步版 LLMClient：CHAT / GENERATE / EMBEDDINGS 與串流的行為與同步版相同。
+
+    - 連線：每個 event loop 共用一個 httpx.AsyncClient 連線池
+    - 併發：每台後端伺服器最多 max_concurrency (LLM_BACKEND_MAX_CONCURRENCY) 個請求同時進行，其餘在 semaphore 排隊
+    - 逾時：連線 LLM_CONNECT_TIMEOUT、讀取 LLM_TIMEOUT；timeout 另外限制單次呼叫的總時間
+    - 取消：取消 task 會關閉回應，Ollama 隨即停止生成
+    - 後端池：指定 pool 時由 BackendPool 挑選伺服器，連線失敗會改試另一台
+    """
+
+    def __init__(self, config: LLMConfig, http_client: Optional[httpx.AsyncClient] = None,
+                 max_concurrency: Optional[int] = None, timeout: Optional[float] = None,
+                 pool: Optional[BackendPool] = None):
         self.config = config
+        self.http_client = http_client
+        self.max_concurrency = max_concurrency or Config.LLM_BACKEND_MAX_CONCURRENCY
+        self.timeout = timeout
+        self.pool = pool
         # 整理 Base URL (移除結尾斜線)
         base_url = f"{config.server_address}:{config.server_port}"
         if base_url.endswith("/"):
             base_url = base_url[:-1]
         self.base_url = base_url
 
-    def call_local_model(self, prompt: str):
+    @staticmethod
+    def _path(mode: LLMMode) -> str:
+        # 根據模式選擇正確的 Ollama Endpoint
+        if mode == LLMMode.CHAT:
+            return "/api/chat"
+        if mode == LLMMode.EMBEDDINGS:
+            return "/api/embeddings"
+        return "/api/generate"
+
+    @staticmethod
+    def build_payload(prompt: str, mode: LLMMode, model: str, stream: bool,
+                      format: Optional[Any] = None, num_predict: Optional[int] = None,
+                      system: Optional[str] = None, keep_alive: Optional[str] = None,
+                      options: Optional[dict] = None) -> dict:
         """
-        對外公開的呼叫方法，自動判斷正確的 API Endpoint
+        :param system: 固定不變的說明，放在 system message (GENERATE 模式為 "system" 欄位)，
+            讓伺服器可以重用已計算過的 prefix
+        :param keep_alive: 模型在閒置多久後卸載，例如 "30m"；"-1" 表示常駐
+        :param options: Ollama options，例如 {"num_ctx": 8192}
         """
-        # 根據模式選擇正確的 Ollama Endpoint
-        if self.config.mode == LLMMode.CHAT:
-            endpoint = "/api/chat"
-        elif self.config.mode == LLMMode.EMBEDDINGS:
-            endpoint = "/api/embeddings"
+        payload = {
+            "model": model,
+            "stream": stream
+        }
+
+        if mode == LLMMode.CHAT:
+            payload["messages"] = [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+            if system:
+                payload["messages"].insert(0, {"role": "system", "content": system})
         else:
-            endpoint = "/api/generate"
+            payload["prompt"] = prompt
+            if system and mode == LLMMode.GENERATE:
+                payload["system"] = system
 
-        url = f"{self.base_url}{endpoint}"
+        if format:
+            payload["format"] = format
+        if keep_alive:
+            # 純數字 (秒) 要以數字送出，Ollama 只接受帶單位的字串
+            payload["keep_alive"] = int(keep_alive) if keep_alive.lstrip("-").isdigit() else keep_alive
+        options = dict(options or {})
+        if num_predict:
+            options["num_predict"] = num_predict
+        if options:
+            payload["options"] = options
+        return payload
 
-        # 嘗試從 config 取得 api_key (如果有的話)
-        token = getattr(self.config, 'token', None)
+    @staticmethod
+    def build_headers(token: Optional[str] = None) -> dict:
+        # 加入 User-Agent 防止被擋
+        headers = {
+            "Content-Type": "application/json",
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+        }
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        return headers
+
+    @staticmethod
+    def parse_chunk(mode: LLMMode, json_obj: dict) -> str:
+        """
+        取出串流中單一 JSON 行的文字片段
+        """
+        if mode == LLMMode.CHAT:
+            return json_obj.get("message", {}).get("content", "")
+        return json_obj.get("response", "")
+
+    @staticmethod
+    async def _stream_objects(response: httpx.Response, record: Optional[LLMCallRecord] = None):
+        """
+        逐行解析 Ollama 的串流回應，略過模型載入訊息 (並記錄為冷啟動)
+        """
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            try:
+                json_obj = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if json_obj.get("done") and json_obj.get("done_reason") == "load":
+                if record is not None:
+                    record.cold_load = True
+                continue
+            yield json_obj
 
-        return self._call_local_model_internal(
-            prompt=prompt,
-            mode=self.config.mode,
-            url=url,
-            model=self.config.model_type,
-            stream=self.config.stream,
-            queue=self.config.queue,
-            token=token  # 傳遞 API Key
+    def _payload(self, prompt: str, stream: bool, format: Optional[Any], num_predict: Optional[int],
+                 system: Optional[str] = None):
+        payload = self.build_payload(
+            prompt, self.config.mode, self.config.model_type, stream,
+            format=format if format is not None else self.config.format,
+            num_predict=num_predict if num_predict is not None else self.config.num_predict,
+            system=system if system is not None else self.config.system,
+            keep_alive=self.config.keep_alive,
+            options=self.config.options,
         )
+        headers = self.build_headers(getattr(self.config, 'token', None))
+        return payload, headers
+
+    def _coalesce_key(self, payload: dict) -> Optional[tuple]:
+        """
+        相同後端 (池)、模式與 payload (含 model / prompt / format / options) 的呼叫視為同一請求
+        """
+        if not Config.LLM_COALESCE_REQUESTS:
+            return None
+        target = f"pool:{self.pool.name}" if self.pool else self.base_url
+        return target, self.config.mode.value, json.dumps(payload, sort_keys=True, ensure_ascii=False)
 
-    def _call_local_model_internal(self, prompt: str, mode: LLMMode, url: str, model: str, stream: bool,
-                                   queue: Optional[Queue], token: Optional[str] = None) -> str:
+    def _new_record(self) -> LLMCallRecord:
+        return LLMCallRecord(model=self.config.model_type, mode=self.config.mode.value)
+
+    async def _send(self, handler, payload: dict, headers: dict, record: LLMCallRecord):
+        """
+        挑選後端並執行 handler(response)；後端池中的伺服器連不上時改試另一台。
+        結束時 (含失敗) 將 record 寫入 llm_stats。
+        """
+        client = self.http_client or get_async_http_client()
+        attempts = 1 if self.pool is None else min(2, len(self.pool.backends))
+        tried = ()
+        started = time.monotonic()
         try:
-            # 1. 建構 Payload
-            payload = {
-                "model": model,
-                "stream": stream
-            }
-
-            if mode == LLMMode.CHAT:
-                payload["messages"] = [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            else:
-                payload["prompt"] = prompt
-
-            # 2. 建構 Headers (加入 User-Agent 防止被擋)
-            headers = {
-                "Content-Type": "application/json",
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
-            if token:
-                headers["Authorization"] = f"Bearer {token}"
-
-            # 3. 發送請求
-            with requests.post(url, json=payload, stream=stream, headers=headers) as response:
-                # 如果回傳 403/401，這裡會拋出異常
-                if response.status_code in [401, 403]:
-                    error_msg = f"權限錯誤 ({response.status_code}): 請檢查 .env 中的 LLM_API_KEY 是否正確。"
-                    print(f"❌ {error_msg}")
+            for attempt in range(attempts):
+                backend = self.pool.acquire(exclude=tried) if self.pool else None
+                record.backend = backend.base_url if backend else self.base_url
+                url = f"{record.backend}{self._path(self.config.mode)}"
+                ok: Optional[bool] = True
+                try:
+                    async with _backend_semaphore(record.backend, self.max_concurrency), asyncio.timeout(self.timeout):
+                        # 離開 async with 區塊時會關閉回應；串流尚未讀完時連線會被中斷，Ollama 隨即停止生成
+                        async with client.stream("POST", url, json=payload, headers=headers) as response:
+                            return await handler(response)
+                except BaseException as e:
+                    ok = _backend_ok(e)
+                    if isinstance(e, httpx.ConnectError) and attempt + 1 < attempts:
+                        tried += (backend,)
+                        continue
+                    raise
+                finally:
+                    if backend is not None:
+                        self.pool.release(backend, ok)
+        except BaseException as e:
+            record.error = "cancelled" if isinstance(e, asyncio.CancelledError) else repr(e)
+            raise
+        finally:
+            record.total_time = time.monotonic() - started
+            llm_stats.record(record)
+
+    async def call_local_model(self, prompt: str, format: Optional[Any] = None,
+                               num_predict: Optional[int] = None, system: Optional[str] = None) -> str:
+        """
+        對外公開的呼叫方法，自動判斷正確的 API Endpoint
+        :param format: 覆寫 config.format (JSON Schema 或 "json")
+        :param num_predict: 覆寫 config.num_predict
+        :param system: 覆寫 config.system
+        :return: 模型回覆；串流模式下 token 會逐一放入 config.queue，並回傳完整文字
+        """
+        return (await self.call_local_model_detailed(prompt, format=format, num_predict=num_predict,
+                                                     system=system)).text
+
+    async def call_local_model_detailed(self, prompt: str, format: Optional[Any] = None,
+                                        num_predict: Optional[int] = None,
+                                        system: Optional[str] = None) -> LLMResult:
+        """
+        同 call_local_model，另外回傳這次呼叫的 LLMCallRecord (token 數、各階段耗時、是否冷啟動)
+        """
+        mode = self.config.mode
+        stream = self.config.stream
+        queue = self.config.queue
+        payload, headers = self._payload(prompt, stream, format, num_predict, system)
+
+        async def handle(response: httpx.Response, record: LLMCallRecord) -> str:
+            if response.status_code in [401, 403]:
+                error_msg = f"權限錯誤 ({response.status_code}): 請檢查 .env 中的 LLM_API_KEY 是否正確。"
+                print(f"❌ {error_msg}")
+                if queue:
+                    queue.put(LLMResponseData(token=error_msg, completed=True))
+                return error_msg
+
+            response.raise_for_status()
+
+            # --- 非串流模式 (一次回傳) ---
+            if not stream:
+                await response.aread()
+                json_response = response.json()
+                record.update_from_response(json_response)
+                if mode == LLMMode.EMBEDDINGS:
+                    return str(json_response.get("embedding", []))
+                return self.parse_chunk(mode, json_response)
+
+            # --- 串流模式 (逐字回傳) ---
+            full_text_buffer = ""
+            async for json_obj in self._stream_objects(response, record):
+                content_piece = self.parse_chunk(mode, json_obj)
+                if content_piece:
+                    if record.ttft is None:
+                        record.ttft = time.monotonic() - record_started
+                    full_text_buffer += content_piece
                     if queue:
-                        queue.put(LLMResponseData(token=error_msg, completed=True))
-                    return error_msg
+                        queue.put(LLMResponseData(token=content_piece, completed=False))
 
-                response.raise_for_status()
+                if json_obj.get("done", False):
+                    record.update_from_response(json_obj)
+                    break
 
-                # --- 非串流模式 (一次回傳) ---
-                if not stream:
-                    json_response = response.json()
-                    if mode == LLMMode.EMBEDDINGS:
-                        return str(json_response.get("embedding", []))
+            if queue:
+                queue.put(LLMResponseData(token=None, completed=True, complete_text=full_text_buffer))
+            return full_text_buffer
 
-                    if mode == LLMMode.CHAT:
-                        return json_response.get("message", {}).get("content", "")
-                    return json_response.get("response", "")
+        async def run() -> LLMResult:
+            record = self._new_record()
+            try:
+                text = await self._send(lambda response: handle(response, record), payload, headers, record)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 捕獲其他連線錯誤 (含逾時)
+                error_text = f"LLMClient Error: {e!r}"
+                print(f"❌ {error_text}")
+                if queue:
+                    queue.put(LLMResponseData(token=f"Error: {e}", completed=True))
+                text = ""
+            return LLMResult(text, record)
 
-                # --- 串流模式 (逐字回傳) ---
-                full_text_buffer = ""
+        record_started = time.monotonic()
+        # 串流且需要逐 token 推送到 queue 時，每個呼叫者都要自己的串流，不合併
+        key = None if stream or queue else self._coalesce_key(payload)
+        return await _single_flight(key, run)
 
-                for line in response.iter_lines():
-                    if line:
-                        decoded_line = line.decode('utf-8')
-                        try:
-                            json_obj = json.loads(decoded_line)
+    async def call_json_stream(self, prompt: str, format: Optional[Any] = None,
+                               num_predict: Optional[int] = None, system: Optional[str] = None) -> StreamedJSON:
+        """
+        以串流方式呼叫，邊收邊解析；最外層 JSON 一完成就關閉連線，不再為後續的多餘文字付出生成時間。
+        若有設定 config.queue，仍會逐 token 推送。
+        :raise RuntimeError: 權限錯誤、連線失敗或逾時
+        """
+        payload, headers = self._payload(prompt, True, format, num_predict, system)
+        key = None if self.config.queue else self._coalesce_key(payload)
+        return await _single_flight(key, lambda: self._json_stream(payload, headers))
 
-                            if json_obj.get("done") and json_obj.get("done_reason") == "load":
-                                continue
+    async def _json_stream(self, payload: dict, headers: dict) -> StreamedJSON:
+        mode = self.config.mode
+        queue = self.config.queue
 
-                            content_piece = ""
-                            if mode == LLMMode.CHAT:
-                                content_piece = json_obj.get("message", {}).get("content", "")
-                            else:
-                                content_piece = json_obj.get("response", "")
+        parser = IncrementalJSONParser()
+        result = StreamedJSON(record=self._new_record())
+        full_text = []
+        started = time.monotonic()
+        # 括號閉合但不是合法 JSON 時停止增量解析，收完整段回應後改用 parse_json
+        invalid = []
 
-                            if content_piece:
-                                full_text_buffer += content_piece
-                                if queue:
-                                    queue.put(LLMResponseData(token=content_piece, completed=False))
+        async def handle(response: httpx.Response) -> None:
+            if response.status_code in [401, 403]:
+                raise RuntimeError(f"權限錯誤 ({response.status_code}): 請檢查 .env 中的 LLM_API_KEY 是否正確。")
+            response.raise_for_status()
 
-                            if json_obj.get("done", False):
-                                if queue:
-                                    queue.put(
-                                        LLMResponseData(token=None, completed=True, complete_text=full_text_buffer))
-                                break
+            async for json_obj in self._stream_objects(response, result.record):
+                piece = self.parse_chunk(mode, json_obj)
+                if piece:
+                    if result.ttft is None:
+                        result.ttft = result.record.ttft = time.monotonic() - started
+                    full_text.append(piece)
+                    if queue:
+                        queue.put(LLMResponseData(token=piece, completed=False))
+                    try:
+                        completed = not invalid and parser.feed(piece) is not None
+                    except ValueError as e:
+                        invalid.append(e)
+                        completed = False
+                    if completed:
+                        result.data = parser.value
+                        result.time_to_object = time.monotonic() - started
+                        result.stopped_early = not json_obj.get("done", False)
+                        if result.stopped_early:
+                            # 沒有等到 Ollama 的統計行，以收到的片段數估計生成的 token 數
+                            result.record.stopped_early = True
+                            result.record.eval_count = len(full_text)
+                        else:
+                            result.record.update_from_response(json_obj)
+                        return
 
-                        except json.JSONDecodeError:
-                            continue
+                if json_obj.get("done", False):
+                    result.record.update_from_response(json_obj)
+                    return
 
+        try:
+            await self._send(handle, payload, headers, result.record)
+        except (RuntimeError, asyncio.CancelledError):
+            raise
         except Exception as e:
-            # 捕獲其他連線錯誤
-            error_text = f"LLMClient Error: {e}"
-            print(f"❌ {error_text}")
-            if queue:
-                queue.put(LLMResponseData(token=f"Error: {e}", completed=True))
-            return ""
+            raise RuntimeError(f"LLMClient Error: {e!r}") from e
+        finally:
+            result.total_time = time.monotonic() - started
+
+        result.text = parser.text if parser.done else "".join(full_text)
+        if invalid:
+            try:
+                result.data = parse_json(result.text)
+                result.time_to_object = result.total_time
+            except ValueError:
+                print(f"⚠️ 串流的 JSON 無法解析: {invalid[0]}")
+        if queue:
+            queue.put(LLMResponseData(token=None, completed=True, complete_text=result.text))
+        return result
+
+
+    async def prewarm(self, system: Optional[str] = None) -> None:
+        """
+        預先載入模型並送出 system prompt，讓第一個真正的請求不必等模型載入、
+        也能直接重用已計算的 prefix；後端池中的每台伺服器各送一次
+        """
+        payload, headers = self._payload("", False, None, 1, system)
+        client = self.http_client or get_async_http_client()
+        base_urls = [backend.base_url for backend in self.pool.backends] if self.pool else [self.base_url]
+
+        async def warm(base_url: str) -> None:
+            started = time.monotonic()
+            try:
+                response = await client.post(f"{base_url}{self._path(self.config.mode)}", json=payload, headers=headers)
+                response.raise_for_status()
+                print(f"🔥 {self.config.model_type} prewarmed on {base_url} ({time.monotonic() - started:.2f}s)")
+            except Exception as e:
+                print(f"⚠️ Prewarm of {self.config.model_type} on {base_url} failed: {e!r}")
+
+        await asyncio.gather(*(warm(base_url) for base_url in base_urls))
+
+
+class LLMClient:
+    """
+    同步 API：薄薄包裝 AsyncLLMClient，請求在共用的背景 event loop 上執行，
+    因此所有執行緒共用同一個連線池與後端併發上限。
+    """
+
+    def __init__(self, config: LLMConfig, timeout: Optional[float] = None, pool: Optional[BackendPool] = None):
+        """
+        :param pool: 由 BackendPool 挑選伺服器；None 時使用 config 的 server_address / server_port
+        """
+        self.config = config
+        self.async_client = AsyncLLMClient(config, timeout=timeout, pool=pool)
+        self.base_url = self.async_client.base_url
+
+    def call_local_model(self, prompt: str, format: Optional[Any] = None, num_predict: Optional[int] = None,
+                         system: Optional[str] = None):
+        """
+        對外公開的呼叫方法，自動判斷正確的 API Endpoint
+        :param format: 覆寫 config.format (JSON Schema 或 "json")
+        :param num_predict: 覆寫 config.num_predict
+        :param system: 覆寫 config.system
+        """
+        return run_sync(self.async_client.call_local_model(prompt, format=format, num_predict=num_predict,
+                                                           system=system))
+
+    def call_local_model_detailed(self, prompt: str, format: Optional[Any] = None,
+                                  num_predict: Optional[int] = None, system: Optional[str] = None) -> LLMResult:
+        """
+        見 AsyncLLMClient.call_local_model_detailed
+        """
+        return run_sync(self.async_client.call_local_model_detailed(prompt, format=format, num_predict=num_predict,
+                                                                    system=system))
+
+    def call_json_stream(self, prompt: str, format: Optional[Any] = None,
+                         num_predict: Optional[int] = None, system: Optional[str] = None) -> StreamedJSON:
+        """
+        見 AsyncLLMClient.call_json_stream
+        """
+        return run_sync(self.async_client.call_json_stream(prompt, format=format, num_predict=num_predict,
+                                                           system=system))
+
+    def prewarm(self, system: Optional[str] = None, wait: bool = True) -> None:
+        """
+        見 AsyncLLMClient.prewarm
+        :param wait: False 時在背景執行，不阻塞呼叫端 (例如服務啟動時)
+        """
+        if wait:
+            run_sync(self.async_client.prewarm(system))
+        else:
+            asyncio.run_coroutine_threadsafe(self.async_client.prewarm(system), _background_loop())
 
-        return ""
+    @staticmethod
+    def coalescing_stats() -> dict:
+        return coalescing_stats()
 
     def get_detail_message(self, json_response):
-        if self.config.mode == LLMMode.CHAT:
-            return json_response.get("message", {}).get("content", "")
-        return json_response.get("response", "")
\ No newline at end of file
+        return AsyncLLMClient.parse_chunk(self.config.mode, json_response)
@@ -0,0 +1,207 @@
+import bisect
+import heapq
+import mmap
+import os
+import threading
+from typing import Callable, Iterable, Optional, Set
+
+DIGEST_SIZE = 32
+
+
+class _DigestView:
+    """
+    把排序好的 digest 檔 (每筆 32 bytes) 包成 bisect 可用的序列
+    """
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    def __len__(self):
+        return len(self.buffer) // DIGEST_SIZE
+
+    def __getitem__(self, index):
+        start = index * DIGEST_SIZE
+        return self.buffer[start: start + DIGEST_SIZE]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class DedupIndex:
+    """
+    本地持久化的去重索引，存放 `src.utils.hash_content` 產生的 SHA-256。
+
+    - `<path>.idx`: 已排序的 digest 檔，以 mmap 方式二分搜尋，不需整份載入記憶體
+    - `<path>.log`: 上次合併後新增的 digest (append-only)，啟動時載入成 set
+    - `<path>.complete`: backfill 完成的標記；中途失敗時不會產生，下次啟動重新回填
+    累積超過 `compact_threshold` 筆新 digest 時，會把 log 合併回 `.idx`。
+    """
+
+    def __init__(self, path: str, compact_threshold: int = 50_000):
+        self.path = path
+        self.index_path = f"{path}.idx"
+        self.log_path = f"{path}.log"
+        self.complete_path = f"{path}.complete"
+        self.compact_threshold = compact_threshold
+
+        self._lock = threading.Lock()
+        self._pending: Set[bytes] = set()
+        self._file = None
+        self._mmap: Optional[mmap.mmap] = None
+
+        directory = os.path.dirname(self.index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._open_index()
+        self._load_log()
+        self._log_file = open(self.log_path, "ab")
+
+    def exists(self) -> bool:
+        """
+        backfill 是否已完整跑完；`.idx` 在回填途中就可能因合併而產生，不能作為判斷依據
+        """
+        return os.path.exists(self.complete_path)
+
+    def __len__(self):
+        with self._lock:
+            return self._index_size() + len(self._pending)
+
+    def __contains__(self, hash_val: str) -> bool:
+        digest = self._to_digest(hash_val)
+        if digest is None:
+            return False
+        if digest in self._pending:
+            return True
+        with self._lock:
+            return self._index_contains(digest)
+
+    def add(self, hash_val: str) -> bool:
+        """
+        加入一筆 hash，回傳是否為新資料
+        """
+        digest = self._to_digest(hash_val)
+        if digest is None:
+            return False
+
+        with self._lock:
+            if digest in self._pending or self._index_contains(digest):
+                return False
+            self._pending.add(digest)
+            self._log_file.write(digest)
+            self._log_file.flush()
+
+            if len(self._pending) >= self.compact_threshold:
+                self._compact()
+        return True
+
+    def add_many(self, hash_vals: Iterable[str]) -> int:
+        added = 0
+        for hash_val in hash_vals:
+            if self.add(hash_val):
+                added += 1
+        return added
+
+    def backfill(self, collection, page_size: int = 1000,
+                 document_key: Optional[Callable[[str], str]] = None) -> int:
+        """
+        從 Chroma collection 分頁拉取所有 ID 建立索引，只在 exists() 為 False 時需要執行；
+        全部頁面處理完才寫入完成標記，中途失敗時已加入的 digest 保留，下次重跑會略過
+        :param document_key: 另外把每篇文件的 document_key(document) 加入索引 (例如正規化後內容的 hash)
+        """
+        offset = 0
+        total = 0
+        while True:
+            page = collection.get(include=["documents"] if document_key else [], limit=page_size, offset=offset)
+            ids = page.get("ids", [])
+            if not ids:
+                break
+            total += self.add_many(ids)
+            if document_key:
+                total += self.add_many(document_key(document) for document in page["documents"] if document)
+            offset += len(ids)
+            print(f"Dedup index backfill: {offset} ids scanned")
+            if len(ids) < page_size:
+                break
+
+        self.compact()
+        with open(self.complete_path, "w") as f:
+            f.write(f"{offset}\n")
+        return total
+
+    def compact(self) -> None:
+        with self._lock:
+            self._compact()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pending:
+                self._compact()
+            self._log_file.close()
+            self._close_index()
+
+    @staticmethod
+    def _to_digest(hash_val: str) -> Optional[bytes]:
+        try:
+            digest = bytes.fromhex(hash_val)
+        except (TypeError, ValueError):
+            return None
+        if len(digest) != DIGEST_SIZE:
+            return None
+        return digest
+
+    def _index_size(self) -> int:
+        if self._mmap is None:
+            return 0
+        return len(self._mmap) // DIGEST_SIZE
+
+    def _index_contains(self, digest: bytes) -> bool:
+        if self._mmap is None:
+            return False
+        view = _DigestView(self._mmap)
+        position = bisect.bisect_left(view, digest)
+        return position < len(view) and view[position] == digest
+
+    def _open_index(self) -> None:
+        if not os.path.exists(self.index_path) or os.path.getsize(self.index_path) == 0:
+            return
+        self._file = open(self.index_path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _close_index(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _load_log(self) -> None:
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, "rb") as f:
+            data = f.read()
+        # 最後一筆若因中斷而寫入不完整，直接捨棄
+        usable = len(data) - len(data) % DIGEST_SIZE
+        for start in range(0, usable, DIGEST_SIZE):
+            self._pending.add(data[start: start + DIGEST_SIZE])
+
+    def _compact(self) -> None:
+        """
+        把 pending digest 與現有 `.idx` 合併成新的排序檔 (呼叫前需持有 lock)
+        """
+        tmp_path = f"{self.index_path}.tmp"
+        existing = _DigestView(self._mmap) if self._mmap is not None else []
+        new_digests = sorted(d for d in self._pending if not self._index_contains(d))
+
+        with open(tmp_path, "wb") as f:
+            for digest in heapq.merge(existing, new_digests):
+                f.write(digest)
+
+        self._close_index()
+        os.replace(tmp_path, self.index_path)
+        self._open_index()
+
+        self._pending.clear()
+        self._log_file.close()
+        self._log_file = open(self.log_path, "wb")
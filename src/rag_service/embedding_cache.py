@@ -0,0 +1,182 @@
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Sequence
+
+from chromadb import Documents, Embeddings
+from chromadb.utils.embedding_functions import EmbeddingFunction
+
+from src.utils import hash_content
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, text_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used);
+"""
+
+
+class EmbeddingCache:
+    """
+    以 (model, sha256(text)) 為 key 的 embedding 快取；model 需能區分向量空間 (見 RagService.embedding_space)。
+
+    - 記憶體層：行程內 LRU，最多 memory_size 筆
+    - 磁碟層：SQLite，向量以 float32 BLOB 儲存，超過 max_rows 時依最後使用時間淘汰
+    """
+
+    def __init__(self, path: str, memory_size: int = 2048, max_rows: int = 500_000):
+        self.path = path
+        self.memory_size = memory_size
+        self.max_rows = max_rows
+
+        directory = os.path.dirname(path)
+        if directory and path != ":memory:":
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[tuple, List[float]]" = OrderedDict()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._rows = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_many(self, model: str, text_hashes: Sequence[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            missing = []
+            for text_hash in text_hashes:
+                key = (model, text_hash)
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[text_hash] = vector
+                    self.memory_hits += 1
+                else:
+                    missing.append(text_hash)
+
+            if missing:
+                rows = []
+                # 分段查詢，避免超過 SQLite 參數數量上限
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start: start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows.extend(self._conn.execute(
+                        f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                        [model, *chunk],
+                    ).fetchall())
+                for text_hash, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[text_hash] = vector.tolist()
+                    self._remember((model, text_hash), found[text_hash])
+                self.disk_hits += len(rows)
+                self.misses += len(missing) - len(rows)
+
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                        [(time.time(), model, text_hash) for text_hash, _ in rows],
+                    )
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, Sequence[float]]) -> None:
+        now = time.time()
+        with self._lock:
+            rows = []
+            for text_hash, vector in vectors.items():
+                vector = [float(x) for x in vector]
+                self._remember((model, text_hash), vector)
+                rows.append((model, text_hash, array("f", vector).tobytes(), now))
+            existing = self._count_existing(model, list(vectors))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            # 被覆寫的資料列不算新增
+            self._rows += len(rows) - existing
+            if self.max_rows and self._rows > self.max_rows:
+                self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": self._rows,
+                "evictions": self.evictions,
+            }
+
+    def _count_existing(self, model: str, text_hashes: List[str]) -> int:
+        count = 0
+        for start in range(0, len(text_hashes), 500):
+            chunk = text_hashes[start: start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            count += self._conn.execute(
+                f"SELECT COUNT(*) FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                [model, *chunk],
+            ).fetchone()[0]
+        return count
+
+    def _remember(self, key: tuple, vector: List[float]) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _evict(self) -> None:
+        # 一次淘汰到 90%，避免每次寫入都觸發刪除
+        self._rows = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = self._rows - int(self.max_rows * 0.9)
+        if excess <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self._rows -= excess
+        self.evictions += excess
+
+
+class CachedEmbeddingFunction(EmbeddingFunction):
+    """
+    包裝任一 EmbeddingFunction，只把快取中沒有的文字送去計算。
+    """
+
+    def __init__(self, inner: EmbeddingFunction, model_name: str, cache: EmbeddingCache):
+        self.inner = inner
+        self.model_name = model_name
+        self.cache = cache
+
+    def __call__(self, input: Documents) -> Embeddings:
+        texts = list(input)
+        hashes = [hash_content(text) for text in texts]
+        found = self.cache.get_many(self.model_name, hashes)
+
+        missing: Dict[str, str] = {}
+        for text_hash, text in zip(hashes, texts):
+            if text_hash not in found and text_hash not in missing:
+                missing[text_hash] = text
+
+        if missing:
+            computed = self.inner(list(missing.values()))
+            new_vectors = dict(zip(missing.keys(), computed))
+            self.cache.put_many(self.model_name, new_vectors)
+            found.update({text_hash: [float(x) for x in vector] for text_hash, vector in new_vectors.items()})
+
+        return [found[text_hash] for text_hash in hashes]
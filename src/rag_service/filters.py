@@ -0,0 +1,219 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.gazetteer import normalize_place_name
+from src.rag_service.schema import ALLOWED_VALUES, METADATA_DEFAULTS, to_flag, to_number
+
+# 比較運算子的排序 (也是輸出時的順序)
+_OPERATORS = ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte", "$in", "$nin")
+_LOGICAL = ("$and", "$or")
+_LIST_OPERATORS = ("$in", "$nin")
+# 展示用欄位 (JSON String) 不能作為篩選條件
+FILTERABLE_FIELDS = tuple(name for name in METADATA_DEFAULTS if not name.endswith("_json"))
+_PLACE_FIELDS = ("city", "district", "address")
+
+Condition = Tuple[str, str, Any]
+
+
+class FilterError(ValueError):
+    """
+    where 條件無法使用 (strict 模式下任何不合法的條件都會引發)
+    """
+
+    def __init__(self, problems: List[str]):
+        super().__init__("; ".join(problems))
+        self.problems = problems
+
+
+def _coerce_value(name: str, value: Any) -> Any:
+    """
+    將比較值轉成欄位的型態；無法轉換或不是合法值時回傳 None
+    """
+    if value is None or isinstance(value, (list, dict)):
+        return None
+    default = METADATA_DEFAULTS[name]
+    if isinstance(default, str):
+        text = str(value).strip()
+        if name in _PLACE_FIELDS:
+            text = normalize_place_name(text)
+        return text or None
+    if name in ALLOWED_VALUES:
+        flag = to_flag(value)
+        return flag if flag in ALLOWED_VALUES[name] else None
+    number = to_number(value)
+    if number is None:
+        return None
+    return int(round(number)) if isinstance(default, int) else float(number)
+
+
+class FilterCompiler:
+    """
+    把 LLM 或規則產生的 where 條件編譯成 Chroma 可直接使用的標準形式：
+
+    - 驗證：只允許 metadata schema 中可篩選的欄位與 Chroma 支援的運算子
+    - 型態：數字字串轉成數字、布林轉成 0/1，enum 欄位只保留合法值
+    - $or 只要有任何不合法的分支就整個捨棄 (只捨棄分支會縮小結果)
+    - 扁平化：巢狀的 $and / $or 攤平，只有一個元素的 $and / $or 拆開，空列表移除
+    - 合併：同一欄位的上下界只保留最嚴格的一個 (price_max $lte 8000 與 $lte 10000 -> $lte 8000)，
+      $in 取交集，重複的條件只留一個
+    - 排序：條件依欄位、運算子、值排序，相同意義的條件編譯結果相同，可直接作為快取 key
+
+    不合法的部分會被捨棄並記錄在 problems；strict=True 時改為引發 FilterError。
+    """
+
+    def __init__(self, strict: bool = False):
+        self.strict = strict
+        self.problems: List[str] = []
+
+    def compile(self, filters: Any) -> Optional[dict]:
+        """
+        :return: Chroma where 條件；沒有任何條件時回傳 None (Chroma 不接受空的 where)
+        :raise FilterError: strict 模式下有不合法的條件
+        """
+        self.problems = []
+        node = self._parse(filters) if filters else None
+        if self.strict and self.problems:
+            raise FilterError(self.problems)
+        return self._emit(node) if node is not None else None
+
+    # --- 解析 ---
+
+    def _reject(self, message: str) -> None:
+        self.problems.append(message)
+
+    def _parse(self, expression: Any):
+        """
+        回傳 ("and" | "or", [子節點...]) 或 (field, op, value)，無效時回傳 None
+        """
+        if not isinstance(expression, dict):
+            self._reject(f"Expected a where expression, got {expression!r}")
+            return None
+
+        nodes = []
+        for key, value in expression.items():
+            if key in _LOGICAL:
+                children = value if isinstance(value, list) else [value]
+                problems = len(self.problems)
+                parsed = [child for child in map(self._parse, children) if child is not None]
+                if key == "$or" and len(self.problems) > problems:
+                    # 捨棄 $or 的某個分支會讓結果變少；整個 $or 都不使用，寧可多回傳
+                    self._reject(f"Dropped $or with invalid branches: {value!r}")
+                    continue
+                nodes.append(self._group(key[1:], parsed))
+            elif key.startswith("$"):
+                self._reject(f"Unsupported operator {key}")
+            else:
+                nodes.extend(self._parse_field(key, value))
+        # 同一層的多個 key 視為 $and
+        return self._group("and", [node for node in nodes if node is not None])
+
+    def _parse_field(self, name: str, value: Any) -> List[Condition]:
+        if name not in FILTERABLE_FIELDS:
+            self._reject(f"Unknown field {name!r}")
+            return []
+        # {"price_max": 5000} 等同 {"price_max": {"$eq": 5000}}；{"a": {"$gte": 1, "$lte": 2}} 拆成兩個條件
+        operations = value if isinstance(value, dict) else {"$eq": value}
+        conditions = []
+        for op, operand in operations.items():
+            if op not in _OPERATORS:
+                self._reject(f"Unsupported operator {op} on {name!r}")
+                continue
+            if op in _LIST_OPERATORS:
+                items = operand if isinstance(operand, list) else [operand]
+                coerced = sorted({v for v in (_coerce_value(name, item) for item in items) if v is not None})
+                if not coerced:
+                    self._reject(f"Empty or invalid list for {name!r} {op}: {operand!r}")
+                    continue
+                # 只有一個值時改用 $eq / $ne
+                if len(coerced) == 1:
+                    conditions.append((name, "$eq" if op == "$in" else "$ne", coerced[0]))
+                else:
+                    conditions.append((name, op, tuple(coerced)))
+            else:
+                coerced = _coerce_value(name, operand)
+                if coerced is None:
+                    self._reject(f"Invalid value for {name!r} {op}: {operand!r}")
+                    continue
+                conditions.append((name, op, coerced))
+        return conditions
+
+    @staticmethod
+    def _group(kind: str, children: list):
+        flat = []
+        for child in children:
+            if child[0] == kind and isinstance(child[1], list):
+                flat.extend(child[1])
+            else:
+                flat.append(child)
+        if not flat:
+            return None
+        if kind == "and":
+            flat = FilterCompiler._merge_and(flat)
+        # 去除重複並排序
+        unique = {json.dumps(FilterCompiler._sort_key(node), ensure_ascii=False): node for node in flat}
+        flat = [unique[key] for key in sorted(unique)]
+        return flat[0] if len(flat) == 1 else (kind, flat)
+
+    @staticmethod
+    def _merge_and(nodes: list) -> list:
+        """
+        合併 $and 內同一欄位的條件
+        """
+        lower: Dict[str, Condition] = {}
+        upper: Dict[str, Condition] = {}
+        included: Dict[str, Condition] = {}
+        others = []
+        for node in nodes:
+            if node[0] in ("and", "or") and isinstance(node[1], list):
+                others.append(node)
+                continue
+            name, op, value = node
+            if op in ("$gt", "$gte"):
+                current = lower.get(name)
+                # 下界取較大者；值相同時 $gt 比 $gte 嚴格
+                if current is None or (value, op == "$gt") > (current[2], current[1] == "$gt"):
+                    lower[name] = node
+            elif op in ("$lt", "$lte"):
+                current = upper.get(name)
+                if current is None or (value, op == "$lte") < (current[2], current[1] == "$lte"):
+                    upper[name] = node
+            elif op in ("$eq", "$in"):
+                values = set(value) if op == "$in" else {value}
+                current = included.get(name)
+                if current is not None:
+                    values &= set(current[2]) if current[1] == "$in" else {current[2]}
+                if not values:
+                    # 互相矛盾 (例如 $eq 1 與 $eq 2)；保留兩者，讓查詢如實回傳空結果
+                    others.append(node)
+                    continue
+                values = sorted(values)
+                included[name] = (name, "$eq", values[0]) if len(values) == 1 else (name, "$in", tuple(values))
+            else:
+                others.append(node)
+        return [*lower.values(), *upper.values(), *included.values(), *others]
+
+    @staticmethod
+    def _sort_key(node) -> list:
+        if node[0] in ("and", "or") and isinstance(node[1], list):
+            return ["~" + node[0], [FilterCompiler._sort_key(child) for child in node[1]]]
+        name, op, value = node
+        return [name, _OPERATORS.index(op), list(value) if isinstance(value, tuple) else value]
+
+    # --- 輸出 ---
+
+    def _emit(self, node) -> dict:
+        if node[0] in ("and", "or") and isinstance(node[1], list):
+            return {f"${node[0]}": [self._emit(child) for child in node[1]]}
+        name, op, value = node
+        return {name: {op: list(value) if isinstance(value, tuple) else value}}
+
+
+def compile_filter(filters: Any, strict: bool = False) -> Optional[dict]:
+    """
+    見 FilterCompiler；不合法的條件會被捨棄並印出原因
+    """
+    compiler = FilterCompiler(strict=strict)
+    compiled = compiler.compile(filters)
+    if compiler.problems:
+        print(f"⚠️ 已略過不合法的篩選條件: {'; '.join(compiler.problems)}")
+    return compiled
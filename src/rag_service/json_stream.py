@@ -0,0 +1,83 @@
+import json
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from src.rag_service.llm_stats import LLMCallRecord
+
+
+class IncrementalJSONParser:
+    """
+    逐段餵入串流文字，在最外層 JSON 物件 (或陣列) 的括號閉合時立即回傳解析結果。
+
+    第一個 "{" 或 "[" 之前的文字 (例如 ```json) 會被略過；
+    只追蹤括號深度與字串狀態，每個字元只看一次。
+    """
+
+    def __init__(self):
+        self.buffer = []
+        self.started = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.done = False
+        self.value: Any = None
+        self.text = ""
+
+    def feed(self, chunk: str) -> Optional[Any]:
+        """
+        :return: 最外層 JSON 完成時回傳解析後的物件，否則回傳 None
+        :raise ValueError: 括號閉合但內容不是合法 JSON
+        """
+        if self.done:
+            return None
+
+        for char in chunk:
+            if not self.started:
+                if char not in "{[":
+                    continue
+                self.started = True
+
+            self.buffer.append(char)
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    self.text = "".join(self.buffer)
+                    try:
+                        self.value = json.loads(self.text)
+                    except json.JSONDecodeError as e:
+                        raise ValueError(f"Invalid JSON in stream: {e}")
+                    self.done = True
+                    return self.value
+        return None
+
+
+@dataclass
+class StreamedJSON:
+    """
+    串流 JSON 呼叫的結果
+
+    - data: 解析後的物件；串流結束仍未完成時為 None
+    - text: 完成時為 JSON 本身的文字，否則為收到的全部文字
+    - ttft: 送出請求到第一個 token 的秒數
+    - time_to_object: 送出請求到 JSON 完成的秒數
+    - stopped_early: 是否在模型結束生成前就關閉連線
+    - record: 這次呼叫的 token 與耗時統計
+    """
+    data: Any = None
+    text: str = ""
+    ttft: Optional[float] = None
+    time_to_object: Optional[float] = None
+    total_time: float = 0.0
+    stopped_early: bool = False
+    record: Optional[LLMCallRecord] = None
@@ -1,7 +1,7 @@
 import os
 from enum import Enum
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Any, Optional
 from queue import Queue
 from src.rag_service.registry import ModelRegistry
 from src.config import Config
@@ -21,6 +21,16 @@ class LLMConfig:
     token: Optional[str] = Config.LLM_CLIENT_TOKEN
     stream: bool = False
     queue: Optional[Queue] = None
+    # Ollama `format`: "json" 或 JSON Schema dict
+    format: Optional[Any] = None
+    # 生成 token 數上限 (options.num_predict)
+    num_predict: Optional[int] = None
+    # 固定的 system message；呼叫時可覆寫
+    system: Optional[str] = None
+    # 模型閒置多久後卸載 (Ollama keep_alive)，空字串表示使用伺服器預設
+    keep_alive: Optional[str] = Config.LLM_KEEP_ALIVE
+    # 其他 Ollama options，例如 num_ctx；每次請求應保持一致，否則伺服器會重新載入模型
+    options: dict = field(default_factory=lambda: dict(Config.LLM_OPTIONS))
     
     def __post_init__(self):
         target = self.mode.value
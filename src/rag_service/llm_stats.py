@@ -0,0 +1,222 @@
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Deque, Dict, List, Optional
+
+from src.config import Config
+
+# 延遲直方圖的上界 (秒)，最後一格為 +Inf
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+_NS = 1e9
+
+
+@dataclass
+class LLMCallRecord:
+    """
+    單次 LLM 呼叫的統計；Ollama 回傳的 *_duration 為奈秒，這裡一律換算成秒
+    """
+    model: str
+    mode: str
+    backend: str = ""
+    started_at: float = field(default_factory=time.time)
+    total_time: float = 0.0
+    ttft: Optional[float] = None
+    load_duration: Optional[float] = None
+    prompt_eval_count: Optional[int] = None
+    prompt_eval_duration: Optional[float] = None
+    eval_count: Optional[int] = None
+    eval_duration: Optional[float] = None
+    done_reason: Optional[str] = None
+    cold_load: bool = False
+    # 串流在 Ollama 回傳最後統計前就被中斷 (eval_count 為收到的片段數)
+    stopped_early: bool = False
+    error: Optional[str] = None
+
+    def update_from_response(self, data: dict) -> None:
+        """
+        讀取 Ollama 非串流回應或串流最後一行 (done=true) 的統計欄位
+        """
+        if data.get("load_duration") is not None:
+            self.load_duration = data["load_duration"] / _NS
+        if data.get("prompt_eval_count") is not None:
+            self.prompt_eval_count = data["prompt_eval_count"]
+        if data.get("prompt_eval_duration") is not None:
+            self.prompt_eval_duration = data["prompt_eval_duration"] / _NS
+        if data.get("eval_count") is not None:
+            self.eval_count = data["eval_count"]
+        if data.get("eval_duration") is not None:
+            self.eval_duration = data["eval_duration"] / _NS
+        if data.get("done_reason"):
+            self.done_reason = data["done_reason"]
+        if data.get("done_reason") == "load" or (self.load_duration or 0.0) >= Config.LLM_COLD_LOAD_SECONDS:
+            self.cold_load = True
+
+    @property
+    def prompt_tokens_per_second(self) -> Optional[float]:
+        if self.prompt_eval_count and self.prompt_eval_duration:
+            return self.prompt_eval_count / self.prompt_eval_duration
+        return None
+
+    @property
+    def eval_tokens_per_second(self) -> Optional[float]:
+        if self.eval_count and self.eval_duration:
+            return self.eval_count / self.eval_duration
+        return None
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["prompt_tokens_per_second"] = self.prompt_tokens_per_second
+        data["eval_tokens_per_second"] = self.eval_tokens_per_second
+        return data
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def cumulative(self) -> List[tuple]:
+        """
+        [(上界, 累計次數), ...]，最後一格上界為 "+Inf"
+        """
+        result, total = [], 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class _ModelStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.cold_loads = 0
+        self.prompt_tokens = 0
+        self.eval_tokens = 0
+        self.prompt_eval_seconds = 0.0
+        self.eval_seconds = 0.0
+        self.latency = {
+            "total": Histogram(),
+            "ttft": Histogram(),
+            "load": Histogram(),
+            "prompt_eval": Histogram(),
+            "eval": Histogram(),
+        }
+
+    def add(self, record: LLMCallRecord) -> None:
+        self.calls += 1
+        if record.error:
+            self.errors += 1
+            return
+        if record.cold_load:
+            self.cold_loads += 1
+        self.latency["total"].observe(record.total_time)
+        if record.ttft is not None:
+            self.latency["ttft"].observe(record.ttft)
+        if record.load_duration is not None:
+            self.latency["load"].observe(record.load_duration)
+        if record.prompt_eval_duration is not None:
+            self.latency["prompt_eval"].observe(record.prompt_eval_duration)
+            self.prompt_eval_seconds += record.prompt_eval_duration
+            self.prompt_tokens += record.prompt_eval_count or 0
+        if record.eval_duration is not None:
+            self.latency["eval"].observe(record.eval_duration)
+            self.eval_seconds += record.eval_duration
+            self.eval_tokens += record.eval_count or 0
+
+    def summary(self) -> dict:
+        total = self.latency["total"]
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cold_loads": self.cold_loads,
+            "avg_latency": total.sum / total.count if total.count else None,
+            "prompt_tokens": self.prompt_tokens,
+            "eval_tokens": self.eval_tokens,
+            "prompt_tokens_per_second": self.prompt_tokens / self.prompt_eval_seconds if self.prompt_eval_seconds else None,
+            "eval_tokens_per_second": self.eval_tokens / self.eval_seconds if self.eval_seconds else None,
+            "latency_seconds": {name: {"count": h.count, "sum": h.sum, "buckets": h.cumulative()}
+                                for name, h in self.latency.items()},
+        }
+
+
+class LLMStats:
+    """
+    彙整所有 LLMClient 呼叫：保留最近 max_records 筆紀錄，並依模型累計直方圖與 token 速度
+    """
+
+    def __init__(self, max_records: int = 1000):
+        self._lock = threading.Lock()
+        self._records: Deque[LLMCallRecord] = deque(maxlen=max_records)
+        self._models: Dict[str, _ModelStats] = {}
+
+    def record(self, record: LLMCallRecord) -> None:
+        with self._lock:
+            self._records.append(record)
+            self._models.setdefault(record.model, _ModelStats()).add(record)
+
+    def recent(self, limit: int = 100) -> List[LLMCallRecord]:
+        with self._lock:
+            return list(self._records)[-limit:]
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {model: stats.summary() for model, stats in self._models.items()}
+
+    def report(self) -> str:
+        """
+        每個模型一行的文字摘要
+        """
+        lines = []
+        for model, s in self.snapshot().items():
+            fmt = lambda v, spec: "-" if v is None else format(v, spec)
+            lines.append(
+                f"{model}: {s['calls']} calls, {s['errors']} errors, {s['cold_loads']} cold loads, "
+                f"avg {fmt(s['avg_latency'], '.2f')}s, prompt {fmt(s['prompt_tokens_per_second'], '.1f')} tok/s, "
+                f"eval {fmt(s['eval_tokens_per_second'], '.1f')} tok/s"
+            )
+        return "\n".join(lines)
+
+    def to_prometheus(self) -> str:
+        """
+        Prometheus 文字格式
+        """
+        lines = [
+            "# TYPE llm_calls_total counter",
+            "# TYPE llm_errors_total counter",
+            "# TYPE llm_cold_loads_total counter",
+            "# TYPE llm_prompt_tokens_total counter",
+            "# TYPE llm_eval_tokens_total counter",
+            "# TYPE llm_latency_seconds histogram",
+        ]
+        for model, s in self.snapshot().items():
+            label = f'model="{model}"'
+            lines.append(f"llm_calls_total{{{label}}} {s['calls']}")
+            lines.append(f"llm_errors_total{{{label}}} {s['errors']}")
+            lines.append(f"llm_cold_loads_total{{{label}}} {s['cold_loads']}")
+            lines.append(f"llm_prompt_tokens_total{{{label}}} {s['prompt_tokens']}")
+            lines.append(f"llm_eval_tokens_total{{{label}}} {s['eval_tokens']}")
+            for phase, h in s["latency_seconds"].items():
+                phase_label = f'{label},phase="{phase}"'
+                for bound, count in h["buckets"]:
+                    lines.append(f'llm_latency_seconds_bucket{{{phase_label},le="{bound}"}} {count}')
+                lines.append(f"llm_latency_seconds_sum{{{phase_label}}} {h['sum']}")
+                lines.append(f"llm_latency_seconds_count{{{phase_label}}} {h['count']}")
+        return "\n".join(lines) + "\n"
+
+
+# 行程內共用的統計
+llm_stats = LLMStats()
@@ -1,12 +1,17 @@
-import chromadb
 import hashlib
-from chromadb import QueryResult
+import os
+from typing import List, Optional
+
+from chromadb import GetResult, QueryResult
 from chromadb.api import DefaultEmbeddingFunction
 from chromadb.utils import embedding_functions
 
 from src.config import Config
-from src.utils import hash_content
+from src.utils import hash_content, normalize_post_text
 from src.rag_service.client import RemoteOllamaAuthEF
+from src.rag_service.dedup_index import DedupIndex
+from src.rag_service.embedding_cache import CachedEmbeddingFunction, EmbeddingCache
+from src.rag_service.vector_store import create_chroma_client
 
 
 class RagConfig:
@@ -18,7 +23,19 @@ class RagConfig:
     base_port: str = Config.LLM_EMBEDDING_SERVER_PORT
     model_type: str = Config.LLM_EMBEDDING_MODEL_TYPE
     embedding_token: str = Config.LLM_EMBEDDING_CLIENT_TOKEN
+    embedding_batch_api: str = Config.LLM_EMBEDDING_BATCH_API
+    embedding_batch_size: int = Config.LLM_EMBEDDING_BATCH_SIZE
+    embedding_concurrency: int = Config.LLM_EMBEDDING_CONCURRENCY
+    embedding_cache_memory_size: int = Config.EMBEDDING_CACHE_MEMORY_SIZE
+    embedding_cache_max_rows: int = Config.EMBEDDING_CACHE_MAX_ROWS
     chroma_token: str = Config.CHROMA_TOKEN
+    backend: str = Config.CHROMA_BACKEND
+    chroma_host: str = Config.CHROMA_HOST
+    chroma_port: int = Config.CHROMA_PORT
+    chroma_ssl: bool = Config.CHROMA_SSL
+    chroma_path: str = Config.CHROMA_PATH
+    cache_dir: str = Config.CACHE_DIR
+    dedup_page_size: int = Config.DEDUP_BACKFILL_PAGE_SIZE
 
 
 class RagService:
@@ -30,22 +47,38 @@ class RagService:
             cls._instance = super(RagService, cls).__new__(cls)
         return cls._instance
 
-    def __init__(self, rag_config: RagConfig = None):
+    def __init__(self, rag_config: RagConfig = None, client=None, embedding_function=None):
+        """
+        client 預設依 rag_config.backend 建立 (見 vector_store)；client / embedding_function 也可由外部注入
+        """
         if rag_config is None:
             rag_config = RagConfig()
 
-        self.client = chromadb.CloudClient(
-            api_key=rag_config.chroma_token,
-            tenant=rag_config.tenant,
-            database=rag_config.database
-        )
-
-        self.embedding_function = self._get_embedding_function(rag_config.provider, rag_config.base_url, rag_config.base_port, rag_config.model_type, rag_config.embedding_token)
+        if client is None:
+            client = create_chroma_client(rag_config)
+        self.client = client
+        self.backend = rag_config.backend
+
+        self.embedding_cache = None
+        if embedding_function is None:
+            embedding_function = self._get_embedding_function(rag_config)
+            if rag_config.embedding_cache_max_rows > 0:
+                self.embedding_cache = EmbeddingCache(
+                    os.path.join(rag_config.cache_dir, "embeddings.sqlite3"),
+                    memory_size=rag_config.embedding_cache_memory_size,
+                    max_rows=rag_config.embedding_cache_max_rows,
+                )
+                embedding_function = CachedEmbeddingFunction(
+                    embedding_function,
+                    model_name=self.embedding_space(rag_config),
+                    cache=self.embedding_cache,
+                )
+        self.embedding_function = embedding_function
 
         actual_collection_name = f"{rag_config.collection_name}_{rag_config.model_type}"
 
         print(f"正在使用模型: {rag_config.model_type}")
-        print(f"資料表名稱: {actual_collection_name}")
+        print(f"資料表名稱: {actual_collection_name} ({rag_config.backend})")
 
         self.collection = self.client.get_or_create_collection(
             name=actual_collection_name,
@@ -53,16 +86,34 @@ class RagService:
             # metadata={"hnsw:space": "cosine"}
         )
 
-
-    def _get_embedding_function(self, provider: str, base_url: str, base_port: str, model_type: str, token: str) -> RemoteOllamaAuthEF | DefaultEmbeddingFunction:
-        model_type = model_type.lower()
+        self.cache_dir = rag_config.cache_dir
+        self.dedup_page_size = rag_config.dedup_page_size
+        # v2: 也包含正規化後內容的 hash；舊的索引檔不再使用，第一次啟動時重新回填
+        self.dedup_index = DedupIndex(os.path.join(rag_config.cache_dir, "dedup", f"{actual_collection_name}.v2"))
+
+    @staticmethod
+    def embedding_space(rag_config: RagConfig) -> str:
+        """
+        embedding 快取的 model key：同一模型在不同伺服器或不同 API (/api/embed 會正規化) 算出的向量不能混用
+        """
+        model_type = rag_config.model_type.lower()
+        if rag_config.provider == "ollama":
+            return f"ollama:{model_type}:{rag_config.base_url}:{rag_config.base_port}:{rag_config.embedding_batch_api}"
+        return f"{rag_config.provider}:{model_type}"
+
+    def _get_embedding_function(self, rag_config: RagConfig) -> RemoteOllamaAuthEF | DefaultEmbeddingFunction:
+        provider = rag_config.provider
+        model_type = rag_config.model_type.lower()
 
         if provider == "ollama":
             return RemoteOllamaAuthEF(
-                base_url=f"{base_url}:{base_port}",
-                api_key=token,
+                base_url=f"{rag_config.base_url}:{rag_config.base_port}",
+                api_key=rag_config.embedding_token,
                 model_name=model_type,
-                timeout=120
+                timeout=120,
+                batch_size=rag_config.embedding_batch_size,
+                concurrency=rag_config.embedding_concurrency,
+                use_batch_api=rag_config.embedding_batch_api,
             )
 
         elif provider == "default":
@@ -81,11 +132,59 @@ class RagService:
             metadatas=[metadata],
             ids=[new_id],
         )
+        self.dedup_index.add(new_id)
         return new_id
 
-    def query(self, question: str, filters: dict = None, n_results: int = 3) -> QueryResult:
+    def update_metadata(self, post_id: str, metadata: dict) -> None:
+        """
+        只更新 metadata，不會重新計算 embedding
+        """
+        self.collection.update(ids=[post_id], metadatas=[metadata])
+
+    def ensure_dedup_index(self) -> DedupIndex:
+        """
+        本地去重索引不存在時，才從 Chroma 分頁回填
+        """
+        if not self.dedup_index.exists():
+            print("本地去重索引不存在，開始從 Chroma 回填...")
+            added = self.dedup_index.backfill(
+                self.collection,
+                page_size=self.dedup_page_size,
+                # 舊貼文以 Selenium .text 的原始內容為 ID；爬蟲現在以正規化後的內容計算 hash
+                document_key=lambda document: hash_content(normalize_post_text(document)),
+            )
+            print(f"去重索引回填完成，共 {added} 筆")
+        return self.dedup_index
+
+    def embed_query(self, text: str) -> list:
+        """
+        計算查詢文字的 embedding (經過 embedding 快取)，可與查詢解析同時進行
+        """
+        return [float(x) for x in self.embedding_function([text])[0]]
+
+    def get(self, ids: Optional[List[str]] = None, filters: dict = None, limit: Optional[int] = None,
+            offset: Optional[int] = None, include: Optional[list] = None) -> GetResult:
+        """
+        依 ID 或 metadata 條件讀取資料，不做向量搜尋
+        :param include: 預設讀取 documents 與 metadatas
+        """
+        return self.collection.get(
+            ids=ids,
+            where=filters,
+            limit=limit,
+            offset=offset,
+            include=["documents", "metadatas"] if include is None else include
+        )
+
+    def query(self, question: str, filters: dict = None, n_results: int = 3,
+              query_embedding: Optional[list] = None, include: Optional[list] = None) -> QueryResult:
+        """
+        :param query_embedding: 已經算好的查詢 embedding (見 embed_query)；沒有時由 collection 計算 question 的 embedding
+        """
+        vector = {"query_embeddings": [query_embedding]} if query_embedding is not None else {"query_texts": [question]}
         return self.collection.query(
-            query_texts=[question],
+            **vector,
             n_results=n_results,
-            where=filters
+            where=filters,
+            include=["documents", "metadatas", "distances"] if include is None else include
         )
@@ -1,25 +1,36 @@
 import requests
-from typing import Set
+from typing import Optional, Set
 
 
 class ModelRegistry:
     _loaded: bool = False
     _available_models: Set[str] = set()
 
+    @staticmethod
+    def fetch_models(base_url: str, timeout: Optional[float] = None) -> Set[str]:
+        """
+        查詢 Ollama 伺服器 (例如 "http://localhost:11434") 上的模型列表，不更新 registry
+        """
+        response = requests.get(f"{base_url}/api/tags", timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+        return {model["name"] for model in data.get("models", [])}
+
+    @staticmethod
+    def has_model(models: Set[str], model_name: str) -> bool:
+        # Ollama 會把沒有 tag 的模型名稱存成 "<name>:latest"
+        return model_name in models or f"{model_name}:latest" in models
+
     @classmethod
     def load_models_from_ollama(cls, address: str, port: int) -> None:
         """
         從 Ollama API 載入模型列表
         """
-        url = f"{address}:{port}/api/tags"
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            data = response.json()
+            models = cls.fetch_models(f"{address}:{port}")
             
             cls._available_models.clear()
-            for model in data.get("models", []):
-                cls._available_models.add(model["name"])
+            cls._available_models.update(models)
             
             cls._loaded = True
         except Exception as e:
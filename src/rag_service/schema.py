@@ -0,0 +1,253 @@
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.config import Config
+from src.utils import NUMBER_PATTERN, parse_chinese_number
+
+# 租屋 Metadata 欄位與預設值 (未提及時的值)，與 PROMPT_TEMPLATE 定義一致
+METADATA_DEFAULTS = {
+    "city": "",
+    "district": "",
+    "address": "",
+    "price_min": 0,
+    "price_max": 0,
+    "size_min": 0.0,
+    "size_max": 0.0,
+    "layout_room": 0,
+    "layout_hall": 0,
+    "layout_bath": 0,
+    "can_pet": -1,
+    "can_cook": -1,
+    "has_elevator": -1,
+    "has_parking": -1,
+    "is_student": -1,
+    "gender_restriction": 0,
+    "contact_info_json": "[]",
+    "photos_json": "[]",
+}
+
+# 只能是特定值的整數欄位
+ALLOWED_VALUES = {
+    "can_pet": (-1, 0, 1),
+    "can_cook": (-1, 0, 1),
+    "has_elevator": (-1, 0, 1),
+    "has_parking": (-1, 0, 1),
+    "is_student": (-1, 0, 1),
+    "gender_restriction": (0, 1, 2),
+}
+
+_TRUE_WORDS = {"true", "yes", "y", "是", "有", "可", "可以", "允許"}
+_FALSE_WORDS = {"false", "no", "n", "否", "無", "沒有", "不可", "不可以", "不能", "不行", "不允許", "禁止"}
+
+# 數字前可有負號 ("-1" 代表未提及)；前面是數字時視為範圍 ("5000-8000")，不算負號
+_NUMBER_RE = re.compile(rf"(?<![\d.])([-−－])?\s*({NUMBER_PATTERN})")
+
+
+def _json_type(default: Any) -> str:
+    if isinstance(default, int):
+        return "integer"
+    if isinstance(default, float):
+        return "number"
+    return "string"
+
+
+def metadata_schema(fields: Optional[Iterable[str]] = None) -> dict:
+    """
+    Ollama `format` 使用的 JSON Schema；fields 為 None 時包含所有欄位
+    """
+    fields = list(METADATA_DEFAULTS if fields is None else fields)
+    properties = {}
+    for name in fields:
+        prop = {"type": _json_type(METADATA_DEFAULTS[name])}
+        if name in ALLOWED_VALUES:
+            prop["enum"] = list(ALLOWED_VALUES[name])
+        properties[name] = prop
+    return {"type": "object", "properties": properties, "required": fields}
+
+
+def batch_metadata_schema(fields: Optional[Iterable[str]] = None) -> dict:
+    """
+    多篇貼文一次抽取時的 Schema：每個物件多一個 "id" 欄位
+    """
+    item = metadata_schema(fields)
+    item["properties"] = {"id": {"type": "string"}, **item["properties"]}
+    item["required"] = ["id", *item["required"]]
+    return {"type": "array", "items": item}
+
+
+QUERY_PARSER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "search_text": {"type": "string"},
+        "filters": {"type": "object"},
+    },
+    "required": ["search_text", "filters"],
+}
+
+
+def response_format(schema: dict):
+    """
+    依 LLM_STRUCTURED_OUTPUT 決定送給 Ollama 的 `format`：
+    "schema" 送出完整 JSON Schema (Ollama >= 0.5)，"json" 只要求合法 JSON，"off" 不設定
+    """
+    mode = Config.LLM_STRUCTURED_OUTPUT
+    if mode == "schema":
+        return schema
+    if mode == "json":
+        return "json"
+    return None
+
+
+def parse_json(text: str) -> Any:
+    """
+    解析 LLM 回傳的 JSON；容許前後多餘文字與 ```json 標記
+    :raise ValueError: 找不到可解析的 JSON
+    """
+    text = (text or "").strip()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text)
+    candidates = [(text.find(open_char), text.rfind(close_char)) for open_char, close_char in ("{}", "[]")]
+    # 先試最外層的括號
+    for start, end in sorted(candidates):
+        if start == -1 or end <= start:
+            continue
+        try:
+            return json.loads(text[start: end + 1])
+        except json.JSONDecodeError:
+            continue
+    raise ValueError(f"No JSON found in LLM output: {text[:200]!r}")
+
+
+def to_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        # "4700元"、"NT$ 4,700"、"1.5萬/月" 只取第一個數字
+        match = _NUMBER_RE.search(value)
+        if match:
+            number = parse_chinese_number(match.group(2))
+            if number is not None and match.group(1):
+                return -number
+            return number
+    return None
+
+
+def to_flag(value: Any) -> Optional[int]:
+    if isinstance(value, str):
+        word = value.strip().lower()
+        if word in _TRUE_WORDS:
+            return 1
+        if word in _FALSE_WORDS:
+            return 0
+    number = to_number(value)
+    return None if number is None else int(number)
+
+
+def _to_json_string(value: Any, default: str) -> str:
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, str):
+        try:
+            json.loads(value)
+            return value
+        except json.JSONDecodeError:
+            return default
+    return default
+
+
+def coerce_field(name: str, value: Any) -> Any:
+    """
+    將單一欄位轉成 Schema 定義的型態，無法轉換時回傳預設值
+    """
+    default = METADATA_DEFAULTS[name]
+    if value is None:
+        return default
+
+    if name.endswith("_json"):
+        return _to_json_string(value, default)
+
+    if name in ALLOWED_VALUES:
+        flag = to_flag(value)
+        return flag if flag in ALLOWED_VALUES[name] else default
+
+    if isinstance(default, int):
+        number = to_number(value)
+        return default if number is None else int(round(number))
+
+    if isinstance(default, float):
+        number = to_number(value)
+        return default if number is None else float(number)
+
+    if isinstance(value, (list, dict)):
+        return default
+    return str(value).strip()
+
+
+def _field_problem(name: str, value: Any) -> Optional[str]:
+    default = METADATA_DEFAULTS[name]
+    if value is None:
+        return f"{name} is null"
+    if name.endswith("_json"):
+        if isinstance(value, (list, dict)):
+            return None
+        if isinstance(value, str):
+            try:
+                json.loads(value)
+                return None
+            except json.JSONDecodeError:
+                pass
+        return f"{name} is not JSON: {value!r}"
+    if name in ALLOWED_VALUES:
+        return None if to_flag(value) in ALLOWED_VALUES[name] else f"{name} not in {ALLOWED_VALUES[name]}: {value!r}"
+    if isinstance(default, (int, float)):
+        return None if to_number(value) is not None else f"{name} is not a number: {value!r}"
+    return None if isinstance(value, (str, int, float)) else f"{name} is not a string: {value!r}"
+
+
+def metadata_problems(data: Any, fields: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    檢查 LLM 回傳的 metadata 是否符合 Schema (缺少欄位或值無法轉換)；coerce_metadata 會把這些問題默默換成預設值
+    :return: 問題列表，空列表表示可以安全地 coerce
+    """
+    if not isinstance(data, dict):
+        return [f"Expected an object, got {type(data).__name__}"]
+    fields = METADATA_DEFAULTS if fields is None else fields
+    problems = []
+    for name in fields:
+        if name not in data:
+            problems.append(f"{name} is missing")
+            continue
+        problem = _field_problem(name, data[name])
+        if problem:
+            problems.append(problem)
+    return problems
+
+
+def coerce_metadata(data: Any, fields: Optional[Iterable[str]] = None) -> dict:
+    """
+    修正型態、補上缺漏欄位的預設值，並移除未定義的欄位
+    :param fields: 只保留這些欄位；None 表示全部欄位
+    """
+    data = data if isinstance(data, dict) else {}
+    fields = METADATA_DEFAULTS if fields is None else fields
+    return {name: coerce_field(name, data.get(name)) for name in fields}
+
+
+def coerce_query(data: Any) -> Dict[str, Any]:
+    """
+    整理查詢解析結果為 {"search_text": str, "filters": dict}
+    """
+    data = data if isinstance(data, dict) else {}
+    search_text = data.get("search_text")
+    filters = data.get("filters")
+    return {
+        "search_text": search_text.strip() if isinstance(search_text, str) else "",
+        "filters": filters if isinstance(filters, dict) else {},
+    }
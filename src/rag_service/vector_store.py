@@ -0,0 +1,70 @@
+import os
+from typing import Callable, Dict
+
+import chromadb
+from chromadb.api import ClientAPI
+from chromadb.config import DEFAULT_DATABASE, DEFAULT_TENANT
+
+
+def _cloud_client(rag_config) -> ClientAPI:
+    return chromadb.CloudClient(
+        api_key=rag_config.chroma_token,
+        tenant=rag_config.tenant,
+        database=rag_config.database
+    )
+
+
+def _http_client(rag_config) -> ClientAPI:
+    """
+    自架的 Chroma server (chroma run)；有設定 CHROMA_TOKEN 時以 token 驗證
+    """
+    headers = {"x-chroma-token": rag_config.chroma_token} if rag_config.chroma_token else None
+    return chromadb.HttpClient(
+        host=rag_config.chroma_host,
+        port=rag_config.chroma_port,
+        ssl=rag_config.chroma_ssl,
+        headers=headers,
+        tenant=rag_config.tenant or DEFAULT_TENANT,
+        database=rag_config.database or DEFAULT_DATABASE,
+    )
+
+
+def _persistent_client(rag_config) -> ClientAPI:
+    """
+    嵌入式 Chroma，資料存在本機目錄，查詢不經過網路。
+    同一個目錄只能由一個行程開啟：爬蟲與 Flask 要共用索引時，請在同一台機器上執行
+    `chroma run --path <目錄>` 並改用 http backend
+    """
+    path = rag_config.chroma_path or os.path.join(rag_config.cache_dir, "chroma")
+    os.makedirs(path, exist_ok=True)
+    return chromadb.PersistentClient(
+        path=path,
+        tenant=rag_config.tenant or DEFAULT_TENANT,
+        database=rag_config.database or DEFAULT_DATABASE,
+    )
+
+
+def _ephemeral_client(rag_config) -> ClientAPI:
+    """
+    只存在記憶體中的 Chroma，用於 benchmark 與離線測試
+    """
+    return chromadb.EphemeralClient()
+
+
+VECTOR_STORE_BACKENDS: Dict[str, Callable[..., ClientAPI]] = {
+    "cloud": _cloud_client,
+    "http": _http_client,
+    "persistent": _persistent_client,
+    "ephemeral": _ephemeral_client,
+}
+
+
+def create_chroma_client(rag_config) -> ClientAPI:
+    """
+    依 rag_config.backend (CHROMA_BACKEND) 建立 Chroma client；各種 backend 的 collection 介面相同
+    :raise ValueError: 不支援的 backend
+    """
+    backend = (rag_config.backend or "cloud").lower()
+    if backend not in VECTOR_STORE_BACKENDS:
+        raise ValueError(f"不支援的 vector store backend: {backend} (可用: {', '.join(VECTOR_STORE_BACKENDS)})")
+    return VECTOR_STORE_BACKENDS[backend](rag_config)
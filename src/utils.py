@@ -1,4 +1,80 @@
 import hashlib
+import re
+import unicodedata
+from typing import Optional
 
 def hash_content(content):
-    return hashlib.sha256(content.encode('utf-8')).hexdigest()
\ No newline at end of file
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def normalize_post_text(text):
+    """
+    Normalize harvested post text before hashing, so that Selenium `.text` and
+    `innerText` give the same content: non-breaking and zero-width spaces, runs
+    of spaces and blank lines are collapsed, and every line is stripped.
+    """
+    text = text.replace("\xa0", " ").replace("\u200b", "").replace("\r\n", "\n").replace("\r", "\n")
+    lines = (re.sub(r"[ \t\f\v]+", " ", line).strip() for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+CHINESE_DIGITS = {"零": 0, "〇": 0, "一": 1, "二": 2, "兩": 2, "两": 2, "三": 3, "四": 4,
+                  "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+CHINESE_UNITS = {"十": 10, "百": 100, "千": 1000, "萬": 10000, "万": 10000}
+
+# 可被 parse_chinese_number 解析的數字片段，例如 "4,700"、"1.5萬"、"1萬5"、"一萬五千"、"5k"
+NUMBER_PATTERN = r"(?:\d[\d,]*(?:\.\d+)?|[零〇一二兩两三四五六七八九十百千萬万])(?:[\d,.零〇一二兩两三四五六七八九十百千萬万]*)(?:\s*[kK](?![a-zA-Z]))?"
+
+
+def parse_chinese_number(text: str) -> Optional[float]:
+    """
+    解析阿拉伯數字、中文數字與混合寫法，例如：
+    "4,700" -> 4700, "1.5萬" -> 15000, "1萬5" -> 15000, "三千五" -> 3500, "十二" -> 12, "5k" -> 5000
+    無法解析時回傳 None；沒有單位隔開的連續數字 (如 "五三") 也無法解析
+    """
+    text = unicodedata.normalize("NFKC", text).replace(",", "").strip().rstrip(".")
+    if not text:
+        return None
+
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*[kK]", text)
+    if match:
+        return float(match.group(1)) * 1000
+
+    tokens = re.findall(r"\d+(?:\.\d+)?|.", text)
+    total = 0.0
+    section = 0.0
+    number = None
+    last_unit = 1
+    after_zero = False
+
+    for token in tokens:
+        if (token[0].isdigit() or token in CHINESE_DIGITS) and number:
+            return None
+        if token[0].isdigit():
+            number = float(token)
+        elif token in CHINESE_DIGITS:
+            if CHINESE_DIGITS[token] == 0:
+                after_zero = True
+            number = float(CHINESE_DIGITS[token])
+        elif token in CHINESE_UNITS:
+            unit = CHINESE_UNITS[token]
+            if unit == 10000:
+                section += number or 0.0
+                total += (section or 1.0) * unit
+                section = 0.0
+            else:
+                section += (1.0 if number is None else number) * unit
+            number = None
+            last_unit = unit
+            after_zero = False
+        else:
+            return None
+
+    if number is not None:
+        # "1萬5"、"三千五" 的尾數代表下一個位數
+        if last_unit >= 10 and not after_zero and number < 10 and number == int(number):
+            section += number * (last_unit // 10)
+        else:
+            section += number
+
+    return total + section
@@ -0,0 +1,55 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# LLMConfig reads the port at import time; the tests talk to FakeOllama instead
+os.environ.setdefault("LLM_SERVER_PORT", "11434")
+
+
+class FakeOllama:
+    """
+    Minimal Ollama /api/chat server that answers every request with `content`
+    after `delay` seconds and records the request bodies.
+    """
+
+    def __init__(self, content="{}", delay=0.0):
+        self.content = content
+        self.delay = delay
+        self.requests = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                fake.requests.append((self.path, body))
+                time.sleep(fake.delay)
+                data = json.dumps({"message": {"content": fake.content}, "done": True}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fake_ollama():
+    server = FakeOllama()
+    yield server
+    server.close()
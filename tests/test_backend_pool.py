@@ -0,0 +1,35 @@
+from src.rag_service import backend_pool
+from src.rag_service.backend_pool import BackendPool, parse_backends, pool_status
+
+
+def test_parse_backends():
+    assert parse_backends(" http://gpu1:11434, ,http://gpu2:11434 ") == ["http://gpu1:11434", "http://gpu2:11434"]
+    assert parse_backends(None) == []
+
+
+def test_least_outstanding_backend_is_chosen():
+    pool = BackendPool("test", ["http://a", "http://b"], model="m")
+    first = pool.acquire()
+    second = pool.acquire()
+    assert {first.base_url, second.base_url} == {"http://a", "http://b"}
+    pool.release(first)
+    assert pool.acquire() is first
+
+
+def test_failing_backend_is_ejected():
+    pool = BackendPool("test", ["http://a", "http://b"], model="m", eject_after=2)
+    a = pool.backends[0]
+    for _ in range(2):
+        pool.release(pool.acquire(exclude=(pool.backends[1],)), ok=False)
+    assert not a.healthy
+    assert all(pool.acquire() is not a for _ in range(3))
+    assert [b["failures"] for b in pool.status()] == [2, 0]
+
+
+def test_pool_status_lists_created_pools(monkeypatch):
+    pool = BackendPool("query", ["http://a"], model="m")
+    monkeypatch.setattr(backend_pool, "_pools", {"query": pool})
+    pool.release(pool.acquire())
+    assert pool_status() == {"query": [
+        {"base_url": "http://a", "healthy": True, "outstanding": 0, "requests": 1, "failures": 0},
+    ]}
@@ -0,0 +1,112 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.config import Config
+from src.rag_service.client import LLMClient, _single_flight, coalescing_stats
+from src.rag_service.llm_config import LLMConfig, LLMMode
+
+
+def counting_factory(calls, result="ok", delay=0.05, error=None):
+    async def factory():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return result
+    return factory
+
+
+def test_identical_calls_share_one_request():
+    calls = []
+
+    async def main():
+        factory = counting_factory(calls)
+        return await asyncio.gather(*(_single_flight(("k",), factory) for _ in range(5)))
+
+    before = coalescing_stats()
+    assert asyncio.run(main()) == ["ok"] * 5
+    after = coalescing_stats()
+    assert len(calls) == 1
+    assert (after["requests"] - before["requests"], after["coalesced"] - before["coalesced"]) == (1, 4)
+    assert after["in_flight"] == 0
+
+
+def test_different_keys_are_not_merged():
+    calls = []
+
+    async def main():
+        factory = counting_factory(calls)
+        return await asyncio.gather(_single_flight(("a",), factory), _single_flight(("b",), factory),
+                                    _single_flight(None, factory))
+
+    asyncio.run(main())
+    assert len(calls) == 3
+
+
+def test_failure_reaches_every_caller_and_is_not_remembered():
+    calls = []
+
+    async def main():
+        failing = counting_factory(calls, error=ConnectionError("down"))
+        results = await asyncio.gather(*(_single_flight(("k",), failing) for _ in range(3)),
+                                       return_exceptions=True)
+        retry = await _single_flight(("k",), counting_factory(calls))
+        return results, retry
+
+    results, retry = asyncio.run(main())
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert retry == "ok"
+    assert len(calls) == 2
+
+
+def test_cancelling_one_caller_keeps_the_request():
+    calls = []
+
+    async def main():
+        factory = counting_factory(calls, delay=0.1)
+        first = asyncio.ensure_future(_single_flight(("k",), factory))
+        second = asyncio.ensure_future(_single_flight(("k",), factory))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "ok"
+    assert len(calls) == 1
+
+
+def test_cancelling_every_caller_cancels_the_request():
+    finished = []
+
+    async def main():
+        async def factory():
+            await asyncio.sleep(0.2)
+            finished.append(1)
+
+        caller = asyncio.ensure_future(_single_flight(("k",), factory))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0.3)
+
+    asyncio.run(main())
+    assert finished == []
+
+
+def test_threads_calling_the_client_share_one_http_request(fake_ollama, monkeypatch):
+    monkeypatch.setattr(Config, "LLM_COALESCE_REQUESTS", True)
+    fake_ollama.content = "東區"
+    fake_ollama.delay = 0.3
+    address, port = fake_ollama.base_url.rsplit(":", 1)
+    client = LLMClient(LLMConfig(mode=LLMMode.CHAT, server_address=address, server_port=port,
+                                 model_type="llama3", stream=False))
+
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(lambda _: client.call_local_model("台南哪一區?"), range(4)))
+
+    assert results == ["東區"] * 4
+    assert len(fake_ollama.requests) == 1
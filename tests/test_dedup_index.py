@@ -0,0 +1,66 @@
+import pytest
+
+from src.rag_service.dedup_index import DedupIndex
+from src.utils import hash_content
+
+
+class FakeCollection:
+    def __init__(self, ids, fail_at=None):
+        self.ids = ids
+        self.fail_at = fail_at
+
+    def get(self, include, limit, offset):
+        if offset == self.fail_at:
+            raise ConnectionError("chroma went away")
+        return {"ids": self.ids[offset: offset + limit], "documents": None}
+
+
+@pytest.fixture
+def ids():
+    return [hash_content(str(n)) for n in range(100)]
+
+
+def test_hashes_survive_reopen(tmp_path, ids):
+    index = DedupIndex(str(tmp_path / "dedup"), compact_threshold=30)
+    assert index.add_many(ids[:50]) == 50
+    assert not index.add(ids[0])
+    index.close()
+
+    reopened = DedupIndex(str(tmp_path / "dedup"), compact_threshold=30)
+    assert len(reopened) == 50
+    assert ids[49] in reopened
+    assert ids[50] not in reopened
+
+
+def test_uncompacted_log_survives_reopen(tmp_path, ids):
+    index = DedupIndex(str(tmp_path / "dedup"))
+    index.add(ids[0])
+
+    assert ids[0] in DedupIndex(str(tmp_path / "dedup"))
+
+
+def test_invalid_hashes_are_ignored(tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup"))
+    assert not index.add("not a hash")
+    assert "not a hash" not in index
+
+
+def test_backfill_marks_completion(tmp_path, ids):
+    index = DedupIndex(str(tmp_path / "dedup"))
+    assert not index.exists()
+    assert index.backfill(FakeCollection(ids), page_size=30) == 100
+    assert index.exists()
+    assert all(i in index for i in ids)
+
+
+def test_failed_backfill_is_retried(tmp_path, ids):
+    index = DedupIndex(str(tmp_path / "dedup"), compact_threshold=20)
+    with pytest.raises(ConnectionError):
+        index.backfill(FakeCollection(ids, fail_at=40), page_size=20)
+    index.close()
+
+    reopened = DedupIndex(str(tmp_path / "dedup"), compact_threshold=20)
+    assert not reopened.exists()
+    assert reopened.backfill(FakeCollection(ids), page_size=20) == 60
+    assert reopened.exists()
+    assert len(reopened) == 100
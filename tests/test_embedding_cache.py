@@ -0,0 +1,68 @@
+import pytest
+
+from src.rag_service.embedding_cache import CachedEmbeddingFunction, EmbeddingCache
+
+
+def as_lists(embeddings):
+    return [[float(x) for x in vector] for vector in embeddings]
+
+
+class CountingEmbedding:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def __call__(self, input):
+        self.calls.append(list(input))
+        if self.fail:
+            raise ConnectionError("embedding server went away")
+        return [[float(len(text)), 0.5] for text in input]
+
+
+def test_vectors_survive_reopen(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    inner = CountingEmbedding()
+    CachedEmbeddingFunction(inner, "model-a", EmbeddingCache(path))(["東區套房", "北區雅房"])
+
+    cache = EmbeddingCache(path)
+    reopened = CachedEmbeddingFunction(inner, "model-a", cache)
+    assert as_lists(reopened(["北區雅房", "東區套房", "新的貼文"])) == [[4.0, 0.5], [4.0, 0.5], [4.0, 0.5]]
+    assert inner.calls == [["東區套房", "北區雅房"], ["新的貼文"]]
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["misses"], stats["disk_entries"]) == (2, 1, 3)
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+
+def test_vector_spaces_are_kept_apart(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+    inner = CountingEmbedding()
+    CachedEmbeddingFunction(inner, "model-a", cache)(["東區套房"])
+    CachedEmbeddingFunction(inner, "model-b", cache)(["東區套房"])
+    assert len(inner.calls) == 2
+
+
+def test_failed_batch_is_not_cached(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+    with pytest.raises(ConnectionError):
+        CachedEmbeddingFunction(CountingEmbedding(fail=True), "model-a", cache)(["東區套房"])
+
+    inner = CountingEmbedding()
+    assert as_lists(CachedEmbeddingFunction(inner, "model-a", cache)(["東區套房"])) == [[4.0, 0.5]]
+    assert inner.calls == [["東區套房"]]
+
+
+def test_overwrites_do_not_count_as_new_rows(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), max_rows=10)
+    cache.put_many("model-a", {"a" * 64: [1.0]})
+    cache.put_many("model-a", {"a" * 64: [2.0]})
+    assert cache.stats()["disk_entries"] == 1
+
+
+def test_least_recently_used_rows_are_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), memory_size=0, max_rows=10)
+    for n in range(11):
+        cache.put_many("model-a", {f"{n:064x}": [float(n)]})
+    stats = cache.stats()
+    assert stats["evictions"] == 2
+    assert stats["disk_entries"] == 9
+    assert cache.get_many("model-a", [f"{0:064x}"]) == {}
@@ -0,0 +1,71 @@
+import sqlite3
+import threading
+
+from src.config import Config
+from src.facebook_rental_crawler.extraction_cache import ExtractionCache, extraction_version
+
+METADATA = {"city": "台南市", "district": "東區", "price_max": 5000}
+
+
+def test_entries_survive_reopen(tmp_path):
+    path = str(tmp_path / "extractions.sqlite3")
+    cache = ExtractionCache(path, "v1", "llama3")
+    cache.put("post-a", METADATA)
+    cache.put("post-b", METADATA, used_llm=False)
+    cache.close()
+
+    reopened = ExtractionCache(path, "v1", "llama3")
+    assert reopened.get("post-a") == METADATA
+    assert reopened.get("post-b") == METADATA
+    assert reopened.get("post-c") is None
+    assert (reopened.hits, reopened.llm_hits, reopened.misses) == (2, 1, 1)
+
+
+def test_other_versions_and_models_are_stale(tmp_path):
+    path = str(tmp_path / "extractions.sqlite3")
+    ExtractionCache(path, "v1", "llama3").put("post-a", METADATA)
+
+    assert ExtractionCache(path, "v2", "llama3").get("post-a") is None
+    assert ExtractionCache(path, "v1", "qwen").get("post-a") is None
+    assert ExtractionCache(path, "v1", "llama3").is_fresh(["post-a", "post-b"]) == {"post-a"}
+    assert ExtractionCache(path, "v2", "llama3").prune() == 1
+
+
+def test_cache_without_used_llm_column_is_migrated(tmp_path):
+    path = str(tmp_path / "extractions.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE extractions (post_hash TEXT NOT NULL, prompt_hash TEXT NOT NULL, model TEXT NOT NULL, "
+        "metadata TEXT NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (post_hash, prompt_hash, model))"
+    )
+    conn.execute("INSERT INTO extractions VALUES ('post-a', 'v1', 'llama3', '{}', 0)")
+    conn.commit()
+    conn.close()
+
+    cache = ExtractionCache(path, "v1", "llama3")
+    assert cache.get("post-a") == {}
+    assert cache.llm_hits == 1
+
+
+def test_concurrent_workers(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "extractions.sqlite3"), "v1", "llama3")
+
+    def work(worker):
+        for n in range(50):
+            cache.put(f"post-{worker}-{n}", METADATA)
+            assert cache.get(f"post-{worker}-{n}") == METADATA
+
+    threads = [threading.Thread(target=work, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert cache.hits == 200
+    assert len(cache.is_fresh(f"post-{w}-{n}" for w in range(4) for n in range(50))) == 200
+
+
+def test_extraction_version_follows_rule_settings(monkeypatch):
+    version = extraction_version()
+    monkeypatch.setattr(Config, "RULE_EXTRACTOR_MIN_CONFIDENCE", Config.RULE_EXTRACTOR_MIN_CONFIDENCE + 0.1)
+    assert extraction_version() != version
@@ -0,0 +1,72 @@
+import pytest
+
+from src.rag_service.filters import FilterCompiler, FilterError, compile_filter
+
+
+def test_empty_filters_compile_to_none():
+    assert compile_filter(None) is None
+    assert compile_filter({}) is None
+    assert compile_filter({"$and": []}) is None
+
+
+def test_single_condition_is_unwrapped():
+    assert compile_filter({"$and": [{"district": "東區"}]}) == {"district": {"$eq": "東區"}}
+
+
+def test_values_are_coerced():
+    assert compile_filter({"price_max": {"$lte": "8000元"}}) == {"price_max": {"$lte": 8000}}
+    assert compile_filter({"can_pet": {"$eq": "是"}}) == {"can_pet": {"$eq": 1}}
+
+
+def test_negative_flag_is_not_inverted():
+    assert compile_filter({"can_pet": {"$eq": "-1"}}) == {"can_pet": {"$eq": -1}}
+
+
+def test_bounds_are_merged():
+    compiled = compile_filter({"$and": [
+        {"price_max": {"$lte": 10000}},
+        {"price_max": {"$lte": 8000}},
+        {"price_min": {"$gte": 3000}},
+    ]})
+    assert compiled == {"$and": [{"price_max": {"$lte": 8000}}, {"price_min": {"$gte": 3000}}]}
+
+
+def test_in_lists_are_intersected():
+    compiled = compile_filter({"$and": [
+        {"gender_restriction": {"$in": [0, 2]}},
+        {"gender_restriction": {"$in": [2, 1]}},
+    ]})
+    assert compiled == {"gender_restriction": {"$eq": 2}}
+
+
+def test_multiple_operators_on_one_field_are_split():
+    compiled = compile_filter({"price_max": {"$gte": 3000, "$lte": 8000}})
+    assert compiled == {"$and": [{"price_max": {"$gte": 3000}}, {"price_max": {"$lte": 8000}}]}
+
+
+def test_equivalent_filters_compile_identically():
+    a = compile_filter({"$and": [{"district": "東區"}, {"price_max": {"$lte": 8000}}]})
+    b = compile_filter({"price_max": {"$lte": "8000"}, "district": {"$in": ["東區"]}})
+    assert a == b
+
+
+def test_invalid_conditions_are_dropped():
+    compiler = FilterCompiler()
+    assert compiler.compile({"$and": [{"district": "東區"}, {"pet_allowed": False}]}) == {"district": {"$eq": "東區"}}
+    assert compiler.problems
+
+
+def test_or_with_an_invalid_branch_is_dropped():
+    compiled = compile_filter({"$and": [{"city": "台南市"}, {"$or": [{"district": "東區"}, {"foo": 1}]}]})
+    assert compiled == {"city": {"$eq": "台南市"}}
+
+
+def test_valid_or_is_kept():
+    compiled = compile_filter({"$or": [{"district": "北區"}, {"district": "東區"}]})
+    assert compiled == {"$or": [{"district": {"$eq": "北區"}}, {"district": {"$eq": "東區"}}]}
+
+
+def test_strict_mode_raises():
+    with pytest.raises(FilterError) as error:
+        FilterCompiler(strict=True).compile({"$or": [{"district": "東區"}, {"foo": 1}]})
+    assert error.value.problems
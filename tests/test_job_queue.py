@@ -0,0 +1,101 @@
+import queue
+import threading
+
+import pytest
+
+from src.facebook_rental_crawler.job_queue import EMBEDDED, EXTRACTING, FAILED, PENDING, DurableJobQueue
+
+
+def post(n):
+    return {"id": f"post-{n}", "content": f"content {n}"}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "jobs.db")
+
+
+def test_jobs_survive_reopen(path):
+    jobs = DurableJobQueue(path)
+    jobs.put(post(1))
+    jobs.put(post(2))
+    jobs.ack(jobs.get(block=False))
+
+    reopened = DurableJobQueue(path)
+    assert reopened.counts()[PENDING] == 1
+    assert reopened.get(block=False)["id"] == "post-2"
+
+
+def test_jobs_of_a_dead_owner_are_recovered(path):
+    jobs = DurableJobQueue(path)
+    jobs.put(post(1))
+    jobs.get(block=False)
+    jobs._execute("UPDATE jobs SET owner = ?", (f"{jobs.owner.rpartition(':')[0]}:999999999",))
+
+    assert DurableJobQueue(path).counts()[PENDING] == 1
+
+
+def test_jobs_of_a_live_owner_are_not_recovered(path):
+    jobs = DurableJobQueue(path)
+    jobs.put(post(1))
+    jobs.get(block=False)
+
+    assert DurableJobQueue(path).counts()[EXTRACTING] == 1
+    assert DurableJobQueue(path, lease_seconds=-1).counts()[PENDING] == 1
+
+
+def test_failed_jobs_back_off_then_fail(path):
+    jobs = DurableJobQueue(path, max_attempts=2, backoff=60)
+    jobs.put(post(1))
+    jobs.nack(jobs.get(block=False), "boom")
+    assert jobs.counts()[PENDING] == 1
+    with pytest.raises(queue.Empty):
+        jobs.get(block=False)
+
+    jobs._execute("UPDATE jobs SET next_attempt_at = 0")
+    jobs.nack(jobs.get(block=False), "boom")
+    assert jobs.counts()[FAILED] == 1
+    assert jobs.requeue_failed() == 1
+
+
+def test_claim_loses_race_to_another_connection(path):
+    first = DurableJobQueue(path)
+    second = DurableJobQueue(path)
+    first.put(post(1))
+    first.put(post(2))
+
+    # The second connection claims post-1 between the first one's SELECT and UPDATE
+    execute = first._execute
+
+    def racing_execute(sql, params=()):
+        if sql.lstrip().startswith("UPDATE jobs SET state = ?, owner = ?") and params[3] == "post-1":
+            assert second.get(block=False)["id"] == "post-1"
+        return execute(sql, params)
+
+    first._execute = racing_execute
+    assert first.get(block=False)["id"] == "post-2"
+    assert first.counts() == {PENDING: 0, EXTRACTING: 2, EMBEDDED: 0, FAILED: 0}
+
+
+def test_competing_connections_claim_each_job_once(path):
+    producer = DurableJobQueue(path)
+    for n in range(100):
+        producer.put(post(n))
+
+    claimed = []
+
+    def consume():
+        jobs = DurableJobQueue(path)
+        while True:
+            try:
+                claimed.append(jobs.get(block=False)["id"])
+            except queue.Empty:
+                return
+
+    threads = [threading.Thread(target=consume) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == sorted(f"post-{n}" for n in range(100))
@@ -0,0 +1,47 @@
+import pytest
+
+from src.rag_service.json_stream import IncrementalJSONParser
+
+
+def feed_all(parser, chunks):
+    for chunk in chunks:
+        value = parser.feed(chunk)
+        if value is not None:
+            return value
+    return None
+
+
+def test_object_completes_across_chunks():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"a": 1, ') is None
+    assert parser.feed('"b": [1, 2]}') == {"a": 1, "b": [1, 2]}
+    assert parser.done
+    assert parser.text == '{"a": 1, "b": [1, 2]}'
+
+
+def test_leading_text_and_trailing_text_are_ignored():
+    parser = IncrementalJSONParser()
+    assert feed_all(parser, ["```json\n", '{"a": 1}', "\n```"]) == {"a": 1}
+    assert parser.feed("more") is None
+
+
+def test_brackets_inside_strings():
+    parser = IncrementalJSONParser()
+    assert feed_all(parser, ['{"a": "}"', ', "b": "\\"{"}']) == {"a": "}", "b": '"{'}
+
+
+def test_top_level_array():
+    parser = IncrementalJSONParser()
+    assert feed_all(parser, ['[{"id": "1"}', ', {"id": "2"}]']) == [{"id": "1"}, {"id": "2"}]
+
+
+def test_incomplete_object():
+    parser = IncrementalJSONParser()
+    assert feed_all(parser, ['{"a": ', "1"]) is None
+    assert not parser.done
+
+
+def test_invalid_object_raises():
+    parser = IncrementalJSONParser()
+    with pytest.raises(ValueError):
+        parser.feed("{a: 1}")
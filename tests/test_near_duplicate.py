@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from src.facebook_rental_crawler.near_duplicate import MinHasher, NearDuplicateIndex
+
+POST = "東區套房出租，月租 5000 元，近成大，可養寵物，有電梯，意者請私訊王小姐"
+REPOST = "東區套房出租，月租 4800 元，近成大，可養寵物，有電梯，意者請私訊王小姐"
+OTHER = "北區三房兩廳整層出租，月租 18000，有車位，限家庭，請洽陳先生"
+
+
+class FakeCollection:
+    def __init__(self, documents, fail_at=None):
+        self.documents = documents
+        self.fail_at = fail_at
+
+    def get(self, include, limit, offset):
+        if offset == self.fail_at:
+            raise ConnectionError("chroma went away")
+        ids = list(self.documents)[offset: offset + limit]
+        return {"ids": ids, "documents": [self.documents[i] for i in ids]}
+
+
+def test_similarity_ignores_whitespace_and_width():
+    hasher = MinHasher()
+    assert MinHasher.similarity(hasher.signature("東區 套房 ５０００"), hasher.signature("東區套房5000")) == 1.0
+
+
+def test_finds_reposts_after_reopen(tmp_path):
+    path = str(tmp_path / "near.jsonl")
+    index = NearDuplicateIndex(path, threshold=0.5)
+    index.add("a", POST)
+    index.add("b", OTHER)
+
+    reopened = NearDuplicateIndex(path, threshold=0.5)
+    assert len(reopened) == 2
+    assert reopened.find(REPOST) == "a"
+    assert reopened.find("完全無關的一段文字內容") is None
+
+
+def test_backfill_indexes_the_collection(tmp_path):
+    path = str(tmp_path / "near.jsonl")
+    index = NearDuplicateIndex(path, threshold=0.5)
+    assert not index.exists()
+    assert index.backfill(FakeCollection({"a": POST, "b": OTHER}), page_size=1) == 2
+    assert index.exists()
+    assert NearDuplicateIndex(path, threshold=0.5).find(REPOST) == "a"
+
+
+def test_failed_backfill_leaves_no_index(tmp_path):
+    path = str(tmp_path / "near.jsonl")
+    with pytest.raises(ConnectionError):
+        NearDuplicateIndex(path).backfill(FakeCollection({"a": POST}, fail_at=0))
+
+    assert not NearDuplicateIndex(path).exists()
+    assert not os.path.exists(path)
@@ -0,0 +1,56 @@
+import pytest
+
+from src.query_generator.query_cache import QueryCache, cache_version, normalize_query
+
+
+@pytest.mark.parametrize("a, b", [
+    ("  東區　套房  一萬五 以下 ", "東區套房15,000以下"),
+    ("臺南 套房", "台南套房"),
+    ("三房", "3房"),
+    ("ＡＢＣ", "abc"),
+])
+def test_equivalent_queries_normalize_identically(a, b):
+    assert normalize_query(a) == normalize_query(b)
+
+
+def test_spaces_between_latin_words_are_kept():
+    assert normalize_query("ABC  Def") == "abc def"
+
+
+def test_cache_version_changes_with_parts():
+    assert cache_version("prompt", 1) == cache_version("prompt", 1)
+    assert cache_version("prompt", 1) != cache_version("prompt", 2)
+
+
+def test_memory_cache_roundtrip():
+    cache = QueryCache(memory_size=2)
+    assert cache.get("v1", "東區 套房") is None
+    cache.put("v1", "東區 套房", {"filters": {"district": "東區"}})
+    assert cache.get("v1", "東區套房") == {"filters": {"district": "東區"}}
+    assert cache.get("v2", "東區套房") is None
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["misses"]) == (1, 2)
+
+
+def test_cached_values_are_copies():
+    cache = QueryCache()
+    cache.put("v1", "q", {"filters": {}})
+    cache.get("v1", "q")["filters"]["x"] = 1
+    assert cache.get("v1", "q") == {"filters": {}}
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = QueryCache(memory_size=2)
+    for query in ("a", "b", "c"):
+        cache.put("v1", query, query)
+    assert cache.get("v1", "a") is None
+    assert cache.get("v1", "c") == "c"
+
+
+@pytest.mark.parametrize("a, b", [
+    ("五千 三房", "五千三 房"),
+    ("台南 一萬 二房", "台南一萬二 房"),
+])
+def test_separate_numbers_are_not_merged(a, b):
+    assert normalize_query(a) != normalize_query(b)
+    assert QueryCache().key("v1", a) != QueryCache().key("v1", b)
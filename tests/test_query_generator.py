@@ -0,0 +1,55 @@
+import json
+import threading
+
+import pytest
+
+from src.config import Config
+from src.query_generator.query_generator import MiniRagApp
+from src.rag_service import backend_pool
+from src.rag_service.llm_config import LLMConfig, LLMMode
+
+
+@pytest.fixture
+def query_pool(fake_ollama, monkeypatch):
+    fake_ollama.content = json.dumps({"search_text": "安靜", "filters": {"address": {"$eq": "凱旋路"}}})
+    monkeypatch.setattr(Config, "LLM_QUERY_BACKENDS", fake_ollama.base_url)
+    monkeypatch.setattr(Config, "LLM_STREAM_JSON", False)
+    monkeypatch.setattr(Config, "QUERY_CACHE_ENABLED", False)
+    monkeypatch.setattr(backend_pool, "_pools", {})
+    return backend_pool.get_backend_pool("query")
+
+
+def test_custom_config_still_uses_the_query_pool(query_pool, fake_ollama):
+    # The configured server is unreachable; only the pool's backend answers
+    config = LLMConfig(mode=LLMMode.CHAT, server_address="http://127.0.0.1", server_port="9",
+                       model_type=Config.LLM_MODEL_TYPE, stream=False)
+    app = MiniRagApp(config)
+
+    assert app.llm_client.async_client.pool is query_pool
+    assert app.format_query("凱旋路附近 安靜") == {"address": {"$eq": "凱旋路"}}
+    assert [path for path, _ in fake_ollama.requests] == ["/api/chat"]
+    assert query_pool.status()[0]["requests"] == 1
+    assert app.parse_stats() == {"rules": 0, "cache": 0, "llm": 1}
+
+
+def test_confident_rules_skip_the_llm(query_pool, fake_ollama):
+    app = MiniRagApp()
+    assert app.format_query("東區 套房 8000以下") is not None
+    assert fake_ollama.requests == []
+    assert app.parse_stats() == {"rules": 1, "cache": 0, "llm": 0}
+
+
+def test_parse_counts_from_many_threads(query_pool):
+    app = MiniRagApp()
+
+    def parse():
+        for _ in range(200):
+            app.format_query("東區 套房 8000以下")
+
+    threads = [threading.Thread(target=parse) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert app.parse_stats()["rules"] == 1600
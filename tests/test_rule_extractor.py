@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from src.facebook_rental_crawler.rule_extractor import RuleExtractor
+
+POST = "台南市東區 凱旋路 套房出租 月租 5,000 元 可養寵物 不可開伙 限女 電話 0912-345-678 王小姐 3坪"
+
+
+@pytest.fixture
+def result():
+    return RuleExtractor(default_city="台南市").extract(POST)
+
+
+def test_fields(result):
+    metadata = result.metadata
+    assert (metadata["city"], metadata["district"]) == ("台南市", "東區")
+    assert (metadata["price_min"], metadata["price_max"]) == (5000, 5000)
+    assert (metadata["size_min"], metadata["size_max"]) == (3.0, 3.0)
+    assert (metadata["layout_room"], metadata["layout_bath"]) == (1, 1)
+    assert (metadata["can_pet"], metadata["can_cook"]) == (1, 0)
+    assert metadata["gender_restriction"] == 2
+    assert json.loads(metadata["contact_info_json"])[0]["phone"] == "0912345678"
+
+
+def test_unresolved(result):
+    assert result.unresolved(0.75, ["city", "price_max"]) == []
+    assert "address" in result.unresolved(0.75)
+
+
+def test_missing_price_is_unresolved():
+    result = RuleExtractor().extract("東區套房出租")
+    assert result.metadata["price_max"] == 0
+    assert "price_max" in result.unresolved(0.75)
+
+
+def test_unknown_flags_default_to_not_mentioned():
+    result = RuleExtractor().extract("東區套房 月租 5000 元")
+    assert result.metadata["has_elevator"] == -1
@@ -0,0 +1,69 @@
+import pytest
+
+from src.query_generator.rule_parser import RuleQuery, RuleQueryParser, merge_filters
+
+
+@pytest.fixture
+def parser():
+    return RuleQueryParser(default_city="台南市")
+
+
+def test_location_layout_and_price(parser):
+    result = parser.parse("東區 套房 8000以下")
+    assert result.conditions == {
+        "city": {"$eq": "台南市"},
+        "district": {"$eq": "東區"},
+        "price_max": {"$lte": 8000},
+    }
+    assert result.coverage == 1.0
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("預算5000", {"price_max": {"$lte": 5000}}),
+    ("5000塊的套房", {"price_max": {"$lte": 5000}}),
+    ("租金 5000~8000", {"price_min": {"$gte": 5000}, "price_max": {"$lte": 8000}}),
+    ("一萬以上", {"price_min": {"$gte": 10000}}),
+])
+def test_price(parser, query, expected):
+    assert parser.parse(query).conditions == expected
+
+
+def test_bare_number_is_not_a_price(parser):
+    result = parser.parse("東區 套房 2024年")
+    assert "price_max" not in result.conditions
+    assert result.coverage < 0.85
+    assert "2024" in result.search_text
+
+
+def test_flags_and_negation(parser):
+    assert parser.parse("可養寵物 有電梯").conditions == {"can_pet": {"$eq": 1}, "has_elevator": {"$eq": 1}}
+    assert "can_pet" not in parser.parse("不能養寵物").conditions
+
+
+def test_gender(parser):
+    assert parser.parse("我是女生").conditions == {"gender_restriction": {"$in": [0, 2]}}
+    assert parser.parse("男生").conditions == {"gender_restriction": {"$in": [0, 1]}}
+
+
+def test_unrecognized_query_has_low_coverage(parser):
+    result = parser.parse("安靜 採光好 近捷運")
+    assert result.conditions == {}
+    assert result.coverage < 0.5
+
+
+def test_empty_query(parser):
+    assert parser.parse("") == RuleQuery()
+
+
+def test_filters():
+    assert RuleQuery().filters() == {}
+    assert RuleQuery({"city": {"$eq": "台南市"}}).filters() == {"city": {"$eq": "台南市"}}
+    two = RuleQuery({"city": {"$eq": "台南市"}, "can_pet": {"$eq": 1}}).filters()
+    assert two == {"$and": [{"city": {"$eq": "台南市"}}, {"can_pet": {"$eq": 1}}]}
+
+
+def test_merge_filters_prefers_rules():
+    rules = RuleQuery({"price_max": {"$lte": 8000}})
+    llm = {"$and": [{"price_max": {"$lte": 9000}}, {"address": {"$eq": "凱旋路"}}]}
+    assert merge_filters(rules, llm) == {"$and": [{"price_max": {"$lte": 8000}}, {"address": {"$eq": "凱旋路"}}]}
+    assert merge_filters(RuleQuery(), None) == {}
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from src.rag_service.schema import (
+    METADATA_DEFAULTS, coerce_field, coerce_metadata, metadata_problems, parse_json, to_flag, to_number,
+)
+
+
+@pytest.mark.parametrize("value, expected", [
+    (4700, 4700.0),
+    ("4700元", 4700.0),
+    ("NT$ 4,700", 4700.0),
+    ("1.5萬/月", 15000.0),
+    ("三千五", 3500.0),
+    ("-1", -1.0),
+    ("−2", -2.0),
+    ("5000-8000", 5000.0),
+    ("面議", None),
+    (None, None),
+])
+def test_to_number(value, expected):
+    assert to_number(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("是", 1),
+    ("可以", 1),
+    (True, 1),
+    ("否", 0),
+    ("不可以", 0),
+    ("不能", 0),
+    ("不行", 0),
+    ("-1", -1),
+    (-1, -1),
+    ("0", 0),
+])
+def test_to_flag(value, expected):
+    assert to_flag(value) == expected
+
+
+def test_coerce_field_keeps_negative_values():
+    assert coerce_field("can_pet", "-1") == -1
+    assert coerce_field("price_min", "-1") == -1
+
+
+def test_coerce_field_falls_back_to_default():
+    assert coerce_field("can_pet", 5) == -1
+    assert coerce_field("gender_restriction", "-1") == 0
+    assert coerce_field("price_max", "面議") == 0
+    assert coerce_field("photos_json", "not json") == "[]"
+    assert coerce_field("contact_info_json", [{"phone": "0912"}]) == json.dumps([{"phone": "0912"}])
+
+
+def test_coerce_metadata_fills_and_drops_fields():
+    metadata = coerce_metadata({"city": " 台南市 ", "price_max": "5000元", "unknown": 1})
+    assert set(metadata) == set(METADATA_DEFAULTS)
+    assert metadata["city"] == "台南市"
+    assert metadata["price_max"] == 5000
+    assert metadata["size_min"] == 0.0
+
+
+def test_metadata_problems():
+    assert metadata_problems(dict(METADATA_DEFAULTS)) == []
+    problems = metadata_problems(dict(METADATA_DEFAULTS, price_max="面議", can_pet=5))
+    assert len(problems) == 2
+    assert metadata_problems({"city": "台南市"}, fields=["city", "district"]) == ["district is missing"]
+    assert metadata_problems([]) != []
+
+
+def test_parse_json_tolerates_wrapping():
+    assert parse_json('```json\n{"a": 1}\n```') == {"a": 1}
+    assert parse_json('答案是 [1, 2] 謝謝') == [1, 2]
+    with pytest.raises(ValueError):
+        parse_json("no json here")
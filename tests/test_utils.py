@@ -0,0 +1,21 @@
+import pytest
+
+from src.utils import parse_chinese_number
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("4,700", 4700),
+    ("1.5萬", 15000),
+    ("1萬5", 15000),
+    ("三千五", 3500),
+    ("十二", 12),
+    ("一百零五", 105),
+    ("5k", 5000),
+])
+def test_parse_chinese_number(text, expected):
+    assert parse_chinese_number(text) == expected
+
+
+@pytest.mark.parametrize("text", ["五三", "一二三", "五3", "", "abc"])
+def test_digit_runs_without_units_are_rejected(text):
+    assert parse_chinese_number(text) is None
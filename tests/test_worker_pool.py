@@ -0,0 +1,81 @@
+import time
+
+from src.facebook_rental_crawler.job_queue import EMBEDDED, FAILED, DurableJobQueue
+from src.facebook_rental_crawler.worker_pool import WorkerPool
+
+
+class FakeExtractor:
+    def __init__(self, processed, fail_ids=()):
+        self.processed = processed
+        self.fail_ids = fail_ids
+
+    def process(self, post):
+        time.sleep(0.01)
+        if post["id"] in self.fail_ids:
+            raise ValueError("unparseable post")
+        self.processed.append(post["id"])
+        return post["id"]
+
+
+class FakeBatchExtractor(FakeExtractor):
+    def __init__(self, processed, batches):
+        super().__init__(processed)
+        self.batches = batches
+
+    def process_batch(self, posts):
+        self.batches.append(len(posts))
+        return [self.process(post) for post in posts]
+
+
+def fill(path, count, **kwargs):
+    jobs = DurableJobQueue(path, **kwargs)
+    for n in range(count):
+        jobs.put({"id": f"post-{n}", "content": f"content {n}"})
+    jobs.put(None)
+    return jobs
+
+
+def run(jobs, factory, **kwargs):
+    pool = WorkerPool(jobs, factory, poison_pill=None, interval=0.1, **kwargs)
+    pool.start()
+    pool.join()
+    return pool
+
+
+def test_every_job_is_processed_once_and_failures_are_recorded(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    jobs = fill(path, 30, max_attempts=1)
+    processed = []
+    run(jobs, lambda: FakeExtractor(processed, fail_ids={"post-3"}), max_workers=4, min_workers=4)
+
+    assert sorted(processed) == sorted(f"post-{n}" for n in range(30) if n != 3)
+    counts = DurableJobQueue(path).counts()
+    assert (counts[EMBEDDED], counts[FAILED]) == (29, 1)
+
+
+def test_failed_jobs_are_retried(tmp_path):
+    jobs = fill(str(tmp_path / "jobs.db"), 3, backoff=0.01)
+    processed = []
+    failures = {"post-1"}
+
+    class FlakyExtractor(FakeExtractor):
+        def process(self, post):
+            if post["id"] in failures:
+                failures.discard(post["id"])
+                raise ConnectionError("LLM server went away")
+            return super().process(post)
+
+    run(jobs, lambda: FlakyExtractor(processed), max_workers=2)
+
+    assert sorted(processed) == ["post-0", "post-1", "post-2"]
+    assert jobs.counts()[EMBEDDED] == 3
+
+
+def test_micro_batches(tmp_path):
+    jobs = fill(str(tmp_path / "jobs.db"), 10)
+    processed, batches = [], []
+    run(jobs, lambda: FakeBatchExtractor(processed, batches), max_workers=1, batch_size=4, batch_wait=1.0)
+
+    assert sorted(processed) == sorted(f"post-{n}" for n in range(10))
+    assert max(batches) > 1
+    assert sum(batches) == 10